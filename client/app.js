@@ -1,5 +1,6 @@
 // API endpoints
 const API_BASE = '/api/v1';
+const PAGE_LIMIT = 100;
 
 // DOM Elements
 const searchInput = document.getElementById('searchInput');
@@ -54,6 +55,25 @@ async function searchProducts() {
     }
 }
 
+// Fetch every page of the product listing, following next_cursor
+async function fetchAllProducts(params) {
+    const products = [];
+    let after = null;
+    do {
+        const page = new URLSearchParams(params);
+        page.set('limit', PAGE_LIMIT);
+        if (after) page.set('after', after);
+        
+        const response = await fetch(`${API_BASE}/products?${page}`);
+        if (!response.ok) throw new Error('Failed to load products');
+        
+        const data = await response.json();
+        products.push(...data.products);
+        after = data.next_cursor;
+    } while (after);
+    return products;
+}
+
 // Load all products
 async function loadProducts() {
     showLoading();
@@ -65,10 +85,7 @@ async function loadProducts() {
         if (platform) params.append('platform', platform);
         if (category) params.append('category', category);
         
-        const response = await fetch(`${API_BASE}/products?${params}`);
-        if (!response.ok) throw new Error('Failed to load products');
-        
-        const products = await response.json();
+        const products = await fetchAllProducts(params);
         displayProducts(products);
     } catch (error) {
         showError('Error loading products: ' + error.message);
@@ -115,20 +132,15 @@ async function showProductDetails(productId) {
             </div>
         `;
         
-        // Fetch all product data in parallel
-        const [productResponse, priceHistoryResponse, visualizationResponse] = await Promise.all([
-            fetch(`${API_BASE}/products/${productId}`),
-            fetch(`${API_BASE}/products/${productId}/prices`),
-            fetch(`${API_BASE}/products/${productId}/visualization/data`)
-        ]);
+        // Fetch product, history and statistics in one request
+        const response = await fetch(`${API_BASE}/products/${productId}/detail`);
         
-        if (!productResponse.ok || !priceHistoryResponse.ok || !visualizationResponse.ok) {
+        if (!response.ok) {
             throw new Error('Failed to load product details');
         }
         
-        const product = await productResponse.json();
-        const priceHistory = await priceHistoryResponse.json();
-        const visualizationData = await visualizationResponse.json();
+        const detail = await response.json();
+        const product = detail.product;
         
         // Display product details
         document.getElementById('productDetails').innerHTML = `
@@ -147,8 +159,8 @@ async function showProductDetails(productId) {
         `;
         
         // Display price statistics and chart
-        displayPriceStats(priceHistory);
-        displayPriceChart(visualizationData);
+        displayPriceStats(detail.statistics);
+        displayPriceChart(detail.price_history);
         
         // Store current product ID for updates
         currentProductId = productId;
@@ -181,21 +193,17 @@ async function updatePriceHistory(days) {
         `;
         
         // Fetch updated data
-        const [historyResponse, visualizationResponse] = await Promise.all([
-            fetch(`${API_BASE}/products/${currentProductId}/prices?days=${days}`),
-            fetch(`${API_BASE}/products/${currentProductId}/visualization/data?days=${days}`)
-        ]);
+        const response = await fetch(`${API_BASE}/products/${currentProductId}/detail?days=${days}`);
         
-        if (!historyResponse.ok || !visualizationResponse.ok) {
+        if (!response.ok) {
             throw new Error('Failed to update price history');
         }
         
-        const priceHistory = await historyResponse.json();
-        const visualizationData = await visualizationResponse.json();
+        const detail = await response.json();
         
         // Update the display
-        displayPriceStats(priceHistory);
-        displayPriceChart(visualizationData);
+        displayPriceStats(detail.statistics);
+        displayPriceChart(detail.price_history);
     } catch (error) {
         console.error('Error:', error);
         document.getElementById('priceChart').innerHTML = `
@@ -207,8 +215,8 @@ async function updatePriceHistory(days) {
 }
 
 // Display price statistics
-function displayPriceStats(priceHistory) {
-    if (!priceHistory || priceHistory.length === 0) {
+function displayPriceStats(statistics) {
+    if (!statistics) {
         document.getElementById('priceStats').innerHTML = `
             <div class="col-12">
                 <div class="alert alert-info">No price history available</div>
@@ -217,7 +225,13 @@ function displayPriceStats(priceHistory) {
         return;
     }
     
-    const stats = calculatePriceStats(priceHistory);
+    const stats = {
+        currentPrice: statistics.current_price,
+        lowestPrice: statistics.min_price,
+        highestPrice: statistics.max_price,
+        averagePrice: statistics.avg_price,
+        priceChange: statistics.price_change_pct.toFixed(1)
+    };
     document.getElementById('priceStats').innerHTML = `
         <div class="col-md-3 col-6">
             <div class="stat-card">
@@ -250,17 +264,18 @@ function displayPriceStats(priceHistory) {
 }
 
 // Display price chart
-function displayPriceChart(data) {
-    if (!data || !data.prices || data.prices.length === 0) {
+function displayPriceChart(priceHistory) {
+    if (!priceHistory || priceHistory.length === 0) {
         document.getElementById('priceChart').innerHTML = `
             <div class="alert alert-info">No price history available for visualization</div>
         `;
         return;
     }
 
+    const dates = priceHistory.map(point => new Date(point.timestamp));
     const trace = {
-        x: data.dates.map(date => new Date(date)),
-        y: data.prices,
+        x: dates,
+        y: priceHistory.map(point => point.price),
         type: 'scatter',
         mode: 'lines+markers',
         name: 'Price History',
@@ -273,11 +288,10 @@ function displayPriceChart(data) {
         }
     };
 
-    // Calculate 7-day moving average
-    const ma7 = calculateMovingAverage(data.prices, 7);
+    // 7-point moving average computed by the server
     const maTrace = {
-        x: data.dates.map(date => new Date(date)),
-        y: ma7,
+        x: dates,
+        y: priceHistory.map(point => point.ma7),
         type: 'scatter',
         mode: 'lines',
         name: '7-day Moving Average',
@@ -326,38 +340,6 @@ function displayPriceChart(data) {
     Plotly.newPlot('priceChart', [trace, maTrace], layout, config);
 }
 
-// Calculate moving average
-function calculateMovingAverage(prices, window) {
-    const result = [];
-    for (let i = 0; i < prices.length; i++) {
-        if (i < window - 1) {
-            result.push(null);
-            continue;
-        }
-        let sum = 0;
-        for (let j = 0; j < window; j++) {
-            sum += prices[i - j];
-        }
-        result.push(sum / window);
-    }
-    return result;
-}
-
-// Calculate price statistics
-function calculatePriceStats(priceHistory) {
-    const prices = priceHistory.map(item => item.price);
-    const currentPrice = prices[0] || 0;
-    const oldestPrice = prices[prices.length - 1] || currentPrice;
-    
-    return {
-        currentPrice: currentPrice,
-        lowestPrice: Math.min(...prices),
-        highestPrice: Math.max(...prices),
-        averagePrice: prices.reduce((a, b) => a + b, 0) / prices.length,
-        priceChange: oldestPrice ? ((currentPrice - oldestPrice) / oldestPrice * 100).toFixed(1) : 0
-    };
-}
-
 // Helper functions
 function showLoading() {
     productList.innerHTML = '<div class="col-12"><div class="loading">Loading...</div></div>';
@@ -15,3 +15,77 @@ class Config:
     # Additional configuration
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-key-change-this')
     DEBUG = os.getenv('FLASK_DEBUG', 'True').lower() in ('true', '1', 't')
+    
+    # API pagination
+    PAGE_SIZE = int(os.getenv('PAGE_SIZE', '50'))
+    MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', '500'))
+    BATCH_MAX_IDS = int(os.getenv('BATCH_MAX_IDS', '50'))
+    
+    # Seconds between delta syncs of the in-process search index (non-PostgreSQL only)
+    SEARCH_SYNC_INTERVAL = int(os.getenv('SEARCH_SYNC_INTERVAL', '30'))
+    # Above this many index hits, search filters with LIKE alone instead of binding every id
+    SEARCH_MAX_CANDIDATES = int(os.getenv('SEARCH_MAX_CANDIDATES', '500'))
+    
+    # Response cache (0 entries disables it); invalidated when ingest bumps the generation
+    RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '1024'))
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '3600'))
+    CACHE_GENERATION_POLL = int(os.getenv('CACHE_GENERATION_POLL', '5'))
+    
+    # History windows longer than this many days are served from the daily rollup
+    ROLLUP_THRESHOLD_DAYS = int(os.getenv('ROLLUP_THRESHOLD_DAYS', '90'))
+    
+    # Store repeated observations of an unchanged price as one interval row
+    PRICE_HISTORY_COMPACT = os.getenv('PRICE_HISTORY_COMPACT', 'true').lower() in ('true', '1', 't')
+    
+    # price_history retention: monthly partitions (PostgreSQL) are created this many months ahead;
+    # older months are thinned to each product's daily close, then dropped (0 keeps them forever)
+    HISTORY_PARTITION_MONTHS_AHEAD = int(os.getenv('HISTORY_PARTITION_MONTHS_AHEAD', '3'))
+    HISTORY_DOWNSAMPLE_AFTER_MONTHS = int(os.getenv('HISTORY_DOWNSAMPLE_AFTER_MONTHS', '4'))
+    HISTORY_DROP_AFTER_MONTHS = int(os.getenv('HISTORY_DROP_AFTER_MONTHS', '24'))
+    
+    # Rendered Plotly figures; set FIGURE_CACHE_DIR to persist them and enable pre-warming
+    FIGURE_CACHE_SIZE = int(os.getenv('FIGURE_CACHE_SIZE', '256'))
+    FIGURE_CACHE_DIR = os.getenv('FIGURE_CACHE_DIR')
+    FIGURE_PREWARM_COUNT = int(os.getenv('FIGURE_PREWARM_COUNT', '20'))
+    
+    # Price refresh: results committed per batch, and where an interrupted run is recorded
+    REFRESH_BATCH_SIZE = int(os.getenv('REFRESH_BATCH_SIZE', '100'))
+    REFRESH_STATE_FILE = os.getenv('REFRESH_STATE_FILE', 'refresh_state.json')
+    
+    # Scraper conditional-request cache (ETag/Last-Modified/body hash); disabled when unset
+    FETCH_CACHE_DIR = os.getenv('FETCH_CACHE_DIR')
+    
+    # Scraper HTTP connection pool shared across platforms (timeouts in seconds)
+    HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '100'))
+    HTTP_POOL_PER_HOST = int(os.getenv('HTTP_POOL_PER_HOST', '8'))
+    HTTP_DNS_CACHE_TTL = int(os.getenv('HTTP_DNS_CACHE_TTL', '300'))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '10'))
+    HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '30'))
+    HTTP_TOTAL_TIMEOUT = float(os.getenv('HTTP_TOTAL_TIMEOUT', '60'))
+    # Retries per run across all hosts; a host's circuit opens after HTTP_BREAKER_THRESHOLD
+    # consecutive failures and is probed again after HTTP_BREAKER_RESET_TIMEOUT seconds, doubling
+    HTTP_RETRY_BUDGET = int(os.getenv('HTTP_RETRY_BUDGET', '100'))
+    HTTP_BREAKER_THRESHOLD = int(os.getenv('HTTP_BREAKER_THRESHOLD', '5'))
+    HTTP_BREAKER_RESET_TIMEOUT = float(os.getenv('HTTP_BREAKER_RESET_TIMEOUT', '30'))
+    
+    # Adaptive re-scraping: check each product often enough to expect SCHEDULE_TARGET_CHANGES
+    # price changes per interval, within the min/max bounds (hours); requests per tick
+    SCHEDULE_MIN_INTERVAL = float(os.getenv('SCHEDULE_MIN_INTERVAL', '1'))
+    SCHEDULE_MAX_INTERVAL = float(os.getenv('SCHEDULE_MAX_INTERVAL', '24'))
+    SCHEDULE_TARGET_CHANGES = float(os.getenv('SCHEDULE_TARGET_CHANGES', '0.5'))
+    SCHEDULE_REQUEST_BUDGET = int(os.getenv('SCHEDULE_REQUEST_BUDGET', '500'))
+    SCHEDULE_TICK_MINUTES = int(os.getenv('SCHEDULE_TICK_MINUTES', '15'))
+    # Products sampled to estimate catalog freshness; the whole catalog when it is smaller
+    FRESHNESS_SAMPLE = int(os.getenv('FRESHNESS_SAMPLE', '2000'))
+    
+    # Category crawl budgets; the crawl also stops after CRAWL_STOP_AFTER known, unchanged products in a row
+    CRAWL_MAX_PAGES = int(os.getenv('CRAWL_MAX_PAGES', '20'))
+    CRAWL_MAX_ITEMS = int(os.getenv('CRAWL_MAX_ITEMS', '1000'))
+    CRAWL_STOP_AFTER = int(os.getenv('CRAWL_STOP_AFTER', '80'))
+    
+    # Scrape journal: when set, scrapers append results here and server/scripts/ingest_worker.py
+    # applies them to the database; segments roll over at JOURNAL_SEGMENT_BYTES
+    JOURNAL_DIR = os.getenv('JOURNAL_DIR')
+    JOURNAL_SEGMENT_BYTES = int(os.getenv('JOURNAL_SEGMENT_BYTES', str(64 * 1024 * 1024)))
+    JOURNAL_FSYNC_EVERY = int(os.getenv('JOURNAL_FSYNC_EVERY', '500'))
+    JOURNAL_BATCH_SIZE = int(os.getenv('JOURNAL_BATCH_SIZE', '5000'))
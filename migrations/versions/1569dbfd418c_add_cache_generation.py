@@ -0,0 +1,29 @@
+"""Add cache generation counter
+
+Revision ID: 1569dbfd418c
+Revises: e7ec8f6caaba
+Create Date: 2026-10-17 13:05:27.640192
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1569dbfd418c'
+down_revision = 'e7ec8f6caaba'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    cache_generation = op.create_table('cache_generation',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('generation', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(cache_generation, [{'id': 1, 'generation': 0}])
+
+
+def downgrade():
+    op.drop_table('cache_generation')
@@ -0,0 +1,44 @@
+"""Add DESC NULLS LAST indexes for descending product sorts
+
+Revision ID: 19f97faf6e1a
+Revises: 3ad3314a610b
+Create Date: 2026-10-18 09:12:37.418203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '19f97faf6e1a'
+down_revision = '3ad3314a610b'
+branch_labels = None
+depends_on = None
+
+# (index name, filter column or None, sort column)
+INDEXES = [
+    ('ix_product_platform_current_price_desc', 'platform', 'current_price'),
+    ('ix_product_platform_last_updated_desc', 'platform', 'last_updated'),
+    ('ix_product_category_current_price_desc', 'category', 'current_price'),
+    ('ix_product_category_last_updated_desc', 'category', 'last_updated'),
+    ('ix_product_current_price_desc', None, 'current_price'),
+    ('ix_product_last_updated_desc', None, 'last_updated'),
+]
+
+
+def upgrade():
+    # SQLite sorts NULLs low, so it already walks the ascending indexes backwards
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, filter_column, sort_column in INDEXES:
+        columns = [sa.text(f'{sort_column} DESC NULLS LAST'), sa.text('id DESC')]
+        if filter_column:
+            columns.insert(0, sa.text(filter_column))
+        op.create_index(name, 'product', columns, unique=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='product')
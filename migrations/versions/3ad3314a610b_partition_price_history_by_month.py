@@ -0,0 +1,88 @@
+"""Partition price_history by month
+
+Revision ID: 3ad3314a610b
+Revises: a4d72a5c4439
+Create Date: 2026-10-17 22:31:48.204517
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3ad3314a610b'
+down_revision = 'a4d72a5c4439'
+branch_labels = None
+depends_on = None
+
+# Keep in step with HISTORY_PARTITION_MONTHS_AHEAD; the scheduler adds later months
+MONTHS_AHEAD = 3
+
+COLUMNS = 'id, product_id, price, "timestamp", valid_to, observed_count'
+
+
+def _add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _create_table(partitioned):
+    # The partition key has to be part of the primary key
+    op.execute(f"""
+        CREATE TABLE price_history (
+            id integer NOT NULL DEFAULT nextval('price_history_id_seq'),
+            product_id integer NOT NULL,
+            price double precision NOT NULL,
+            "timestamp" timestamp without time zone{' NOT NULL' if partitioned else ''},
+            valid_to timestamp without time zone,
+            observed_count integer NOT NULL DEFAULT 1,
+            CONSTRAINT price_history_pkey PRIMARY KEY ({'id, "timestamp"' if partitioned else 'id'}),
+            CONSTRAINT price_history_product_id_fkey FOREIGN KEY (product_id) REFERENCES product (id)
+        ){' PARTITION BY RANGE ("timestamp")' if partitioned else ''}
+    """)
+
+
+def _replace_table(partitioned):
+    op.execute('ALTER TABLE price_history RENAME TO price_history_old')
+    op.execute('ALTER TABLE price_history_old RENAME CONSTRAINT price_history_pkey TO price_history_old_pkey')
+    op.execute('ALTER TABLE price_history_old RENAME CONSTRAINT price_history_product_id_fkey '
+               'TO price_history_old_product_id_fkey')
+    op.execute('ALTER INDEX ix_price_history_product_id_timestamp RENAME TO ix_price_history_old_product_id_timestamp')
+    _create_table(partitioned)
+
+    if partitioned:
+        oldest = op.get_bind().execute(sa.text('SELECT min("timestamp") FROM price_history_old')).scalar()
+        now = datetime.utcnow()
+        month = datetime((oldest or now).year, (oldest or now).month, 1)
+        last = _add_months(datetime(now.year, now.month, 1), MONTHS_AHEAD)
+        while month <= last:
+            op.execute(f"CREATE TABLE price_history_p{month.year:04d}{month.month:02d} PARTITION OF price_history "
+                       f"FOR VALUES FROM ('{month}') TO ('{_add_months(month, 1)}')")
+            month = _add_months(month, 1)
+        op.execute('CREATE TABLE price_history_default PARTITION OF price_history DEFAULT')
+
+    op.execute(f'INSERT INTO price_history ({COLUMNS}) SELECT {COLUMNS} FROM price_history_old')
+    # Move the id sequence over before the old table (its owner) is dropped
+    op.execute('ALTER SEQUENCE price_history_id_seq OWNED BY price_history.id')
+    op.execute('DROP TABLE price_history_old')
+    op.create_index('ix_price_history_product_id_timestamp', 'price_history', ['product_id', 'timestamp'],
+                    unique=False)
+
+
+def upgrade():
+    op.execute('UPDATE price_history SET "timestamp" = CURRENT_TIMESTAMP WHERE "timestamp" IS NULL')
+    if op.get_bind().dialect.name == 'postgresql':
+        # Monthly range partitions; see app/partitions.py for upkeep and retention
+        _replace_table(partitioned=True)
+    else:
+        with op.batch_alter_table('price_history', schema=None) as batch_op:
+            batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        _replace_table(partitioned=False)
+    else:
+        with op.batch_alter_table('price_history', schema=None) as batch_op:
+            batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,38 @@
+"""Add materialized platform/category statistics
+
+Revision ID: 6161487e9214
+Revises: 6eceb2d2073e
+Create Date: 2026-10-17 15:02:13.418206
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6161487e9214'
+down_revision = '6eceb2d2073e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('product_stat',
+    sa.Column('dimension', sa.String(length=20), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('price_count', sa.Integer(), nullable=False),
+    sa.Column('price_sum', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('dimension', 'name')
+    )
+    for dimension in ('platform', 'category'):
+        op.execute(
+            "INSERT INTO product_stat (dimension, name, count, price_count, price_sum) "
+            f"SELECT '{dimension}', COALESCE({dimension}, ''), COUNT(id), COUNT(current_price), "
+            "COALESCE(SUM(current_price), 0) "
+            f"FROM product GROUP BY COALESCE({dimension}, '')"
+        )
+
+
+def downgrade():
+    op.drop_table('product_stat')
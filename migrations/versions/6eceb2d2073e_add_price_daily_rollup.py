@@ -0,0 +1,37 @@
+"""Add daily price rollup table
+
+Revision ID: 6eceb2d2073e
+Revises: 1569dbfd418c
+Create Date: 2026-10-17 14:22:51.907355
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6eceb2d2073e'
+down_revision = '1569dbfd418c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('price_daily',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('open', sa.Float(), nullable=False),
+    sa.Column('high', sa.Float(), nullable=False),
+    sa.Column('low', sa.Float(), nullable=False),
+    sa.Column('close', sa.Float(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('first_at', sa.DateTime(), nullable=False),
+    sa.Column('last_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('product_id', 'day')
+    )
+    # Populate from existing history with: python server/scripts/backfill_rollups.py
+
+
+def downgrade():
+    op.drop_table('price_daily')
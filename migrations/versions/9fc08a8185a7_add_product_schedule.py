@@ -0,0 +1,35 @@
+"""Add adaptive refresh schedule
+
+Revision ID: 9fc08a8185a7
+Revises: 6161487e9214
+Create Date: 2026-10-17 18:10:42.561930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9fc08a8185a7'
+down_revision = '6161487e9214'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('product_schedule',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('changes', sa.Float(), nullable=False),
+    sa.Column('hours', sa.Float(), nullable=False),
+    sa.Column('last_checked', sa.DateTime(), nullable=True),
+    sa.Column('next_due', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('product_id')
+    )
+    op.create_index('ix_product_schedule_next_due', 'product_schedule', ['next_due'], unique=False)
+    # Seed from existing history with: python server/scripts/scheduler.py --rebuild
+
+
+def downgrade():
+    op.drop_index('ix_product_schedule_next_due', table_name='product_schedule')
+    op.drop_table('product_schedule')
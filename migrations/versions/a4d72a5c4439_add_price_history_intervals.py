@@ -0,0 +1,31 @@
+"""Store price history as run-length intervals
+
+Revision ID: a4d72a5c4439
+Revises: cc829716f74b
+Create Date: 2026-10-17 21:14:05.902113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d72a5c4439'
+down_revision = 'cc829716f74b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows are single observations: valid_to stays NULL, observed_count 1.
+    # Merge them into intervals with: python server/scripts/compact_history.py
+    with op.batch_alter_table('price_history', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('valid_to', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('observed_count', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    # Compacted rows keep only their first observation
+    with op.batch_alter_table('price_history', schema=None) as batch_op:
+        batch_op.drop_column('observed_count')
+        batch_op.drop_column('valid_to')
@@ -0,0 +1,29 @@
+"""Add scrape journal offsets
+
+Revision ID: cc829716f74b
+Revises: 9fc08a8185a7
+Create Date: 2026-10-17 20:02:17.318406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cc829716f74b'
+down_revision = '9fc08a8185a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('journal_offset',
+    sa.Column('stream', sa.String(length=50), nullable=False),
+    sa.Column('segment', sa.Integer(), nullable=False),
+    sa.Column('position', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('stream')
+    )
+
+
+def downgrade():
+    op.drop_table('journal_offset')
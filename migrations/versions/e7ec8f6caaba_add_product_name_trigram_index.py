@@ -0,0 +1,29 @@
+"""Add trigram index for product name search
+
+Revision ID: e7ec8f6caaba
+Revises: f2df59f4a5d1
+Create Date: 2026-10-17 11:40:03.118547
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7ec8f6caaba'
+down_revision = 'f2df59f4a5d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index('ix_product_name_trgm', 'product', ['name'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    else:
+        op.create_index('ix_product_name_trgm', 'product', ['name'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_product_name_trgm', table_name='product')
@@ -0,0 +1,47 @@
+"""Add indexes for history, URL lookup and filtered sorts
+
+Revision ID: f2df59f4a5d1
+Revises: c19e83ae4d87
+Create Date: 2026-10-17 09:12:41.502318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2df59f4a5d1'
+down_revision = 'c19e83ae4d87'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Merge duplicate product URLs into the oldest row before enforcing uniqueness
+    op.execute("""
+        UPDATE price_history SET product_id = (
+            SELECT MIN(p2.id) FROM product p2
+            WHERE p2.url = (SELECT p1.url FROM product p1 WHERE p1.id = price_history.product_id)
+        )
+    """)
+    op.execute("DELETE FROM product WHERE id NOT IN (SELECT MIN(id) FROM product GROUP BY url)")
+
+    op.create_index('ix_product_url', 'product', ['url'], unique=True)
+    op.create_index('ix_price_history_product_id_timestamp', 'price_history', ['product_id', 'timestamp'], unique=False)
+    op.create_index('ix_product_platform_current_price', 'product', ['platform', 'current_price', 'id'], unique=False)
+    op.create_index('ix_product_platform_last_updated', 'product', ['platform', 'last_updated', 'id'], unique=False)
+    op.create_index('ix_product_category_current_price', 'product', ['category', 'current_price', 'id'], unique=False)
+    op.create_index('ix_product_category_last_updated', 'product', ['category', 'last_updated', 'id'], unique=False)
+    op.create_index('ix_product_current_price', 'product', ['current_price', 'id'], unique=False)
+    op.create_index('ix_product_last_updated', 'product', ['last_updated', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_product_last_updated', table_name='product')
+    op.drop_index('ix_product_current_price', table_name='product')
+    op.drop_index('ix_product_category_last_updated', table_name='product')
+    op.drop_index('ix_product_category_current_price', table_name='product')
+    op.drop_index('ix_product_platform_last_updated', table_name='product')
+    op.drop_index('ix_product_platform_current_price', table_name='product')
+    op.drop_index('ix_price_history_product_id_timestamp', table_name='price_history')
+    op.drop_index('ix_product_url', table_name='product')
@@ -8,14 +8,14 @@ from config import Config
 db = SQLAlchemy()
 migrate = Migrate()
 
-def create_app():
+def create_app(config_class=Config):
     # Get the absolute path to the frontend directory
     frontend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'frontenddir'))
     
     app = Flask(__name__, static_folder=frontend_dir)
     
     # Load configuration
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
     
     # Initialize extensions
     db.init_app(app)
@@ -1,12 +1,14 @@
-from flask import Blueprint, jsonify, request, render_template
-from app.models import Product, PriceHistory
-from app import db
-from datetime import datetime, timedelta
-from sqlalchemy import desc, func
-import plotly.graph_objects as go
-import plotly.utils
+from flask import Blueprint, jsonify, request, render_template, current_app, Response, stream_with_context
+from app.models import Product
+from app.history import recent_history, window_points, price_series, price_series_many
+from app.series import moving_average, summarize, isoformat, to_records
+from app.pagination import (paginate, apply_sort, apply_cursor, iter_chunks, encode_rank_cursor,
+                            decode_rank_cursor, InvalidCursor)
+from app.search import get_search_backend
+from app.cache import cached
+from app.figures import cached_figure
+from app.summary import read_stats
 import json
-import pandas as pd
 
 bp = Blueprint('api', __name__, template_folder='templates')
 
@@ -19,6 +21,8 @@ def index():
         "endpoints": {
             "products": "/api/v1/products",
             "product_detail": "/api/v1/products/<id>",
+            "product_summary": "/api/v1/products/<id>/detail",
+            "products_batch": "/api/v1/products/batch?ids=<id>,<id>",
             "search": "/api/v1/products/search",
             "price_history": "/api/v1/products/<id>/prices",
             "price_visualization": "/api/v1/products/<id>/visualization",
@@ -39,15 +43,73 @@ def index():
         }
     })
 
+def _page_size():
+    """Read the `limit` query parameter, clamped to the configured maximum"""
+    limit = request.args.get('limit', current_app.config['PAGE_SIZE'], type=int)
+    return max(1, min(limit, current_app.config['MAX_PAGE_SIZE']))
+
+def _wants_ohlc():
+    """Whether the caller opted in to daily OHLC rows with `ohlc=true`"""
+    return request.args.get('ohlc', 'false').lower() in ('true', '1', 't')
+
+def _serialize_listing(products):
+    """Format products for the listing endpoint, attaching recent price history"""
+    # Load price history for all products in one query
+    histories = recent_history([product.id for product in products], limit=30)
+    
+    return [{
+        'id': product.id,
+        'name': product.name,
+        'url': product.url,
+        'platform': product.platform,
+        'category': product.category,
+        'current_price': product.current_price,
+        'last_updated': product.last_updated.isoformat() if product.last_updated else None,
+        'price_history': histories[product.id]
+    } for product in products]
+
+def _stream(query, serialize, mode, head='[', tail=lambda count: ']'):
+    """Stream query results as a chunked JSON document or as NDJSON
+
+    Rows are read through a server-side cursor and serialized one chunk at
+    a time, so memory use stays flat regardless of result size.
+    """
+    def generate():
+        count = 0
+        if mode != 'ndjson':
+            yield head
+        for chunk in iter_chunks(query):
+            for item in serialize(chunk):
+                if mode == 'ndjson':
+                    yield json.dumps(item) + '\n'
+                else:
+                    yield (',' if count else '') + json.dumps(item)
+                count += 1
+        if mode != 'ndjson':
+            yield tail(count)
+    
+    mimetype = 'application/x-ndjson' if mode == 'ndjson' else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
 @bp.route('/products', methods=['GET'])
+@cached
 def get_products():
-    """Get all products with optional filtering"""
+    """Get products with optional filtering and keyset pagination
+    
+    Without `limit` or `after` every matching product is returned, and
+    `total` is the number of matches. With `limit`, one page is returned
+    (`total` counts that page); pass `after` with its `next_cursor` to
+    continue. Pass `stream=json` or `stream=ndjson` to stream every
+    matching product.
+    """
     try:
         # Get query parameters
         category = request.args.get('category')
         platform = request.args.get('platform')
         search = request.args.get('search')
         sort_by = request.args.get('sort')
+        after = request.args.get('after')
+        stream = request.args.get('stream')
         
         # Start with base query
         query = Product.query
@@ -58,44 +120,45 @@ def get_products():
         if platform:
             query = query.filter(Product.platform == platform)
         if search:
-            search_term = f"%{search}%"
-            query = query.filter(Product.name.ilike(search_term))
-            
-        # Apply sorting
-        if sort_by == 'price_low':
-            query = query.order_by(Product.current_price.asc())
-        elif sort_by == 'price_high':
-            query = query.order_by(Product.current_price.desc())
-        elif sort_by == 'latest':
-            query = query.order_by(Product.last_updated.desc())
+            query = get_search_backend().filter(query, search)
         
-        # Execute query
-        products = query.all()
+        if stream:
+            query = apply_sort(query, sort_by)
+            if after:
+                query = apply_cursor(query, sort_by, after)
+            return _stream(
+                query, _serialize_listing, stream,
+                head='{"success":true,"products":[',
+                tail=lambda count: f'],"total":{count}}}'
+            )
         
-        # Format response
-        response = []
-        for product in products:
-            # Get price history
-            price_history = PriceHistory.query.filter_by(product_id=product.id).order_by(PriceHistory.timestamp.desc()).limit(30).all()
-            history = [{'price': h.price, 'timestamp': h.timestamp.isoformat()} for h in price_history]
-            
-            response.append({
-                'id': product.id,
-                'name': product.name,
-                'url': product.url,
-                'platform': product.platform,
-                'category': product.category,
-                'current_price': product.current_price,
-                'last_updated': product.last_updated.isoformat(),
-                'price_history': history
+        if not (after or 'limit' in request.args):
+            # No page requested: the whole listing, serialized in chunks
+            query = apply_sort(query, sort_by)
+            response = [item for chunk in iter_chunks(query) for item in _serialize_listing(chunk)]
+            return jsonify({
+                'success': True,
+                'products': response,
+                'total': len(response),
+                'next_cursor': None
             })
         
+        # Fetch one page
+        products, next_cursor = paginate(query, sort_by, _page_size(), after)
+        response = _serialize_listing(products)
+        
         return jsonify({
             'success': True,
             'products': response,
-            'total': len(response)
+            'total': len(response),
+            'next_cursor': next_cursor
         })
         
+    except InvalidCursor as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -103,192 +166,198 @@ def get_products():
         }), 500
 
 @bp.route('/products/<int:product_id>', methods=['GET'])
+@cached
 def get_product(product_id):
     """Get a specific product with its price history"""
     product = Product.query.get_or_404(product_id)
     
     # Get price history for the last 30 days by default
     days = request.args.get('days', 30, type=int)
-    since = datetime.utcnow() - timedelta(days=days)
-    
-    # Get price history
-    price_history = PriceHistory.query.filter(
-        PriceHistory.product_id == product_id,
-        PriceHistory.timestamp >= since
-    ).order_by(PriceHistory.timestamp).all()
     
     return jsonify({
         **product.to_dict(),
-        'price_history': [ph.to_dict() for ph in price_history]
+        'price_history': window_points(product_id, days, _wants_ohlc())
+    })
+
+def _product_detail(product, timestamps, prices):
+    """Product, statistics and history with MA7 from one price series"""
+    if not len(prices):
+        return {'product': product.to_dict(), 'statistics': None, 'price_history': []}
+    return {
+        'product': product.to_dict(),
+        'statistics': summarize(prices),
+        'price_history': to_records(timestamps, prices, moving_average(prices, 7))
+    }
+
+@bp.route('/products/<int:product_id>/detail', methods=['GET'])
+@cached
+def get_product_detail(product_id):
+    """Get a product with its price history, 7-point moving average and statistics
+    
+    Replaces separate calls to /products/<id>, /prices and /visualization/data.
+    """
+    product = Product.query.get_or_404(product_id)
+    days = request.args.get('days', 30, type=int)
+    
+    timestamps, prices = price_series(product_id, days)
+    return jsonify(_product_detail(product, timestamps, prices))
+
+@bp.route('/products/batch', methods=['GET'])
+@cached
+def get_products_batch():
+    """Get details for several products at once, e.g. ?ids=1,2,3&days=30"""
+    try:
+        ids = []
+        for value in request.args.getlist('ids'):
+            ids.extend(int(part) for part in value.split(',') if part.strip())
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'ids must be a comma-separated list of integers'
+        }), 400
+    ids = list(dict.fromkeys(ids))
+    
+    if not ids:
+        return jsonify({'success': False, 'error': 'No product ids given'}), 400
+    if len(ids) > current_app.config['BATCH_MAX_IDS']:
+        return jsonify({
+            'success': False,
+            'error': f"At most {current_app.config['BATCH_MAX_IDS']} ids per request"
+        }), 400
+    
+    days = request.args.get('days', 30, type=int)
+    products = {p.id: p for p in Product.query.filter(Product.id.in_(ids)).all()}
+    series = price_series_many(list(products), days)
+    
+    return jsonify({
+        'success': True,
+        'products': [
+            _product_detail(products[i], *series[i])
+            for i in ids if i in products
+        ],
+        'missing': [i for i in ids if i not in products]
     })
 
 @bp.route('/products/search', methods=['GET'])
 def search_products():
-    """Search products by name or platform"""
+    """Search products by name or platform
+    
+    Every match is returned unless `limit` or `after` asks for one page;
+    the cursor for the next page is then returned in the `X-Next-Cursor`
+    header. A name query without `sort` is ranked by relevance, and its
+    pages follow the ranking.
+    """
     query = request.args.get('q', '')
     platform = request.args.get('platform', '')
+    sort_by = request.args.get('sort')
+    after = request.args.get('after')
+    stream = request.args.get('stream')
     
+    backend = get_search_backend()
     products = Product.query
     
     if query:
-        products = products.filter(Product.name.ilike(f'%{query}%'))
+        products = backend.filter(products, query)
     if platform:
         products = products.filter(Product.platform == platform)
     
-    products = products.all()
-    return jsonify([product.to_dict() for product in products])
+    try:
+        if query and not (sort_by or stream):
+            if not (after or 'limit' in request.args):
+                ranked, _ = backend.rank(products, query)
+                return jsonify([product.to_dict() for product in ranked])
+            ranked, last_key = backend.rank(products, query, _page_size(),
+                                            decode_rank_cursor(query, after) if after else None)
+            response = jsonify([product.to_dict() for product in ranked])
+            if last_key:
+                response.headers['X-Next-Cursor'] = encode_rank_cursor(query, last_key)
+            return response
+        
+        if stream:
+            products = apply_sort(products, sort_by)
+            if after:
+                products = apply_cursor(products, sort_by, after)
+            return _stream(products, lambda chunk: [p.to_dict() for p in chunk], stream)
+        
+        if not (after or 'limit' in request.args):
+            # No page requested: every match, read in chunks
+            products = apply_sort(products, sort_by)
+            return jsonify([product.to_dict() for chunk in iter_chunks(products) for product in chunk])
+        
+        products, next_cursor = paginate(products, sort_by, _page_size(), after)
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+    
+    response = jsonify([product.to_dict() for product in products])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @bp.route('/products/<int:product_id>/prices', methods=['GET'])
 def get_price_history(product_id):
-    """Get price history for a specific product"""
-    days = request.args.get('days', 30, type=int)
-    since = datetime.utcnow() - timedelta(days=days)
-    
-    price_history = PriceHistory.query.filter(
-        PriceHistory.product_id == product_id,
-        PriceHistory.timestamp >= since
-    ).order_by(PriceHistory.timestamp).all()
+    """Get price history for a specific product
     
-    return jsonify([ph.to_dict() for ph in price_history])
+    Windows longer than ROLLUP_THRESHOLD_DAYS return one point per day at
+    the daily close. Pass `ohlc=true` for daily open/high/low/close rows.
+    """
+    days = request.args.get('days', 30, type=int)
+    return jsonify(window_points(product_id, days, _wants_ohlc()))
 
 @bp.route('/products/<int:product_id>/visualization', methods=['GET'])
 def visualize_price_history(product_id):
     """Visualize price history for a specific product"""
     product = Product.query.get_or_404(product_id)
     days = request.args.get('days', 30, type=int)
-    since = datetime.utcnow() - timedelta(days=days)
     
-    # Get price history
-    price_history = PriceHistory.query.filter(
-        PriceHistory.product_id == product_id,
-        PriceHistory.timestamp >= since
-    ).order_by(PriceHistory.timestamp).all()
+    # Rendered figure, reused until the product's price changes
+    figure = cached_figure(product, days)
     
-    if not price_history:
+    if figure is None:
         return jsonify({"error": "No price history available"}), 404
     
-    # Convert to pandas DataFrame for easier manipulation
-    df = pd.DataFrame([
-        {'timestamp': ph.timestamp, 'price': ph.price}
-        for ph in price_history
-    ])
-    
-    # Calculate moving average
-    df['MA7'] = df['price'].rolling(window=7, min_periods=1).mean()
-    
-    # Create plotly figure
-    fig = go.Figure()
-    
-    # Add price line
-    fig.add_trace(go.Scatter(
-        x=df['timestamp'],
-        y=df['price'],
-        mode='lines+markers',
-        name='Price',
-        line=dict(color='#2196F3'),
-        hovertemplate='%{y:,.2f} KES<br>%{x}<extra></extra>'
-    ))
-    
-    # Add moving average line
-    fig.add_trace(go.Scatter(
-        x=df['timestamp'],
-        y=df['MA7'],
-        mode='lines',
-        name='7-day MA',
-        line=dict(color='#FF9800', dash='dash'),
-        hovertemplate='%{y:,.2f} KES<br>%{x}<extra></extra>'
-    ))
-    
-    # Calculate statistics
-    current_price = df['price'].iloc[-1]
-    min_price = df['price'].min()
-    max_price = df['price'].max()
-    avg_price = df['price'].mean()
-    
-    # Update layout
-    fig.update_layout(
-        title=f'Price History for {product.name}',
-        xaxis_title='Date',
-        yaxis_title='Price (KES)',
-        hovermode='x unified',
-        showlegend=True,
-        annotations=[
-            dict(
-                x=1.0,
-                y=1.05,
-                showarrow=False,
-                text=f'Current: {current_price:,.2f} KES<br>'
-                     f'Min: {min_price:,.2f} KES<br>'
-                     f'Max: {max_price:,.2f} KES<br>'
-                     f'Avg: {avg_price:,.2f} KES',
-                xref='paper',
-                yref='paper',
-                align='left',
-                bgcolor='rgba(255,255,255,0.8)',
-                bordercolor='#2196F3',
-                borderwidth=1,
-                borderpad=4
-            )
-        ]
-    )
-    
-    # Convert to JSON
-    graphJSON = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
-    
     return render_template(
         'visualization.html',
-        graphJSON=graphJSON,
-        product=product
+        title=f'Price History for {product.name}',
+        plot=figure['plot'],
+        days=days,
+        product=product,
+        **figure['statistics']
     )
 
 @bp.route('/products/<int:product_id>/visualization/data', methods=['GET'])
+@cached
 def get_visualization_data(product_id):
-    """Get price history data for visualization in JSON format"""
+    """Get price history data for visualization in JSON format
+    
+    Pass `format=columns` to get parallel timestamp/price/ma7 arrays
+    instead of one object per point.
+    """
     product = Product.query.get_or_404(product_id)
     days = request.args.get('days', 30, type=int)
-    since = datetime.utcnow() - timedelta(days=days)
     
-    # Get price history
-    price_history = PriceHistory.query.filter(
-        PriceHistory.product_id == product_id,
-        PriceHistory.timestamp >= since
-    ).order_by(PriceHistory.timestamp).all()
+    # Get price history as columns
+    timestamps, prices = price_series(product_id, days)
     
-    if not price_history:
+    if not len(prices):
         return jsonify({"error": "No price history available"}), 404
     
-    # Convert to pandas DataFrame
-    df = pd.DataFrame([
-        {'timestamp': ph.timestamp, 'price': ph.price}
-        for ph in price_history
-    ])
-    
-    # Calculate statistics
-    stats = {
-        'current_price': float(df['price'].iloc[-1]),
-        'min_price': float(df['price'].min()),
-        'max_price': float(df['price'].max()),
-        'avg_price': float(df['price'].mean()),
-        'price_change': float(df['price'].iloc[-1] - df['price'].iloc[0]),
-        'price_change_pct': float((df['price'].iloc[-1] / df['price'].iloc[0] - 1) * 100)
-    }
-    
-    # Calculate moving average
-    df['MA7'] = df['price'].rolling(window=7, min_periods=1).mean()
+    # Calculate statistics and moving average
+    stats = summarize(prices)
+    ma7 = moving_average(prices, 7)
     
     # Prepare data for response
     data = {
         'product': product.to_dict(),
-        'statistics': stats,
-        'price_history': [
-            {
-                'timestamp': row['timestamp'].isoformat(),
-                'price': float(row['price']),
-                'ma7': float(row['MA7'])
-            }
-            for _, row in df.iterrows()
-        ]
+        'statistics': stats
     }
+    if request.args.get('format') == 'columns':
+        data['columns'] = {
+            'timestamp': isoformat(timestamps),
+            'price': prices.tolist(),
+            'ma7': ma7.tolist()
+        }
+    else:
+        data['price_history'] = to_records(timestamps, prices, ma7)
     
     return jsonify(data)
 
@@ -330,37 +399,13 @@ def get_platforms():
         }), 500
 
 @bp.route('/stats', methods=['GET'])
+@cached
 def get_stats():
     """Get platform and category statistics"""
     try:
-        # Get counts by platform
-        platform_stats = db.session.query(
-            Product.platform,
-            func.count(Product.id).label('count'),
-            func.avg(Product.current_price).label('avg_price')
-        ).group_by(Product.platform).all()
-        
-        # Get counts by category
-        category_stats = db.session.query(
-            Product.category,
-            func.count(Product.id).label('count'),
-            func.avg(Product.current_price).label('avg_price')
-        ).group_by(Product.category).all()
-        
         return jsonify({
             'success': True,
-            'stats': {
-                'platforms': [{
-                    'name': stat.platform,
-                    'count': stat.count,
-                    'avg_price': float(stat.avg_price) if stat.avg_price else 0
-                } for stat in platform_stats],
-                'categories': [{
-                    'name': stat.category,
-                    'count': stat.count,
-                    'avg_price': float(stat.avg_price) if stat.avg_price else 0
-                } for stat in category_stats]
-            }
+            'stats': read_stats()
         })
     except Exception as e:
         return jsonify({
@@ -0,0 +1,183 @@
+import csv
+import gzip
+import io
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, Float, Integer, insert, select, text
+from app import db
+from app.models import Product, PriceHistory
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = parquet = None
+
+# In dependency order: price_history references product
+TABLES = {
+    'product': Product.__table__,
+    'price_history': PriceHistory.__table__,
+}
+
+# File extension for each format; csv.gz is CSV through gzip
+FORMATS = {'csv': 'csv', 'csv.gz': 'csv.gz', 'binary': 'bin', 'parquet': 'parquet'}
+
+CHUNK_ROWS = 50000
+
+def table_path(directory, name, file_format):
+    return f"{directory.rstrip('/')}/{name}.{FORMATS[file_format]}"
+
+def _is_postgres():
+    return db.engine.dialect.name == 'postgresql'
+
+def _columns(table):
+    return [column.name for column in table.columns]
+
+def _open(path, mode, file_format):
+    if file_format == 'csv.gz':
+        return gzip.open(path, mode + 'b', compresslevel=6)
+    return open(path, mode + 'b')
+
+def _copy(sql, f):
+    """Run COPY on the session's own psycopg2 connection, inside its transaction"""
+    cursor = db.session.connection().connection.driver_connection.cursor()
+    try:
+        cursor.copy_expert(sql, f, size=1024 * 1024)
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+def _copy_options(file_format):
+    return '(FORMAT binary)' if file_format == 'binary' else '(FORMAT csv, HEADER)'
+
+def _stream_rows(table):
+    """Rows of `table` in primary key order, fetched CHUNK_ROWS at a time"""
+    query = select(*table.columns).order_by(*table.primary_key.columns)
+    return db.session.execute(query, execution_options={'yield_per': CHUNK_ROWS})
+
+def _parse_value(column, value):
+    # CSV has no types: empty is NULL, the rest follows the column type
+    if value == '':
+        return None
+    if isinstance(column.type, (Integer, BigInteger)):
+        return int(value)
+    if isinstance(column.type, Float):
+        return float(value)
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    return value
+
+def _arrow_schema(table):
+    types = []
+    for column in table.columns:
+        if isinstance(column.type, (Integer, BigInteger)):
+            arrow_type = pyarrow.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pyarrow.float64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pyarrow.timestamp('us')
+        else:
+            arrow_type = pyarrow.string()
+        types.append(pyarrow.field(column.name, arrow_type, nullable=column.nullable))
+    return pyarrow.schema(types)
+
+def _chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def export_table(name, path, file_format='csv'):
+    """Stream one table to a file; returns the number of rows written
+
+    On PostgreSQL, csv and binary use COPY ... TO STDOUT straight into the
+    file. parquet (needs pyarrow) writes zstd-compressed row groups of
+    CHUNK_ROWS rows. Memory use is bounded by one chunk either way.
+    """
+    table = TABLES[name]
+    if file_format == 'parquet':
+        if parquet is None:
+            raise RuntimeError('The parquet format needs pyarrow installed')
+        schema = _arrow_schema(table)
+        written = 0
+        with parquet.ParquetWriter(path, schema, compression='zstd') as writer:
+            for chunk in _chunks(_stream_rows(table)):
+                writer.write_table(pyarrow.Table.from_pylist([row._asdict() for row in chunk], schema=schema))
+                written += len(chunk)
+        return written
+
+    if _is_postgres():
+        with _open(path, 'w', file_format) as f:
+            columns = ', '.join(_columns(table))
+            return _copy(f"COPY (SELECT {columns} FROM {name} ORDER BY id) TO STDOUT {_copy_options(file_format)}", f)
+    if file_format == 'binary':
+        raise RuntimeError('The binary format needs PostgreSQL COPY')
+
+    written = 0
+    with _open(path, 'w', file_format) as raw:
+        f = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+        writer = csv.writer(f)
+        writer.writerow(_columns(table))
+        for row in _stream_rows(table):
+            writer.writerow(['' if value is None else value for value in row])
+            written += 1
+        f.flush()
+        f.detach()
+    return written
+
+def _reset_sequence(name):
+    # Rows arrive with their ids, so move the id sequence past them
+    db.session.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), COALESCE(MAX(id), 1)) FROM {name}"
+    ))
+
+def _copy_chunk(name, columns, chunk):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(chunk)
+    buffer.seek(0)
+    return _copy(f"COPY {name} ({', '.join(columns)}) FROM STDIN (FORMAT csv)", buffer)
+
+def import_table(name, path, file_format='csv'):
+    """Load one table from a file made by export_table(); returns the number of rows loaded
+
+    Rows keep their ids, so the target table should not already hold them.
+    On PostgreSQL the file is streamed through COPY ... FROM STDIN (parquet
+    row groups are converted to CSV one chunk at a time); elsewhere rows
+    are inserted in executemany chunks. The caller commits.
+    """
+    table = TABLES[name]
+    columns = _columns(table)
+    loaded = 0
+
+    if file_format == 'parquet':
+        if parquet is None:
+            raise RuntimeError('The parquet format needs pyarrow installed')
+        for batch in parquet.ParquetFile(path).iter_batches(batch_size=CHUNK_ROWS, columns=columns):
+            rows = batch.to_pylist()
+            if _is_postgres():
+                _copy_chunk(name, columns, ([row[c] for c in columns] for row in rows))
+            else:
+                db.session.execute(insert(table), rows)
+            loaded += len(rows)
+    elif _is_postgres():
+        with _open(path, 'r', file_format) as f:
+            loaded = _copy(f"COPY {name} ({', '.join(columns)}) FROM STDIN {_copy_options(file_format)}", f)
+    else:
+        if file_format == 'binary':
+            raise RuntimeError('The binary format needs PostgreSQL COPY')
+        with _open(path, 'r', file_format) as raw:
+            reader = csv.reader(io.TextIOWrapper(raw, encoding='utf-8', newline=''))
+            header = next(reader)
+            by_name = {column.name: column for column in table.columns}
+            for chunk in _chunks(reader):
+                db.session.execute(insert(table), [
+                    {c: _parse_value(by_name[c], value) for c, value in zip(header, row)} for row in chunk
+                ])
+                loaded += len(chunk)
+
+    if _is_postgres():
+        _reset_sequence(name)
+    return loaded
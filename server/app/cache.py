@@ -0,0 +1,129 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, make_response, Response
+from app import db
+from app.models import CacheGeneration
+
+def bump_generation():
+    """Invalidate cached API responses in every web worker
+
+    Call from ingest code before committing, so the bump becomes visible
+    in the same transaction as the new data.
+    """
+    updated = db.session.query(CacheGeneration).filter_by(id=1).update(
+        {CacheGeneration.generation: CacheGeneration.generation + 1},
+        synchronize_session=False
+    )
+    if not updated:
+        db.session.add(CacheGeneration(id=1, generation=1))
+
+class ResponseCache:
+    """Bounded LRU cache of rendered responses with TTL expiry
+
+    Entries are tagged with the data generation they were rendered at. The
+    generation is read from the database at most every `poll_interval`
+    seconds, so between scrapes most requests never touch the database.
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, poll_interval=5):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self._generation = None
+        self._checked_at = 0
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self):
+        now = time.monotonic()
+        if self._generation is None or now - self._checked_at >= self.poll_interval:
+            row = db.session.get(CacheGeneration, 1)
+            generation = row.generation if row else 0
+            if generation != self._generation:
+                self.clear()
+            self._generation = generation
+            self._checked_at = now
+        return self._generation
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.monotonic() - entry['stored_at'] > self.ttl:
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, response):
+        body = response.get_data()
+        entry = {
+            'body': body,
+            'status': response.status_code,
+            'headers': [(k, v) for k, v in response.headers if k.lower() not in ('content-length', 'etag')],
+            'etag': hashlib.sha1(body).hexdigest(),
+            'stored_at': time.monotonic()
+        }
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+def get_response_cache():
+    """Return the response cache for the current app, or None when disabled"""
+    if current_app.config['RESPONSE_CACHE_SIZE'] <= 0:
+        return None
+    cache = current_app.extensions.get('response_cache')
+    if cache is None:
+        cache = ResponseCache(
+            max_entries=current_app.config['RESPONSE_CACHE_SIZE'],
+            ttl=current_app.config['RESPONSE_CACHE_TTL'],
+            poll_interval=current_app.config['CACHE_GENERATION_POLL']
+        )
+        current_app.extensions['response_cache'] = cache
+    return cache
+
+def _cache_key(kwargs):
+    args = tuple(sorted((k, tuple(sorted(v))) for k, v in request.args.lists()))
+    return (request.endpoint, tuple(sorted(kwargs.items())), args)
+
+def cached(view):
+    """Serve a GET view from the response cache, with ETag revalidation
+
+    Only complete 200 responses are stored; errors and streamed responses
+    always go to the view.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = get_response_cache()
+        if cache is None:
+            return view(*args, **kwargs)
+
+        cache.generation()
+        key = _cache_key(kwargs)
+        entry = cache.get(key)
+        state = 'HIT'
+        if entry is None:
+            state = 'MISS'
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            entry = cache.put(key, response)
+
+        response = Response(entry['body'], status=entry['status'], headers=entry['headers'])
+        response.set_etag(entry['etag'])
+        response.headers['X-Cache'] = state
+        return response.make_conditional(request)
+    return wrapper
@@ -0,0 +1,89 @@
+from sqlalchemy import bindparam
+from app import db
+from app.models import Product, PriceHistory
+from app.partitions import month_start
+
+def _runs(rows):
+    """Group consecutive (id, price, timestamp, valid_to, observed_count) rows of one product by price
+
+    A run never crosses a month boundary, so merged rows stay within one
+    price_history partition.
+    """
+    run = []
+    for row in rows:
+        if run and (row.price != run[-1].price or month_start(row.timestamp) != month_start(run[0].timestamp)):
+            yield run
+            run = []
+        run.append(row)
+    if run:
+        yield run
+
+def compact_product_rows(rows):
+    """Plan the merge of one product's history rows, oldest first
+
+    Each run of consecutive equal prices collapses into its first row,
+    which takes the run's last observation as valid_to and the sum of
+    its observation counts. Returns (updates, deleted ids).
+    """
+    updates, deleted = [], []
+    for run in _runs(rows):
+        if len(run) == 1:
+            continue
+        last = run[-1]
+        updates.append({
+            'b_id': run[0].id,
+            'b_valid_to': last.valid_to or last.timestamp,
+            'b_count': sum(row.observed_count or 1 for row in run)
+        })
+        deleted.extend(row.id for row in run[1:])
+    return updates, deleted
+
+def compact_history(product_ids=None, chunk=500):
+    """Merge repeated unchanged prices in PriceHistory into interval rows
+
+    Works through products `chunk` at a time, committing after each chunk,
+    so it can be interrupted safely. Each chunk's product rows are locked
+    first (SELECT ... FOR UPDATE), as apply_prices() locks them before
+    extending a newest history row, so a concurrent refresh waits instead
+    of having its observation deleted or overwritten.
+    Read paths return each interval's first and last observation, so API
+    results keep every price change at its exact time, with fewer points
+    across unchanged stretches. Returns (rows before, rows after).
+    """
+    table = PriceHistory.__table__
+    if product_ids is None:
+        product_ids = [product_id for product_id, in db.session.query(Product.id).order_by(Product.id)]
+    product_ids = list(product_ids)
+    before = after = 0
+
+    for start in range(0, len(product_ids), chunk):
+        ids = product_ids[start:start + chunk]
+        db.session.query(Product.id).filter(Product.id.in_(ids)).order_by(Product.id).with_for_update().all()
+        rows = db.session.query(
+            PriceHistory.id, PriceHistory.product_id, PriceHistory.price,
+            PriceHistory.timestamp, PriceHistory.valid_to, PriceHistory.observed_count
+        ).filter(PriceHistory.product_id.in_(ids)).order_by(
+            PriceHistory.product_id, PriceHistory.timestamp, PriceHistory.id
+        ).all()
+
+        updates, deleted = [], []
+        by_product = {}
+        for row in rows:
+            by_product.setdefault(row.product_id, []).append(row)
+        for product_rows in by_product.values():
+            product_updates, product_deleted = compact_product_rows(product_rows)
+            updates.extend(product_updates)
+            deleted.extend(product_deleted)
+
+        if updates:
+            db.session.execute(
+                table.update().where(table.c.id == bindparam('b_id')).values(
+                    valid_to=bindparam('b_valid_to'), observed_count=bindparam('b_count')),
+                updates
+            )
+            db.session.execute(table.delete().where(table.c.id == bindparam('b_id')),
+                               [{'b_id': row_id} for row_id in deleted])
+        db.session.commit()
+        before += len(rows)
+        after += len(rows) - len(deleted)
+    return before, after
@@ -0,0 +1,229 @@
+import glob
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from flask import current_app
+import plotly.graph_objects as go
+import plotly.utils
+from app.models import Product
+from app.history import price_series
+from app.series import moving_average, summarize
+
+def render_figure(product, days):
+    """Build the price history figure for a product
+
+    Returns {'plot': figure JSON, 'statistics': summary stats}, or None
+    when the product has no history in the window.
+    """
+    timestamps, prices = price_series(product.id, days)
+    if not len(prices):
+        return None
+
+    # Calculate moving average
+    ma7 = moving_average(prices, 7)
+
+    # Create plotly figure
+    fig = go.Figure()
+
+    # Add price line
+    fig.add_trace(go.Scatter(
+        x=timestamps,
+        y=prices,
+        mode='lines+markers',
+        name='Price',
+        line=dict(color='#2196F3'),
+        hovertemplate='%{y:,.2f} KES<br>%{x}<extra></extra>'
+    ))
+
+    # Add moving average line
+    fig.add_trace(go.Scatter(
+        x=timestamps,
+        y=ma7,
+        mode='lines',
+        name='7-day MA',
+        line=dict(color='#FF9800', dash='dash'),
+        hovertemplate='%{y:,.2f} KES<br>%{x}<extra></extra>'
+    ))
+
+    # Calculate statistics
+    stats = summarize(prices)
+
+    # Update layout
+    fig.update_layout(
+        title=f'Price History for {product.name}',
+        xaxis_title='Date',
+        yaxis_title='Price (KES)',
+        hovermode='x unified',
+        showlegend=True,
+        annotations=[
+            dict(
+                x=1.0,
+                y=1.05,
+                showarrow=False,
+                text=f"Current: {stats['current_price']:,.2f} KES<br>"
+                     f"Min: {stats['min_price']:,.2f} KES<br>"
+                     f"Max: {stats['max_price']:,.2f} KES<br>"
+                     f"Avg: {stats['avg_price']:,.2f} KES",
+                xref='paper',
+                yref='paper',
+                align='left',
+                bgcolor='rgba(255,255,255,0.8)',
+                bordercolor='#2196F3',
+                borderwidth=1,
+                borderpad=4
+            )
+        ]
+    )
+
+    # Convert to JSON
+    return {
+        'plot': json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder),
+        'statistics': stats
+    }
+
+class FigureCache:
+    """Bounded LRU cache of rendered figures, optionally mirrored to disk
+
+    Keys are (product_id, days, product.last_updated), so a figure is
+    reused until the product's price changes. With a directory, figures
+    survive restarts and can be pre-warmed by the scraper process; view
+    counts are also flushed there so pre-warming knows what is popular.
+    """
+
+    def __init__(self, max_entries=256, directory=None, flush_every=50):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.flush_every = flush_every
+        self.entries = OrderedDict()
+        self.views = Counter()
+        self.unflushed = 0
+        self.lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(product, days):
+        stamp = product.last_updated.strftime('%Y%m%dT%H%M%S%f') if product.last_updated else 'never'
+        return (product.id, days, stamp)
+
+    def _path(self, key):
+        return os.path.join(self.directory, '{}-{}-{}.json'.format(*key))
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        if self.directory:
+            try:
+                with open(self._path(key)) as f:
+                    figure = json.load(f)
+            except (OSError, ValueError):
+                return None
+            self._remember(key, figure)
+            return figure
+        return None
+
+    def put(self, key, figure):
+        self._remember(key, figure)
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(figure, f)
+        os.replace(tmp_path, path)
+        # Drop figures rendered for older versions of the same product/window
+        for old in glob.glob(os.path.join(self.directory, f'{key[0]}-{key[1]}-*.json')):
+            if old != path:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+    def _remember(self, key, figure):
+        with self.lock:
+            self.entries[key] = figure
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def record_view(self, product_id):
+        with self.lock:
+            self.views[product_id] += 1
+            self.unflushed += 1
+            if not self.directory or self.unflushed < self.flush_every:
+                return
+            self.unflushed = 0
+            counts = dict(self.views)
+        path = os.path.join(self.directory, f'views-{os.getpid()}.json')
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(counts, f)
+        os.replace(f'{path}.tmp', path)
+
+    def top_viewed(self, limit, max_age=7 * 24 * 3600):
+        """Most viewed product ids across all processes sharing the directory"""
+        totals = Counter(self.views)
+        if self.directory:
+            for path in glob.glob(os.path.join(self.directory, 'views-*.json')):
+                try:
+                    if time.time() - os.path.getmtime(path) > max_age:
+                        os.remove(path)
+                        continue
+                    if path.endswith(f'views-{os.getpid()}.json'):
+                        continue
+                    with open(path) as f:
+                        totals.update({int(k): v for k, v in json.load(f).items()})
+                except (OSError, ValueError):
+                    continue
+        return [product_id for product_id, _ in totals.most_common(limit)]
+
+def get_figure_cache():
+    """Return the figure cache for the current app"""
+    cache = current_app.extensions.get('figure_cache')
+    if cache is None:
+        cache = FigureCache(
+            max_entries=current_app.config['FIGURE_CACHE_SIZE'],
+            directory=current_app.config['FIGURE_CACHE_DIR']
+        )
+        current_app.extensions['figure_cache'] = cache
+    return cache
+
+def cached_figure(product, days):
+    """Rendered figure and statistics for a product, from the cache when possible"""
+    cache = get_figure_cache()
+    cache.record_view(product.id)
+    key = cache.key(product, days)
+    figure = cache.get(key)
+    if figure is None:
+        figure = render_figure(product, days)
+        if figure is not None:
+            cache.put(key, figure)
+    return figure
+
+def prewarm(limit=None, days=30):
+    """Render figures for the most viewed products ahead of time
+
+    Meant to run right after a scrape commits. Only useful with
+    FIGURE_CACHE_DIR set, since the web workers read the rendered files
+    from there. Returns the number of figures rendered.
+    """
+    cache = get_figure_cache()
+    if not cache.directory:
+        return 0
+    limit = limit or current_app.config['FIGURE_PREWARM_COUNT']
+    rendered = 0
+    for product_id in cache.top_viewed(limit):
+        product = Product.query.get(product_id)
+        if product is None:
+            continue
+        key = cache.key(product, days)
+        if cache.get(key) is not None:
+            continue
+        figure = render_figure(product, days)
+        if figure is not None:
+            cache.put(key, figure)
+            rendered += 1
+    return rendered
@@ -0,0 +1,267 @@
+import math
+import random
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import DateTime, case, func, literal, select
+from app import db
+from app.models import Product, PriceHistory, ProductSchedule
+from app.history import interval_overlaps
+from app.refresh import refresh_prices
+
+# Prior belief for products with little history: one change per day
+PRIOR_CHANGES = 0.5
+PRIOR_HOURS = 12.0
+# Weight kept by older observations at each new check
+DECAY = 0.95
+
+def change_rate(changes, hours):
+    """Estimated price changes per hour"""
+    return (changes + PRIOR_CHANGES) / (hours + PRIOR_HOURS)
+
+def interval_for(rate):
+    """Hours until the next check, aiming for SCHEDULE_TARGET_CHANGES expected changes"""
+    config = current_app.config
+    hours = config['SCHEDULE_TARGET_CHANGES'] / rate
+    return min(max(hours, config['SCHEDULE_MIN_INTERVAL']), config['SCHEDULE_MAX_INTERVAL'])
+
+def _hours(delta):
+    return max(delta.total_seconds(), 0) / 3600
+
+def rebuild_schedule(days=30):
+    """Recompute every product's change rate and next check from recent PriceHistory
+
+    Returns the number of products scheduled.
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    previous = func.lag(PriceHistory.price).over(
+        partition_by=PriceHistory.product_id, order_by=PriceHistory.timestamp
+    )
+    # A compacted row spans timestamp..valid_to at one price, so the
+    # changes are still the price steps between consecutive rows
+    points = select(
+        PriceHistory.product_id,
+        PriceHistory.timestamp,
+        func.coalesce(PriceHistory.valid_to, PriceHistory.timestamp).label('valid_to'),
+        case((previous.isnot(None) & (previous != PriceHistory.price), 1), else_=0).label('changed')
+    ).where(interval_overlaps(since)).subquery()
+    rows = db.session.execute(select(
+        points.c.product_id,
+        func.sum(points.c.changed),
+        func.min(points.c.timestamp),
+        func.max(points.c.valid_to)
+    ).group_by(points.c.product_id)).all()
+
+    db.session.query(ProductSchedule).delete()
+    db.session.execute(ProductSchedule.__table__.insert(), [{
+        'product_id': product_id,
+        'changes': float(changes),
+        'hours': _hours(last - first),
+        'last_checked': last,
+        'next_due': last + timedelta(hours=interval_for(change_rate(changes, _hours(last - first))))
+    } for product_id, changes, first, last in rows])
+    return len(rows)
+
+def _hours_since(column, now):
+    """SQL expression for the hours between `column` and `now`, or None on unsupported dialects"""
+    now = literal(now, DateTime)
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return func.extract('epoch', now - column) / 3600.0
+    if dialect == 'sqlite':
+        return (func.julianday(now) - func.julianday(column)) * 24.0
+    return None
+
+def _rank_in_python(rows, now, budget):
+    ranked = []
+    for product_id, checked, changes, hours in rows:
+        if checked is None:
+            priority = math.inf
+        else:
+            priority = change_rate(changes, hours) * _hours(now - checked)
+        ranked.append((priority, product_id))
+    ranked.sort(key=lambda item: (-item[0], item[1]))
+    return [product_id for _, product_id in ranked[:budget]]
+
+def due_products(now, budget):
+    """Ids of up to `budget` due products, most likely to have changed first
+
+    Products without a schedule come first, then scheduled products past
+    their next_due, ranked by the expected number of changes missed since
+    the last check. The ranking runs in SQL with a LIMIT, so only the
+    rows the next_due index selects are considered and only `budget` ids
+    are loaded.
+    """
+    unscheduled = db.session.scalars(
+        select(Product.id).where(
+            ~select(ProductSchedule.product_id).where(ProductSchedule.product_id == Product.id).exists()
+        ).order_by(Product.id).limit(budget)
+    ).all()
+    remaining = budget - len(unscheduled)
+    if remaining <= 0:
+        return unscheduled
+
+    checked = func.coalesce(ProductSchedule.last_checked, Product.last_updated)
+    def due(*columns):
+        return select(*columns).join(Product, Product.id == ProductSchedule.product_id).where(
+            ProductSchedule.next_due <= now
+        )
+
+    elapsed = _hours_since(checked, now)
+    if elapsed is None:
+        rows = db.session.execute(due(
+            ProductSchedule.product_id, checked, ProductSchedule.changes, ProductSchedule.hours
+        ))
+        return unscheduled + _rank_in_python(rows, now, remaining)
+    rate = (ProductSchedule.changes + PRIOR_CHANGES) / (ProductSchedule.hours + PRIOR_HOURS)
+    # Never successfully checked sorts first, like an infinite priority
+    ranked = due(ProductSchedule.product_id).order_by(
+        checked.isnot(None), (rate * elapsed).desc(), ProductSchedule.product_id
+    ).limit(remaining)
+    return unscheduled + list(db.session.scalars(ranked))
+
+def _fresh_probabilities(product_ids, now):
+    """Probability that each product's stored price is still current at `now`"""
+    probabilities = {}
+    for start in range(0, len(product_ids), 500):
+        rows = db.session.query(
+            Product.id, Product.last_updated,
+            ProductSchedule.changes, ProductSchedule.hours, ProductSchedule.last_checked
+        ).outerjoin(ProductSchedule, ProductSchedule.product_id == Product.id).filter(
+            Product.id.in_(product_ids[start:start + 500])
+        )
+        for product_id, last_updated, changes, hours, last_checked in rows:
+            checked = last_checked or last_updated
+            probabilities[product_id] = 0.0 if checked is None else math.exp(
+                -change_rate(changes or 0.0, hours or 0.0) * _hours(now - checked)
+            )
+    return probabilities
+
+def freshness(now, sample=None):
+    """Mean probability, across the catalog, that a product's stored price is still current
+
+    Estimated from `sample` products picked at random by id (default
+    FRESHNESS_SAMPLE); catalogs no larger than the sample are measured
+    exactly.
+    """
+    sample = sample or current_app.config['FRESHNESS_SAMPLE']
+    max_id = db.session.query(func.max(Product.id)).scalar()
+    if max_id is None:
+        return 1.0
+    if max_id <= sample:
+        product_ids = list(range(1, max_id + 1))
+    else:
+        product_ids = sorted(random.sample(range(1, max_id + 1), sample))
+    probabilities = _fresh_probabilities(product_ids, now)
+    return sum(probabilities.values()) / len(probabilities) if probabilities else 1.0
+
+def record_checks(outcomes, before, after, now):
+    """Fold one refresh's results into the schedule; returns the number of price changes seen
+
+    `outcomes` maps product id to 'updated', 'unchanged' or 'failed';
+    `before` and `after` map product id to current_price around the run.
+    """
+    config = current_app.config
+    ids = sorted(outcomes)
+    rows = {}
+    for start in range(0, len(ids), 500):
+        for row in ProductSchedule.query.filter(ProductSchedule.product_id.in_(ids[start:start + 500])):
+            rows[row.product_id] = row
+
+    changes = 0
+    for product_id in ids:
+        row = rows.get(product_id)
+        if row is None:
+            row = ProductSchedule(product_id=product_id, changes=0.0, hours=0.0)
+            db.session.add(row)
+        if outcomes[product_id] == 'failed':
+            # Try again soon without learning anything about the product
+            row.next_due = now + timedelta(hours=config['SCHEDULE_MIN_INTERVAL'])
+            continue
+        changed = outcomes[product_id] == 'updated' and before.get(product_id) != after.get(product_id)
+        changes += changed
+        elapsed = _hours(now - row.last_checked) if row.last_checked else 0.0
+        row.changes = row.changes * DECAY + changed
+        row.hours = row.hours * DECAY + elapsed
+        row.last_checked = now
+        row.next_due = now + timedelta(hours=interval_for(change_rate(row.changes, row.hours)))
+    return changes
+
+def journal_checks(journal, outcomes, before, checked_at):
+    """Append one tick's check outcomes to the scrape journal, after the prices they cover"""
+    for product_id, outcome in outcomes.items():
+        journal.append({'type': 'check', 'product_id': product_id, 'outcome': outcome,
+                        'before': before.get(product_id), 'at': checked_at.isoformat()})
+    journal.sync()
+
+def apply_checks(records):
+    """Fold journaled check records into the schedule, once their prices are applied
+
+    Called by the ingest worker; returns the number of price changes seen.
+    """
+    ticks = {}
+    for record in records:
+        ticks.setdefault(record['at'], []).append(record)
+    changes = 0
+    for at, tick in ticks.items():
+        outcomes = {record['product_id']: record['outcome'] for record in tick}
+        before = {record['product_id']: record['before'] for record in tick}
+        changes += record_checks(outcomes, before, _prices(sorted(outcomes)), datetime.fromisoformat(at))
+    return changes
+
+def _prices(product_ids):
+    prices = {}
+    for start in range(0, len(product_ids), 500):
+        prices.update(db.session.query(Product.id, Product.current_price).filter(
+            Product.id.in_(product_ids[start:start + 500])
+        ))
+    return prices
+
+async def refresh_due(scrapers, budget=None, fetch_cache=None, state_file=None, journal=None):
+    """Spend one tick's request budget on the products most likely to have changed
+
+    Returns run metrics: requests, changes found, changes per request, and
+    catalog freshness before and after with the gain per request.
+
+    With a journal, the prices and then the check outcomes are journaled
+    and the ingest worker updates the schedule as it applies them, so the
+    metrics only count requests ('journaled' is set). Until the worker
+    catches up the products stay due and a later tick may check them again.
+    """
+    budget = budget or current_app.config['SCHEDULE_REQUEST_BUDGET']
+    now = datetime.utcnow()
+    product_ids = due_products(now, budget)
+    freshness_before = freshness(now)
+    metrics = {'requests': 0, 'changes': 0, 'changes_per_request': 0.0,
+               'freshness_before': freshness_before, 'freshness_after': freshness_before,
+               'freshness_per_request': 0.0, 'journaled': journal is not None}
+    if not product_ids:
+        return metrics
+
+    before = _prices(product_ids)
+    fresh_before = _fresh_probabilities(product_ids, now)
+    progress = await refresh_prices(scrapers, fetch_cache=fetch_cache, state_file=state_file,
+                                    product_ids=product_ids, journal=journal)
+    if journal is not None:
+        journal_checks(journal, progress.outcomes, before, datetime.utcnow())
+        metrics['requests'] = len(progress.outcomes)
+        return metrics
+    db.session.expire_all()
+    after = _prices(product_ids)
+    checked_at = datetime.utcnow()
+    changes = record_checks(progress.outcomes, before, after, checked_at)
+    db.session.commit()
+
+    requests = len(progress.outcomes)
+    # Only the checked products moved, so apply their change to the estimate instead of measuring again
+    fresh_after = _fresh_probabilities(product_ids, checked_at)
+    catalog = db.session.query(func.count(Product.id)).scalar()
+    gain = sum(fresh_after[product_id] - fresh_before.get(product_id, 0.0) for product_id in fresh_after)
+    freshness_after = min(freshness_before + gain / catalog, 1.0) if catalog else freshness_before
+    metrics.update({
+        'requests': requests,
+        'changes': changes,
+        'changes_per_request': changes / requests if requests else 0.0,
+        'freshness_after': freshness_after,
+        'freshness_per_request': (freshness_after - freshness_before) / requests if requests else 0.0
+    })
+    return metrics
@@ -0,0 +1,278 @@
+from datetime import datetime, timedelta
+import numpy as np
+from flask import current_app
+from sqlalchemy import func, select, cast, and_, BigInteger
+from app import db
+from app.models import PriceHistory, PriceDaily
+from app.partitions import month_start
+
+def recent_history(product_ids, limit=30):
+    """Get the last `limit` price points for many products in one query
+
+    Returns a dict mapping product id to a list of
+    {'price', 'timestamp'} dicts, newest first. Products without
+    history map to an empty list.
+    """
+    product_ids = list(product_ids)
+    history = {product_id: [] for product_id in product_ids}
+    if not product_ids:
+        return history
+
+    # Rank each product's rows by recency and keep the top `limit`; each
+    # row holds at least one point, so that is enough to fill the limit
+    ranked = db.session.query(
+        PriceHistory.product_id.label('product_id'),
+        PriceHistory.price.label('price'),
+        PriceHistory.timestamp.label('timestamp'),
+        PriceHistory.valid_to.label('valid_to'),
+        PriceHistory.observed_count.label('observed_count'),
+        func.row_number().over(
+            partition_by=PriceHistory.product_id,
+            order_by=(PriceHistory.timestamp.desc(), PriceHistory.id.desc())
+        ).label('rn')
+    ).filter(PriceHistory.product_id.in_(product_ids)).subquery()
+
+    rows = db.session.query(
+        ranked.c.product_id,
+        ranked.c.price,
+        ranked.c.timestamp,
+        ranked.c.valid_to,
+        ranked.c.observed_count
+    ).filter(ranked.c.rn <= limit).order_by(ranked.c.product_id, ranked.c.rn).all()
+
+    for row in rows:
+        points = history[row.product_id]
+        for timestamp in reversed(observations(row)):
+            if len(points) < limit:
+                points.append(_point(row.price, timestamp))
+    return history
+
+def history_since(product_ids, since):
+    """Get all price points newer than `since` for many products in one query
+
+    Returns a dict mapping product id to a list of
+    {'price', 'timestamp'} dicts, oldest first.
+    """
+    product_ids = list(product_ids)
+    history = {product_id: [] for product_id in product_ids}
+    if not product_ids:
+        return history
+
+    rows = db.session.query(
+        PriceHistory.product_id,
+        PriceHistory.price,
+        PriceHistory.timestamp,
+        PriceHistory.valid_to,
+        PriceHistory.observed_count
+    ).filter(
+        PriceHistory.product_id.in_(product_ids),
+        interval_overlaps(since)
+    ).order_by(PriceHistory.product_id, PriceHistory.timestamp).all()
+
+    for row in rows:
+        history[row.product_id].extend(
+            _point(row.price, timestamp) for timestamp in observations(row) if timestamp >= since
+        )
+    return history
+
+def interval_overlaps(since):
+    """Filter for PriceHistory rows with observations at or after `since`
+
+    Intervals never cross a month boundary, so the bound on timestamp is
+    exact and lets PostgreSQL skip the monthly partitions before `since`.
+    """
+    return and_(
+        PriceHistory.timestamp >= month_start(since),
+        func.coalesce(PriceHistory.valid_to, PriceHistory.timestamp) >= since
+    )
+
+def observations(row):
+    """Known observation times of one PriceHistory row, oldest first
+
+    A compacted row stands for observed_count observations at one price
+    from valid_from to valid_to, but only the first and last times are
+    stored, so those two are all it yields. Every price change still
+    appears at its exact time; unchanged stretches just have fewer points.
+    """
+    if (row.observed_count or 1) == 1 or row.valid_to is None or row.valid_to == row.timestamp:
+        return [row.timestamp]
+    return [row.timestamp, row.valid_to]
+
+def history_points(product_id, since):
+    """A product's raw price history since `since` as {'product_id', 'price', 'timestamp'} dicts, oldest first
+
+    Compacted interval rows give their first and last observations (see
+    observations()).
+    """
+    rows = PriceHistory.query.filter(
+        PriceHistory.product_id == product_id,
+        interval_overlaps(since)
+    ).order_by(PriceHistory.timestamp).all()
+    return [
+        {'product_id': row.product_id, 'price': row.price, 'timestamp': timestamp.isoformat()}
+        for row in rows for timestamp in observations(row) if timestamp >= since
+    ]
+
+def uses_rollup(days):
+    """Whether a `days` window is long enough to be served from price_daily"""
+    return days > current_app.config['ROLLUP_THRESHOLD_DAYS']
+
+def daily_history(product_id, days):
+    """Get daily rollup rows for the last `days` days, oldest first"""
+    since = (datetime.utcnow() - timedelta(days=days)).date()
+    return PriceDaily.query.filter(
+        PriceDaily.product_id == product_id,
+        PriceDaily.day >= since
+    ).order_by(PriceDaily.day).all()
+
+def daily_points(product_id, days):
+    """Daily closes for the last `days` days in the same point shape as history_points()"""
+    return [
+        {'product_id': row.product_id, 'price': row.close, 'timestamp': row.last_at.isoformat()}
+        for row in daily_history(product_id, days)
+    ]
+
+def window_points(product_id, days, ohlc=False):
+    """A product's price history for an API response, oldest first
+
+    Always {'price', 'timestamp'} points: every observation for short
+    windows, one daily close beyond ROLLUP_THRESHOLD_DAYS. With `ohlc`,
+    the daily open/high/low/close rows instead, for any window.
+    """
+    if ohlc:
+        return [row.to_dict() for row in daily_history(product_id, days)]
+    if uses_rollup(days):
+        return daily_points(product_id, days)
+    return history_points(product_id, datetime.utcnow() - timedelta(days=days))
+
+def _epoch_us(column):
+    """SQL expression for a naive UTC timestamp as integer microseconds since the epoch
+
+    Lets the driver hand back plain integers instead of building a datetime
+    object per row. Returns None for dialects without a known expression.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return cast(func.extract('epoch', column) * 1000000, BigInteger)
+    if dialect == 'sqlite':
+        # Stored as 'YYYY-MM-DD HH:MM:SS[.ffffff]'
+        seconds = cast(func.strftime('%s', column), BigInteger)
+        micros = cast(func.substr(column, 21, 6), BigInteger)
+        return seconds * 1000000 + micros
+    return None
+
+def _read_series(product_ids, days):
+    """Run one Core query for several products' price series
+
+    Returns (product ids, timestamps, prices) arrays ordered by product and
+    time, or None when there are no rows.
+    """
+    if uses_rollup(days):
+        product_column, time_column, price_column, order_column = (
+            PriceDaily.product_id, PriceDaily.last_at, PriceDaily.close, PriceDaily.day)
+        since = (datetime.utcnow() - timedelta(days=days)).date()
+    else:
+        return _read_raw_series(product_ids, datetime.utcnow() - timedelta(days=days))
+
+    epoch = _epoch_us(time_column)
+    stmt = select(
+        product_column,
+        time_column if epoch is None else epoch,
+        price_column
+    ).where(
+        product_column.in_(product_ids),
+        order_column >= since
+    ).order_by(product_column, order_column)
+    rows = db.session.connection().execute(stmt).all()
+    if not rows:
+        return None
+
+    ids, times, prices = zip(*rows)
+    return np.array(ids, dtype=np.int64), _as_datetime64(times, epoch is None), np.array(prices, dtype=np.float64)
+
+def _as_datetime64(times, from_datetimes):
+    if from_datetimes:
+        return np.array(times, dtype='datetime64[us]')
+    return np.array(times, dtype=np.int64).view('datetime64[us]')
+
+def _read_raw_series(product_ids, since):
+    """Raw observations since `since`, with compacted intervals expanded in NumPy
+
+    Same contract as _read_series(); like observations(), an interval
+    gives its first and last observation.
+    """
+    valid_to = func.coalesce(PriceHistory.valid_to, PriceHistory.timestamp)
+    start_epoch, end_epoch = _epoch_us(PriceHistory.timestamp), _epoch_us(valid_to)
+    from_datetimes = start_epoch is None
+    stmt = select(
+        PriceHistory.product_id,
+        PriceHistory.timestamp if from_datetimes else start_epoch,
+        valid_to if from_datetimes else end_epoch,
+        PriceHistory.observed_count,
+        PriceHistory.price
+    ).where(
+        PriceHistory.product_id.in_(product_ids),
+        interval_overlaps(since)
+    ).order_by(PriceHistory.product_id, PriceHistory.timestamp)
+    rows = db.session.connection().execute(stmt).all()
+    if not rows:
+        return None
+
+    ids, starts, ends, counts, prices = zip(*rows)
+    starts = _as_datetime64(starts, from_datetimes).view(np.int64)
+    ends = _as_datetime64(ends, from_datetimes).view(np.int64)
+    # One point per row, two for an interval: its start, then its end
+    points = np.where((np.array(counts, dtype=np.int64) > 1) & (ends > starts), 2, 1)
+    row_of_point = np.repeat(np.arange(len(points)), points)
+    is_end = np.arange(len(row_of_point)) - np.repeat(np.cumsum(points) - points, points) == 1
+    times = np.where(is_end, ends[row_of_point], starts[row_of_point])
+
+    keep = times >= np.datetime64(since, 'us').astype(np.int64)
+    return (
+        np.array(ids, dtype=np.int64)[row_of_point][keep],
+        times[keep].view('datetime64[us]'),
+        np.array(prices, dtype=np.float64)[row_of_point][keep]
+    )
+
+def _empty_series():
+    return np.empty(0, dtype='datetime64[us]'), np.empty(0)
+
+def price_series(product_id, days):
+    """Get the last `days` days of a product's prices as two arrays, oldest first
+
+    Returns (timestamps, prices) as datetime64[us] and float64 NumPy arrays,
+    read with a Core query without building ORM objects. Windows longer
+    than ROLLUP_THRESHOLD_DAYS are served from the daily rollup (one close
+    per day) instead of every raw observation.
+    """
+    result = _read_series([product_id], days)
+    if result is None:
+        return _empty_series()
+    return result[1], result[2]
+
+def price_series_many(product_ids, days):
+    """Like price_series() for many products, with a single query
+
+    Returns a dict mapping each product id to its (timestamps, prices).
+    """
+    product_ids = list(product_ids)
+    series = {product_id: _empty_series() for product_id in product_ids}
+    if not product_ids:
+        return series
+    result = _read_series(product_ids, days)
+    if result is None:
+        return series
+
+    ids, timestamps, prices = result
+    # Rows are grouped by product; split at each id boundary
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    ends = np.r_[starts[1:], len(ids)]
+    for start, end in zip(starts, ends):
+        series[int(ids[start])] = (timestamps[start:end], prices[start:end])
+    return series
+
+def _point(price, timestamp):
+    return {
+        'price': price,
+        'timestamp': timestamp.isoformat() if timestamp else None
+    }
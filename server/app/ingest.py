@@ -0,0 +1,132 @@
+from datetime import datetime
+from sqlalchemy import bindparam, insert, select, update
+from app import db
+from app.models import Product, PriceHistory
+from app.rollup import record_prices
+from app.summary import StatsDelta
+
+def _upsert(rows):
+    """INSERT ... ON CONFLICT (url) DO UPDATE; returns {url: id}
+
+    Executed as one executemany: SQLAlchemy's insertmanyvalues turns it
+    into multi-row VALUES statements with a cached compiled form.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return _insert_or_update(rows)
+
+    stmt = dialect_insert(Product.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['url'],
+        set_={
+            'name': stmt.excluded.name,
+            'current_price': stmt.excluded.current_price,
+            'last_updated': stmt.excluded.last_updated
+        }
+    ).returning(Product.__table__.c.id, Product.__table__.c.url)
+    return {url: product_id for product_id, url in db.session.execute(stmt, rows)}
+
+def _insert_or_update(rows):
+    # Portable fallback without ON CONFLICT: urls were resolved just before
+    existing = dict(db.session.execute(
+        select(Product.url, Product.id).where(Product.url.in_([row['url'] for row in rows]))
+    ).all())
+    new = [row for row in rows if row['url'] not in existing]
+    changed = [dict(row, b_url=row['url']) for row in rows if row['url'] in existing]
+    if new:
+        db.session.execute(insert(Product.__table__), new)
+    if changed:
+        db.session.execute(
+            update(Product.__table__).where(Product.url == bindparam('b_url')).values(
+                name=bindparam('name'),
+                current_price=bindparam('current_price'),
+                last_updated=bindparam('last_updated')
+            ),
+            changed
+        )
+    return dict(db.session.execute(
+        select(Product.url, Product.id).where(Product.url.in_([row['url'] for row in rows]))
+    ).all())
+
+def ingest_batch(records, timestamp=None):
+    """Upsert one batch of scraped records and append their price history
+
+    Existing products are resolved with a single query on the batch's URLs;
+    new and changed products are written with one upsert and the history
+    with one bulk insert, both as multi-row VALUES statements. The daily rollup and platform stats
+    are updated in the same transaction. The caller commits.
+
+    Returns {'added': n, 'updated': n, 'unchanged': n}.
+    """
+    now = timestamp or datetime.utcnow()
+    by_url = {}
+    for record in records:
+        if record.get('url') and record.get('name') and record.get('price') is not None:
+            by_url[record['url']] = record
+    counts = {'added': 0, 'updated': 0, 'unchanged': 0}
+    if not by_url:
+        return counts
+
+    existing = {row.url: row for row in db.session.execute(
+        select(Product.id, Product.url, Product.name, Product.platform, Product.category,
+               Product.current_price, Product.last_updated).where(Product.url.in_(list(by_url)))
+    )}
+
+    rows = []
+    for url, record in by_url.items():
+        old = existing.get(url)
+        if old is not None and old.current_price == record['price'] and old.name == record['name']:
+            counts['unchanged'] += 1
+            continue
+        if old is not None and old.last_updated is not None and old.last_updated > now:
+            # Replayed observation older than the stored price
+            counts['unchanged'] += 1
+            continue
+        rows.append({
+            'name': record['name'],
+            'url': url,
+            'platform': record['platform'],
+            'category': record.get('category'),
+            'current_price': record['price'],
+            'last_updated': now,
+            'created_at': now
+        })
+    if not rows:
+        return counts
+
+    ids = _upsert(rows)
+    stats = StatsDelta()
+    history = []
+    for row in rows:
+        old = existing.get(row['url'])
+        if old is None:
+            counts['added'] += 1
+            stats.added(row['platform'], row['category'], row['current_price'])
+        elif old.current_price != row['current_price']:
+            counts['updated'] += 1
+            stats.changed(old.platform, old.category, old.current_price, row['current_price'])
+        else:
+            # Renamed only; the price series is unchanged
+            counts['updated'] += 1
+            continue
+        history.append({'product_id': ids[row['url']], 'price': row['current_price'], 'timestamp': now})
+
+    stats.apply()
+    if history:
+        db.session.execute(insert(PriceHistory.__table__), history)
+        record_prices([(item['product_id'], item['price'], now) for item in history])
+    return counts
+
+def ingest_records(records, batch_size=1000, timestamp=None):
+    """Ingest scraped records in batches; see ingest_batch(). Returns total counts."""
+    totals = {'added': 0, 'updated': 0, 'unchanged': 0}
+    records = list(records)
+    for start in range(0, len(records), batch_size):
+        counts = ingest_batch(records[start:start + batch_size], timestamp)
+        for key, value in counts.items():
+            totals[key] += value
+    return totals
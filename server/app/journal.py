@@ -0,0 +1,188 @@
+import json
+import os
+import re
+from datetime import datetime
+from app import db
+from app.models import JournalOffset
+from app.cache import bump_generation
+from app.freshness import apply_checks
+from app.ingest import ingest_records
+from app.refresh import apply_prices
+
+SEGMENT_NAME = re.compile(r'^(?P<stream>[\w-]+)-(?P<segment>\d{8})\.ndjson$')
+
+def segment_path(directory, stream, segment):
+    return os.path.join(directory, f'{stream}-{segment:08d}.ndjson')
+
+def list_segments(directory, stream=None):
+    """{stream: [segment numbers in order]} for the journal files in `directory`"""
+    found = {}
+    for name in os.listdir(directory) if os.path.isdir(directory) else []:
+        match = SEGMENT_NAME.match(name)
+        if match and stream in (None, match['stream']):
+            found.setdefault(match['stream'], []).append(int(match['segment']))
+    return {name: sorted(segments) for name, segments in found.items()}
+
+class Journal:
+    """Append-only journal of scrape results for one writer
+
+    Records are written as NDJSON lines to numbered segment files named
+    `<stream>-<segment>.ndjson`, rolling to a new segment past
+    `segment_bytes`. Writes are fsynced every `fsync_every` records and
+    on sync(), so a crash loses at most the unsynced tail; a torn last
+    line is trimmed when the journal is reopened. Each stream must have a
+    single writer; the ingest worker reads every stream in the directory.
+    """
+
+    def __init__(self, directory, stream, segment_bytes=64 * 1024 * 1024, fsync_every=500):
+        self.directory = directory
+        self.stream = stream
+        self.segment_bytes = segment_bytes
+        self.fsync_every = fsync_every
+        self.unsynced = 0
+        self.appended = 0
+        os.makedirs(directory, exist_ok=True)
+        segments = list_segments(directory, stream).get(stream)
+        self.segment = segments[-1] if segments else 1
+        self._open()
+
+    def _open(self):
+        path = segment_path(self.directory, self.stream, self.segment)
+        self.file = open(path, 'ab')
+        size = self.file.tell()
+        if size:
+            with open(path, 'rb') as f:
+                f.seek(max(size - 65536, 0))
+                tail = f.read()
+            if not tail.endswith(b'\n'):
+                # Drop a record torn by a crash mid-write
+                keep = size - len(tail) + tail.rfind(b'\n') + 1 if b'\n' in tail else 0
+                self.file.truncate(keep)
+                self.file.seek(keep)
+
+    def append(self, record):
+        line = json.dumps(record, default=str, separators=(',', ':')).encode() + b'\n'
+        if self.file.tell() and self.file.tell() + len(line) > self.segment_bytes:
+            self.sync()
+            self.file.close()
+            self.segment += 1
+            self._open()
+        self.file.write(line)
+        self.unsynced += 1
+        self.appended += 1
+        if self.unsynced >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        """Make every appended record durable"""
+        if self.unsynced:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def read_records(directory, stream, segment, position, limit):
+    """Up to `limit` complete records from (segment, position) onwards
+
+    Returns (records, (segment, position)) where the second item is the
+    offset just past the last record returned. A segment is only left
+    once a later one exists, i.e. once its writer has moved on.
+    """
+    records = []
+    segments = list_segments(directory, stream).get(stream, [])
+    while len(records) < limit:
+        path = segment_path(directory, stream, segment)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                f.seek(position)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    records.append(json.loads(line))
+                    position += len(line)
+                    if len(records) >= limit:
+                        return records, (segment, position)
+        later = [number for number in segments if number > segment]
+        if not later:
+            break
+        segment, position = later[0], 0
+    return records, (segment, position)
+
+def _apply(records):
+    # Apply consecutive runs of the same record type, keeping the journal's order.
+    # A listing run also shares one observation time, since ingest_records()
+    # stamps a whole run with it. Streams are applied one after another, so
+    # observations older than the stored price are skipped by ingest_batch()
+    # and apply_prices().
+    def starts_run(record):
+        return record['type'] != run[0]['type'] or (record['type'] == 'listing' and record['at'] != run[0]['at'])
+
+    run = []
+    for record in records + [None]:
+        if run and (record is None or starts_run(record)):
+            if run[0]['type'] == 'listing':
+                ingest_records(run, timestamp=datetime.fromisoformat(run[0]['at']))
+            elif run[0]['type'] == 'check':
+                apply_checks(run)
+            else:
+                apply_prices([(r['product_id'], r['price'], datetime.fromisoformat(r['at']), r['url'])
+                              for r in run])
+            run = []
+        if record is not None:
+            run.append(record)
+
+def ingest_stream(directory, stream, batch_size=5000):
+    """Apply one stream's unapplied records in batches; returns the number applied
+
+    Each batch and the stream's new offset commit in one transaction, so
+    every record is applied exactly once even if the worker dies mid-run.
+    """
+    applied = 0
+    while True:
+        offset = db.session.get(JournalOffset, stream)
+        start = (offset.segment, offset.position) if offset else (1, 0)
+        records, end = read_records(directory, stream, *start, batch_size)
+        if not records:
+            if end != start and offset is not None:
+                # Moved past an empty segment tail onto the next one
+                offset.segment, offset.position = end
+                db.session.commit()
+            return applied
+        try:
+            _apply(records)
+            if offset is None:
+                offset = JournalOffset(stream=stream)
+                db.session.add(offset)
+            offset.segment, offset.position = end
+            bump_generation()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        applied += len(records)
+
+def ingest_journal(directory, batch_size=5000):
+    """Apply every stream in the journal directory; returns {stream: records applied}"""
+    return {stream: ingest_stream(directory, stream, batch_size) for stream in sorted(list_segments(directory))}
+
+def prune(directory):
+    """Delete segments whose records have all been applied; returns the number removed"""
+    removed = 0
+    for stream, segments in list_segments(directory).items():
+        offset = db.session.get(JournalOffset, stream)
+        if offset is None:
+            continue
+        for segment in segments:
+            if segment < offset.segment:
+                os.remove(segment_path(directory, stream, segment))
+                removed += 1
+    return removed
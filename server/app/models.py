@@ -1,4 +1,5 @@
 from datetime import datetime
+from sqlalchemy import event, DDL
 from app import db
 
 class Product(db.Model):
@@ -12,6 +13,34 @@ class Product(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     prices = db.relationship('PriceHistory', backref='product', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_product_url', 'url', unique=True),
+        # Filter + sort shapes used by the listing endpoints
+        db.Index('ix_product_platform_current_price', 'platform', 'current_price', 'id'),
+        db.Index('ix_product_platform_last_updated', 'platform', 'last_updated', 'id'),
+        db.Index('ix_product_category_current_price', 'category', 'current_price', 'id'),
+        db.Index('ix_product_category_last_updated', 'category', 'last_updated', 'id'),
+        db.Index('ix_product_current_price', 'current_price', 'id'),
+        db.Index('ix_product_last_updated', 'last_updated', 'id'),
+        # Descending sorts keep NULLs last; on PostgreSQL (NULLs sort high) a backward
+        # scan of the indexes above cannot give that order. SQLite's can.
+        db.Index('ix_product_platform_current_price_desc', platform, current_price.desc().nulls_last(), id.desc())
+                 .ddl_if(dialect='postgresql'),
+        db.Index('ix_product_platform_last_updated_desc', platform, last_updated.desc().nulls_last(), id.desc())
+                 .ddl_if(dialect='postgresql'),
+        db.Index('ix_product_category_current_price_desc', category, current_price.desc().nulls_last(), id.desc())
+                 .ddl_if(dialect='postgresql'),
+        db.Index('ix_product_category_last_updated_desc', category, last_updated.desc().nulls_last(), id.desc())
+                 .ddl_if(dialect='postgresql'),
+        db.Index('ix_product_current_price_desc', current_price.desc().nulls_last(), id.desc())
+                 .ddl_if(dialect='postgresql'),
+        db.Index('ix_product_last_updated_desc', last_updated.desc().nulls_last(), id.desc())
+                 .ddl_if(dialect='postgresql'),
+        # Trigram index for substring search (plain index outside PostgreSQL)
+        db.Index('ix_product_name_trgm', 'name',
+                 postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -24,11 +53,34 @@ class Product(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+event.listen(
+    Product.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
+
 class PriceHistory(db.Model):
+    """A price observed `observed_count` times, from `timestamp` (valid_from) to `valid_to`
+
+    Rows written one per observation have observed_count 1 and no valid_to.
+    With PRICE_HISTORY_COMPACT, repeated observations of the same price
+    extend the product's newest row instead of adding one, within the
+    same calendar month.
+
+    On PostgreSQL the table is range-partitioned by month on timestamp
+    (see app.partitions); the partitions' primary key is (id, timestamp).
+    """
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     price = db.Column(db.Float, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    valid_to = db.Column(db.DateTime)  # Last observation at this price, if after timestamp
+    observed_count = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    valid_from = db.synonym('timestamp')
+
+    __table_args__ = (
+        db.Index('ix_price_history_product_id_timestamp', 'product_id', 'timestamp'),
+    )
 
     def to_dict(self):
         return {
@@ -37,3 +89,74 @@ class PriceHistory(db.Model):
             'price': self.price,
             'timestamp': self.timestamp.isoformat()
         }
+
+class PriceDaily(db.Model):
+    """Daily open/high/low/close rollup of PriceHistory, maintained at ingest time"""
+    __tablename__ = 'price_daily'
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    open = db.Column(db.Float, nullable=False)
+    high = db.Column(db.Float, nullable=False)
+    low = db.Column(db.Float, nullable=False)
+    close = db.Column(db.Float, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    first_at = db.Column(db.DateTime, nullable=False)  # Timestamp of the open
+    last_at = db.Column(db.DateTime, nullable=False)  # Timestamp of the close
+
+    def to_dict(self):
+        return {
+            'product_id': self.product_id,
+            'day': self.day.isoformat(),
+            'open': self.open,
+            'high': self.high,
+            'low': self.low,
+            'close': self.close,
+            'count': self.count,
+            'timestamp': self.last_at.isoformat()
+        }
+
+class ProductStat(db.Model):
+    """Per-platform and per-category product counts and price sums, maintained at ingest time"""
+    __tablename__ = 'product_stat'
+    dimension = db.Column(db.String(20), primary_key=True)  # 'platform' or 'category'
+    name = db.Column(db.String(50), primary_key=True)  # '' stands for NULL
+    count = db.Column(db.Integer, nullable=False, default=0)
+    price_count = db.Column(db.Integer, nullable=False, default=0)  # Products with a current price
+    price_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+    def to_dict(self):
+        return {
+            'name': self.name or None,
+            'count': self.count,
+            'avg_price': self.price_sum / self.price_count if self.price_count else 0
+        }
+
+class ProductSchedule(db.Model):
+    """Adaptive refresh state: observed price-change rate and when to check next"""
+    __tablename__ = 'product_schedule'
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    changes = db.Column(db.Float, nullable=False, default=0.0)  # Decayed count of observed changes
+    hours = db.Column(db.Float, nullable=False, default=0.0)  # Decayed hours of observation
+    last_checked = db.Column(db.DateTime)
+    next_due = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_product_schedule_next_due', 'next_due'),
+    )
+
+class CacheGeneration(db.Model):
+    """Single-row counter bumped by ingest code to invalidate cached API responses"""
+    __tablename__ = 'cache_generation'
+    id = db.Column(db.Integer, primary_key=True)
+    generation = db.Column(db.BigInteger, nullable=False, default=0)
+
+class JournalOffset(db.Model):
+    """How far the ingest worker has applied each scrape journal stream
+
+    Updated in the same transaction as the records it covers, so a replay
+    after a crash resumes exactly after the last committed batch.
+    """
+    __tablename__ = 'journal_offset'
+    stream = db.Column(db.String(50), primary_key=True)
+    segment = db.Column(db.Integer, nullable=False)
+    position = db.Column(db.BigInteger, nullable=False)
@@ -0,0 +1,121 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+from app.models import Product
+
+# sort mode -> (column, descending)
+SORT_COLUMNS = {
+    'price_low': (Product.current_price, False),
+    'price_high': (Product.current_price, True),
+    'latest': (Product.last_updated, True),
+}
+
+class InvalidCursor(ValueError):
+    """Raised when an `after` cursor cannot be decoded or does not match the sort"""
+
+def apply_sort(query, sort_by):
+    """Order a product query by a sort mode with `id` as a tie-breaker
+
+    NULL sort values always come last so the order is the same on every
+    database and can be resumed from a cursor. Ascending sorts use the
+    (column, id) indexes, descending ones the (column DESC NULLS LAST,
+    id DESC) indexes.
+    """
+    if sort_by not in SORT_COLUMNS:
+        return query.order_by(Product.id.asc())
+    column, descending = SORT_COLUMNS[sort_by]
+    if descending:
+        return query.order_by(column.desc().nulls_last(), Product.id.desc())
+    return query.order_by(column.asc().nulls_last(), Product.id.asc())
+
+def encode_cursor(sort_by, product):
+    """Build an opaque cursor pointing just after `product`"""
+    value = None
+    if sort_by in SORT_COLUMNS:
+        value = getattr(product, SORT_COLUMNS[sort_by][0].key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+    payload = json.dumps([sort_by or '', value, product.id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(sort_by, cursor):
+    """Decode a cursor into (sort value, product id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, value, product_id = json.loads(base64.urlsafe_b64decode(padded))
+        product_id = int(product_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Malformed cursor')
+    if cursor_sort != (sort_by or ''):
+        raise InvalidCursor('Cursor was issued for a different sort order')
+    if value is not None and sort_by == 'latest':
+        try:
+            value = datetime.fromisoformat(value)
+        except (ValueError, TypeError):
+            raise InvalidCursor('Malformed cursor')
+    return value, product_id
+
+def encode_rank_cursor(q, key):
+    """Build an opaque cursor pointing just after the ranked match with rank `key`"""
+    payload = json.dumps(['rank', q, key], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_rank_cursor(q, cursor):
+    """Decode a ranked search cursor into its rank key"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        kind, cursor_q, key = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise InvalidCursor('Malformed cursor')
+    if not isinstance(key, list) or not all(isinstance(value, (int, float)) for value in key):
+        raise InvalidCursor('Malformed cursor')
+    if kind != 'rank' or cursor_q != q:
+        raise InvalidCursor('Cursor was issued for a different search')
+    return key
+
+def apply_cursor(query, sort_by, cursor):
+    """Restrict a sorted product query to rows after `cursor`"""
+    value, product_id = decode_cursor(sort_by, cursor)
+    if sort_by not in SORT_COLUMNS:
+        return query.filter(Product.id > product_id)
+
+    column, descending = SORT_COLUMNS[sort_by]
+    after_id = Product.id < product_id if descending else Product.id > product_id
+    if value is None:
+        # Already inside the trailing NULL block
+        return query.filter(column.is_(None), after_id)
+
+    beyond = column < value if descending else column > value
+    return query.filter(or_(
+        beyond,
+        and_(column == value, after_id),
+        column.is_(None)
+    ))
+
+def paginate(query, sort_by, limit, after=None):
+    """Fetch one keyset page of a product query
+
+    Returns (products, next_cursor); next_cursor is None on the last page.
+    Only `limit + 1` rows are read, so the cost does not depend on table size.
+    """
+    query = apply_sort(query, sort_by)
+    if after:
+        query = apply_cursor(query, sort_by, after)
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(sort_by, rows[-1])
+
+def iter_chunks(query, chunk_size=500):
+    """Iterate a query in lists of `chunk_size` rows using a server-side cursor"""
+    chunk = []
+    for row in query.yield_per(chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
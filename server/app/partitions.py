@@ -0,0 +1,165 @@
+import re
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func, select, text
+from app import db
+from app.models import PriceHistory
+
+PARENT = 'price_history'
+# Monthly partitions are named price_history_pYYYYMM
+PARTITION_NAME = re.compile(r'^price_history_p(\d{4})(\d{2})$')
+
+def month_start(timestamp):
+    """First instant of the month holding `timestamp`, as a naive datetime"""
+    return datetime(timestamp.year, timestamp.month, 1)
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def partition_name(month):
+    return f'{PARENT}_p{month.year:04d}{month.month:02d}'
+
+def partition_ddl(month):
+    """CREATE TABLE statement for the partition holding `month`"""
+    return (f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARENT} "
+            f"FOR VALUES FROM ('{month.isoformat(sep=' ')}') TO ('{add_months(month, 1).isoformat(sep=' ')}')")
+
+def _is_partitioned():
+    # The migration partitions price_history on PostgreSQL only
+    return db.engine.dialect.name == 'postgresql'
+
+def list_partitions():
+    """Months that currently have a price_history partition, oldest first"""
+    if not _is_partitioned():
+        return []
+    names = db.session.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :parent"
+    ), {'parent': PARENT}).scalars()
+    months = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            months.append(datetime(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+def ensure_partitions(now=None, months_ahead=None):
+    """Create the partitions for this month and the next `months_ahead`
+
+    Run regularly (the scheduler does it daily) so rows never land in the
+    default partition; a month cannot be attached once the default holds
+    rows for it. Returns the names of the partitions created. A no-op
+    outside PostgreSQL.
+    """
+    if not _is_partitioned():
+        return []
+    if months_ahead is None:
+        months_ahead = current_app.config['HISTORY_PARTITION_MONTHS_AHEAD']
+    current = month_start(now or datetime.utcnow())
+    existing = set(list_partitions())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if month not in existing:
+            db.session.execute(text(partition_ddl(month)))
+            created.append(partition_name(month))
+    return created
+
+def _months_before(cutoff):
+    """Months of history entirely before `cutoff`, oldest first"""
+    if _is_partitioned():
+        return [month for month in list_partitions() if month < cutoff]
+    oldest = db.session.query(func.min(PriceHistory.timestamp)).scalar()
+    months = []
+    month = month_start(oldest) if oldest else cutoff
+    while month < cutoff:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+def downsample_month(month):
+    """Keep only each product's last history row of each day in `month`
+
+    The kept row is the daily close; compacted interval rows keep their
+    span and observation count. Returns the number of rows deleted.
+    Running it again on the same month deletes nothing.
+    """
+    end = add_months(month, 1)
+    in_month = (PriceHistory.timestamp >= month, PriceHistory.timestamp < end)
+    ranked = select(
+        PriceHistory.id,
+        func.row_number().over(
+            partition_by=(PriceHistory.product_id, func.date(PriceHistory.timestamp)),
+            order_by=(PriceHistory.timestamp.desc(), PriceHistory.id.desc())
+        ).label('rn')
+    ).where(*in_month).subquery()
+    result = db.session.execute(
+        PriceHistory.__table__.delete().where(
+            *in_month,
+            PriceHistory.id.in_(select(ranked.c.id).where(ranked.c.rn > 1))
+        )
+    )
+    return result.rowcount
+
+def drop_month(month):
+    """Remove a month of raw history: its partition on PostgreSQL, its rows elsewhere
+
+    Returns whether there was anything to remove.
+    """
+    if _is_partitioned():
+        db.session.execute(text(f'DROP TABLE IF EXISTS {partition_name(month)}'))
+        return True
+    return db.session.execute(PriceHistory.__table__.delete().where(
+        PriceHistory.timestamp >= month,
+        PriceHistory.timestamp < add_months(month, 1)
+    )).rowcount > 0
+
+def downsample_cutoff(now=None, downsample_after=None):
+    """Start of the oldest month apply_retention() keeps at full resolution, or None when downsampling is off"""
+    if downsample_after is None:
+        downsample_after = current_app.config['HISTORY_DOWNSAMPLE_AFTER_MONTHS']
+    if not downsample_after:
+        return None
+    return add_months(month_start(now or datetime.utcnow()), -downsample_after)
+
+def apply_retention(now=None, downsample_after=None, drop_after=None):
+    """Apply the price history retention policy
+
+    Months older than `downsample_after` months are thinned to one row
+    per product and day; months older than `drop_after` months are
+    dropped (0 keeps them). Defaults come from HISTORY_DOWNSAMPLE_AFTER_MONTHS
+    and HISTORY_DROP_AFTER_MONTHS. price_daily is left alone, so long
+    windows keep their full daily OHLC; rollup.backfill() does not rebuild
+    months before downsample_cutoff(). The caller commits. Returns a
+    summary dict.
+    """
+    config = current_app.config
+    if downsample_after is None:
+        downsample_after = config['HISTORY_DOWNSAMPLE_AFTER_MONTHS']
+    if drop_after is None:
+        drop_after = config['HISTORY_DROP_AFTER_MONTHS']
+    current = month_start(now or datetime.utcnow())
+
+    dropped = []
+    if drop_after:
+        drop_cutoff = add_months(current, -drop_after)
+        for month in _months_before(drop_cutoff):
+            if drop_month(month):
+                dropped.append(month)
+        # Stray rows in PostgreSQL's default partition
+        db.session.execute(PriceHistory.__table__.delete().where(PriceHistory.timestamp < drop_cutoff))
+
+    downsampled = {}
+    cutoff = downsample_cutoff(current, downsample_after)
+    if cutoff:
+        for month in _months_before(cutoff):
+            deleted = downsample_month(month)
+            if deleted:
+                downsampled[month] = deleted
+    return {
+        'dropped': [month.date() for month in dropped],
+        'downsampled': {month.date(): deleted for month, deleted in downsampled.items()},
+    }
@@ -0,0 +1,260 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import and_, func, or_
+from app import db
+from app.models import Product, PriceHistory
+from app.partitions import month_start
+from app.cache import bump_generation
+from app.rollup import record_prices
+from app.summary import StatsDelta
+from app.scrapers.fetch_cache import NOT_MODIFIED
+
+class Progress:
+    """Counts refresh results and prints progress with an ETA"""
+
+    def __init__(self, total, report_every=10.0):
+        self.total = total
+        self.report_every = report_every
+        self.updated = 0
+        self.unchanged = 0
+        self.failed = 0
+        self.outcomes = {}
+        self.started = time.monotonic()
+        self.reported_at = self.started
+
+    @property
+    def done(self):
+        return self.updated + self.unchanged + self.failed
+
+    def eta(self):
+        elapsed = time.monotonic() - self.started
+        if not self.done or not elapsed:
+            return None
+        return (self.total - self.done) / (self.done / elapsed)
+
+    def record(self, outcome, product_id=None):
+        """Count one product: 'updated', 'unchanged' or 'failed'"""
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        if product_id is not None:
+            self.outcomes[product_id] = outcome
+        now = time.monotonic()
+        if now - self.reported_at >= self.report_every or self.done == self.total:
+            self.reported_at = now
+            print(self.status())
+
+    def status(self):
+        eta = self.eta()
+        eta_text = f"{eta / 60:.1f} min" if eta is not None else "unknown"
+        return (f"Progress: {self.done}/{self.total} "
+                f"({self.updated} updated, {self.unchanged} unchanged, {self.failed} failed), ETA {eta_text}")
+
+class RefreshState:
+    """Start time of the current refresh run, persisted so a crashed run can resume
+
+    Each batch commits the refreshed products' last_updated, so on resume
+    every product updated since the recorded start is already done.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def start(self):
+        """Return (started_at, resumed)"""
+        try:
+            with open(self.path) as f:
+                return datetime.fromisoformat(json.load(f)['started_at']), True
+        except (OSError, ValueError, KeyError):
+            pass
+        started_at = datetime.utcnow()
+        with open(self.path, 'w') as f:
+            json.dump({'started_at': started_at.isoformat()}, f)
+        return started_at, False
+
+    def finish(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+def pending_products(started_at, product_ids=None):
+    """(id, platform, url) for products not yet refreshed in the run started at `started_at`"""
+    query = db.session.query(Product.id, Product.platform, Product.url).filter(or_(
+        Product.last_updated.is_(None),
+        Product.last_updated < started_at
+    ))
+    if product_ids is None:
+        return query.order_by(Product.id).all()
+    rows = []
+    product_ids = sorted(product_ids)
+    for start in range(0, len(product_ids), 500):
+        rows.extend(query.filter(Product.id.in_(product_ids[start:start + 500])).order_by(Product.id))
+    return rows
+
+def latest_history(product_ids):
+    """Map each product id to its newest PriceHistory row, for products that have one"""
+    newest = db.session.query(
+        PriceHistory.product_id,
+        func.max(PriceHistory.timestamp).label('timestamp')
+    ).filter(PriceHistory.product_id.in_(product_ids)).group_by(PriceHistory.product_id).subquery()
+    rows = PriceHistory.query.join(newest, and_(
+        PriceHistory.product_id == newest.c.product_id,
+        PriceHistory.timestamp == newest.c.timestamp
+    )).order_by(PriceHistory.id)
+    return {row.product_id: row for row in rows}
+
+def _record_history(latest, product_id, price, timestamp):
+    row = latest.get(product_id)
+    if (row is not None and row.price == price and (row.valid_to or row.timestamp) <= timestamp
+            and month_start(row.timestamp) == month_start(timestamp)):
+        # Same price again: extend the current interval, which stays within one month partition
+        row.valid_to = timestamp
+        row.observed_count += 1
+    else:
+        latest[product_id] = PriceHistory(product_id=product_id, price=price, timestamp=timestamp,
+                                          observed_count=1)
+        db.session.add(latest[product_id])
+
+def apply_prices(results):
+    """Apply (product_id, price, timestamp, url) results to the session; the caller commits
+
+    With PRICE_HISTORY_COMPACT, a price equal to the product's newest
+    history row extends that row instead of adding one. The products are
+    locked, in id order, before their newest rows are read, so
+    compact_history() cannot merge those rows away meanwhile.
+    """
+    product_ids = [r[0] for r in results]
+    products = {p.id: p for p in Product.query.filter(Product.id.in_(product_ids)).order_by(Product.id)
+                .with_for_update()}
+    latest = latest_history(product_ids) if current_app.config['PRICE_HISTORY_COMPACT'] else None
+    observed = []
+    stats = StatsDelta()
+    for product_id, price, timestamp, _ in results:
+        product = products.get(product_id)
+        if product is None or (product.last_updated is not None and product.last_updated > timestamp):
+            # Deleted, or a replayed result older than the stored price
+            continue
+        if latest is not None:
+            _record_history(latest, product_id, price, timestamp)
+        else:
+            db.session.add(PriceHistory(product_id=product_id, price=price, timestamp=timestamp))
+        observed.append((product_id, price, timestamp))
+        stats.changed(product.platform, product.category, product.current_price, price)
+        product.current_price = price
+        product.last_updated = timestamp
+    record_prices(observed)
+    stats.apply()
+
+def write_batch(results):
+    """Apply a batch of (product_id, price, timestamp, url) results in one transaction"""
+    apply_prices(results)
+    bump_generation()
+    db.session.commit()
+
+def journal_batch(journal, results):
+    """Append a batch of results to the scrape journal and make them durable"""
+    for product_id, price, timestamp, url in results:
+        journal.append({'type': 'price', 'product_id': product_id, 'price': price,
+                        'at': timestamp.isoformat(), 'url': url})
+    journal.sync()
+
+async def _scrape_platform(scraper, products, results):
+    """Fetch one platform's products with max_concurrency workers sharing its rate limit"""
+    pending = iter(products)
+
+    async def worker():
+        for product_id, _, url in pending:
+            try:
+                details = await scraper.get_product_details(url)
+            except Exception as e:
+                print(f"[ERROR] Error updating {url}: {str(e)}")
+                details = None
+            if details is NOT_MODIFIED:
+                price = NOT_MODIFIED
+            else:
+                price = details['price'] if details else None
+            await results.put((product_id, price, datetime.utcnow(), url))
+
+    await asyncio.gather(*(worker() for _ in range(min(scraper.max_concurrency, len(products)))))
+
+async def _write_results(results, progress, batch_size, fetch_cache, journal=None):
+    batch = []
+
+    def flush():
+        if journal is not None:
+            journal_batch(journal, batch)
+        else:
+            write_batch(batch)
+        if fetch_cache is not None:
+            fetch_cache.confirm(item[3] for item in batch)
+        batch.clear()
+
+    while True:
+        item = await results.get()
+        if item is None:
+            break
+        product_id, price = item[:2]
+        if price is NOT_MODIFIED:
+            # Page unchanged since the last run: nothing to parse or write
+            progress.record('unchanged', product_id)
+            continue
+        if price is None:
+            progress.record('failed', product_id)
+            continue
+        batch.append(item)
+        progress.record('updated', product_id)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+async def refresh_prices(scrapers, batch_size=None, state_file=None, fetch_cache=None, product_ids=None,
+                         journal=None):
+    """Refresh current prices for every product (or just `product_ids`), platforms in parallel
+
+    Each platform's products are fetched by their own scraper's workers,
+    within that scraper's rate limit. Results go through a queue to a
+    single writer that commits every `batch_size` prices. If a previous
+    run was interrupted, products it already refreshed are skipped.
+    With a fetch cache, unchanged pages are skipped and their validators
+    are confirmed only once the batch holding their result commits.
+    With a journal, batches are appended to it instead of written to the
+    database, and the ingest worker applies them; products journaled
+    but not yet applied are fetched again if the run is resumed.
+
+    Returns the Progress with the final counts.
+    """
+    batch_size = batch_size or current_app.config['REFRESH_BATCH_SIZE']
+    state = RefreshState(state_file or current_app.config['REFRESH_STATE_FILE'])
+    started_at, resumed = state.start()
+
+    by_platform = {}
+    skipped = 0
+    for row in pending_products(started_at, product_ids):
+        if row.platform.lower() in scrapers:
+            by_platform.setdefault(row.platform.lower(), []).append(row)
+        else:
+            skipped += 1
+            print(f"No scraper found for platform: {row.platform}")
+
+    total = sum(len(rows) for rows in by_platform.values())
+    if resumed:
+        print(f"Resuming refresh started at {started_at:%Y-%m-%d %H:%M:%S}")
+    print(f"Found {total} products to update" + (f" ({skipped} without a scraper)" if skipped else ""))
+
+    progress = Progress(total)
+    results = asyncio.Queue(maxsize=batch_size * 2)
+
+    async def scrape_all():
+        await asyncio.gather(*(
+            _scrape_platform(scrapers[platform], rows, results)
+            for platform, rows in by_platform.items()
+        ))
+        await results.put(None)
+
+    await asyncio.gather(scrape_all(), _write_results(results, progress, batch_size, fetch_cache, journal))
+    state.finish()
+    return progress
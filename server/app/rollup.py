@@ -0,0 +1,217 @@
+from datetime import datetime, time
+from types import SimpleNamespace
+from sqlalchemy import bindparam, case, select
+from app import db
+from app.models import PriceHistory, PriceDaily
+from app.history import interval_overlaps, observations
+from app.partitions import downsample_cutoff
+
+def _naive(timestamp):
+    # Stored timestamps are naive UTC
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.replace(tzinfo=None) - timestamp.utcoffset()
+    return timestamp
+
+COLUMNS = ('product_id', 'day', 'open', 'high', 'low', 'close', 'count', 'first_at', 'last_at')
+
+def _merge(row, other):
+    """Fold the day aggregate `other` into `row` (same product and day)"""
+    row.high = max(row.high, other.high)
+    row.low = min(row.low, other.low)
+    row.count += other.count
+    if other.first_at < row.first_at:
+        row.open, row.first_at = other.open, other.first_at
+    if other.last_at >= row.last_at:
+        row.close, row.last_at = other.close, other.last_at
+
+def _fold(row, price, timestamp):
+    _merge(row, _new_day(row.product_id, price, timestamp, SimpleNamespace))
+
+def _new_day(product_id, price, timestamp, factory=PriceDaily):
+    return factory(
+        product_id=product_id, day=timestamp.date(),
+        open=price, high=price, low=price, close=price, count=1,
+        first_at=timestamp, last_at=timestamp
+    )
+
+def record_price(product_id, price, timestamp=None):
+    """Fold one price observation into its product's daily rollup row
+
+    Call alongside every PriceHistory insert, inside the same transaction.
+    """
+    record_prices([(product_id, price, timestamp)])
+
+def _upsert_days(days):
+    """Merge day aggregates into price_daily with INSERT ... ON CONFLICT DO UPDATE
+
+    The merge is computed by the database against the row as it stands,
+    so concurrent writers folding into the same (product, day) never lose
+    each other's observations. Returns False for dialects without ON CONFLICT.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return False
+
+    table = PriceDaily.__table__
+    stmt = dialect_insert(table)
+    new = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['product_id', 'day'],
+        set_={
+            'high': case((new.high > table.c.high, new.high), else_=table.c.high),
+            'low': case((new.low < table.c.low, new.low), else_=table.c.low),
+            'count': table.c.count + new.count,
+            'open': case((new.first_at < table.c.first_at, new.open), else_=table.c.open),
+            'first_at': case((new.first_at < table.c.first_at, new.first_at), else_=table.c.first_at),
+            'close': case((new.last_at >= table.c.last_at, new.close), else_=table.c.close),
+            'last_at': case((new.last_at >= table.c.last_at, new.last_at), else_=table.c.last_at),
+        }
+    )
+    db.session.execute(stmt, [{c: getattr(day, c) for c in COLUMNS} for day in days])
+    return True
+
+def _read_merge_write(days, chunk_size):
+    # Portable fallback without ON CONFLICT: read, merge in Python, write back
+    product_ids = sorted({day.product_id for day in days})
+    dates = sorted({day.day for day in days})
+    existing = {}
+    for start in range(0, len(product_ids), chunk_size):
+        for row in db.session.execute(select(*(getattr(PriceDaily, c) for c in COLUMNS)).where(
+            PriceDaily.product_id.in_(product_ids[start:start + chunk_size]),
+            PriceDaily.day.in_(dates)
+        )):
+            existing[(row.product_id, row.day)] = SimpleNamespace(**row._asdict())
+
+    new = []
+    changed = []
+    for day in days:
+        row = existing.get((day.product_id, day.day))
+        if row is None:
+            new.append(day)
+        else:
+            _merge(row, day)
+            changed.append(row)
+
+    table = PriceDaily.__table__
+    if new:
+        db.session.execute(table.insert(), [{c: getattr(row, c) for c in COLUMNS} for row in new])
+    if changed:
+        db.session.execute(
+            table.update().where(
+                table.c.product_id == bindparam('b_product_id'),
+                table.c.day == bindparam('b_day')
+            ).values({c: bindparam(c) for c in COLUMNS[2:]}),
+            [dict({c: getattr(row, c) for c in COLUMNS[2:]}, b_product_id=row.product_id, b_day=row.day)
+             for row in changed]
+        )
+
+def record_prices(observations, chunk_size=500):
+    """Fold many (product_id, price, timestamp) observations at once
+
+    Observations are first folded per product and day in Python, then
+    merged into price_daily with one upsert executemany.
+    """
+    days = {}
+    for product_id, price, timestamp in observations:
+        timestamp = _naive(timestamp or datetime.utcnow())
+        key = (product_id, timestamp.date())
+        if key in days:
+            _fold(days[key], price, timestamp)
+        else:
+            days[key] = _new_day(product_id, price, timestamp, SimpleNamespace)
+    if not days:
+        return
+    if not _upsert_days(list(days.values())):
+        _read_merge_write(list(days.values()), chunk_size)
+
+def _weighted(row):
+    """(timestamp, observations counted there) for the known observations of a PriceHistory row
+
+    An interval within one day puts all its observations on that day. The
+    times of those inside a longer interval are not stored, so it counts
+    only its first and last.
+    """
+    times = observations(row)
+    if len(times) == 2 and times[0].date() == times[1].date():
+        return [(times[0], 1), (times[1], row.observed_count - 1)]
+    return [(timestamp, 1) for timestamp in times]
+
+def backfill(product_ids=None, since=None, batch_size=5000, all_months=False):
+    """Rebuild daily rollups from raw PriceHistory
+
+    Streams raw rows in (product, timestamp) order and replaces the affected
+    rollup rows batch by batch. Rollups are exact for uncompacted history;
+    an interval spanning days adds only its first and last observations to
+    the day counts (see _weighted()). Returns the number of rollup rows written.
+
+    Months before the retention downsample cutoff are left alone: their raw
+    history may be thinned to daily closes, leaving the rollups as the only
+    full record. Pass all_months=True only for history known to be
+    complete, such as an archive exported before retention ran.
+    """
+    cutoff = None if all_months else downsample_cutoff()
+    if cutoff and (since is None or since < cutoff):
+        since = cutoff
+    if since:
+        # Whole days only, so partially covered days are rebuilt completely
+        since = datetime.combine(since.date(), time.min)
+    raw = db.session.query(PriceHistory.product_id, PriceHistory.price, PriceHistory.timestamp,
+                           PriceHistory.valid_to, PriceHistory.observed_count)
+    stale = db.session.query(PriceDaily)
+    if product_ids:
+        raw = raw.filter(PriceHistory.product_id.in_(product_ids))
+        stale = stale.filter(PriceDaily.product_id.in_(product_ids))
+    if since:
+        raw = raw.filter(interval_overlaps(since))
+        stale = stale.filter(PriceDaily.day >= since.date())
+    stale.delete(synchronize_session=False)
+
+    rows = raw.filter(PriceHistory.timestamp.isnot(None)).order_by(
+        PriceHistory.product_id, PriceHistory.timestamp
+    ).yield_per(batch_size)
+    points = ((row.product_id, row.price, timestamp, count)
+              for row in rows for timestamp, count in _weighted(row)
+              if since is None or timestamp >= since)
+
+    written = 0
+    batch = []
+    current = None
+    for product_id, price, timestamp, count in points:
+        key = (product_id, timestamp.date())
+        if current is None or current['key'] != key:
+            if current:
+                batch.append(current)
+            current = {'key': key, 'open': price, 'high': price, 'low': price,
+                       'close': price, 'count': 0, 'first_at': timestamp}
+        current['high'] = max(current['high'], price)
+        current['low'] = min(current['low'], price)
+        current['close'] = price
+        current['last_at'] = timestamp
+        current['count'] += count
+        if len(batch) >= batch_size:
+            written += _insert_days(batch)
+            batch = []
+    if current:
+        batch.append(current)
+    written += _insert_days(batch)
+    return written
+
+def _insert_days(batch):
+    if not batch:
+        return 0
+    db.session.execute(PriceDaily.__table__.insert(), [{
+        'product_id': item['key'][0],
+        'day': item['key'][1],
+        'open': item['open'],
+        'high': item['high'],
+        'low': item['low'],
+        'close': item['close'],
+        'count': item['count'],
+        'first_at': item['first_at'],
+        'last_at': item['last_at']
+    } for item in batch])
+    return len(batch)
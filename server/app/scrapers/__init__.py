@@ -1,25 +1,340 @@
 from abc import ABC
-import aiohttp
 import asyncio
-from bs4 import BeautifulSoup
+import aiohttp
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from bs4 import BeautifulSoup, SoupStrainer
 from datetime import datetime
+from urllib.parse import urlsplit
 import re
+from app.scrapers.fetch_cache import NOT_MODIFIED
+from app.scrapers.client import HttpClient
+from app.scrapers.breaker import RETRY_STATUSES, parse_retry_after
+
+try:
+    import lxml
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# Parser backends, fastest first
+PARSERS = ('selectolax', 'lxml', 'html.parser')
+
+def available_parsers():
+    installed = {'selectolax': LexborHTMLParser is not None, 'lxml': lxml is not None}
+    return [name for name in PARSERS if installed.get(name, True)]
+
+def default_parser():
+    """SCRAPER_PARSER if set, otherwise the fastest installed backend"""
+    return os.getenv('SCRAPER_PARSER') or available_parsers()[0]
+
+class SelectolaxNode:
+    """The subset of the BeautifulSoup Tag API the scrapers use, over a selectolax node
+
+    Supports select(), select_one(), find_all(name, attr=True/value),
+    get() and .text, so the same CSS selectors work with either backend.
+    """
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        self.node = node
+
+    def select(self, selector):
+        return [SelectolaxNode(node) for node in self.node.css(selector)]
+
+    def select_one(self, selector):
+        node = self.node.css_first(selector)
+        return SelectolaxNode(node) if node is not None else None
+
+    def find_all(self, name, **attrs):
+        selector = name + ''.join(
+            f'[{attr}]' if value is True else f'[{attr}="{value}"]' for attr, value in attrs.items()
+        )
+        return self.select(selector)
+
+    def get(self, attr, default=None):
+        value = self.node.attributes.get(attr)
+        return default if value is None else value
+
+    @property
+    def text(self):
+        return self.node.text()
+
+def make_soup(html, parser=None, parse_only=None):
+    """Parse HTML with the given backend into a select()-able document
+
+    With a SoupStrainer as `parse_only`, the BeautifulSoup backends build
+    only the matching elements and their contents. selectolax ignores it:
+    its tree is built in C, outside the Python heap, and is already cheap.
+    """
+    parser = parser or default_parser()
+    if parser == 'selectolax':
+        return SelectolaxNode(LexborHTMLParser(html))
+    return BeautifulSoup(html, parser, parse_only=parse_only)
+
+def class_strainer(*classes, name=None):
+    """SoupStrainer for elements carrying any of `classes`, kept with their contents
+
+    Matches the raw class attribute with a regex, since newer BeautifulSoup
+    versions filter before the attribute is split into a list.
+    """
+    pattern = re.compile(r'(?:^|\s)(?:' + '|'.join(map(re.escape, classes)) + r')(?:\s|$)')
+    return SoupStrainer(name, class_=pattern)
+
+_parse_pool = None
+
+def _timed(parse, *args):
+    """Call parse(*args) in a pool thread; returns (result or raised exception, milliseconds)"""
+    start = time.perf_counter()
+    try:
+        result = parse(*args)
+    except Exception as e:
+        result = e
+    return result, (time.perf_counter() - start) * 1000
+
+def parse_pool():
+    """Thread pool shared by all scrapers for parsing off the event loop"""
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix='parse')
+    return _parse_pool
+
+class TokenBucket:
+    """Async token-bucket rate limiter
+
+    Allows bursts of up to `burst` requests, refilling at `rate` tokens per
+    second. Waiters are served in arrival order.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
 
 class BaseScraper(ABC):
-    def __init__(self):
+    # Products on one category page, for counting unchanged pages in crawl_category()
+    items_per_page = 1
+    # Elements parse_product_details() reads, for targeted parsing; None parses everything
+    product_strainer = None
+    
+    def __init__(self, requests_per_second=None, burst=1, max_concurrency=4, fetch_cache=None,
+                 parser=None, client=None, max_retries=3, backoff=0.5, max_backoff=30.0, targeted=True):
         self.session = None
+        # Shared HttpClient for the run; without one the scraper opens and owns its own
+        self.client = client
+        self.owns_client = client is None
         self.min_price = 1.0
         self.max_price = 10000000.0
         self.rate_limit_delay = 1
+        # Defaults to one request every rate_limit_delay seconds per host
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.limiters = {}
+        self.semaphore = None
+        self.fetch_cache = fetch_cache
+        self.parser = parser or default_parser()
+        # Build only the elements each parse reads (BeautifulSoup backends)
+        self.targeted = targeted
+        # Retries per request, first backoff in seconds, and the longest wait worth taking
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pages_parsed = 0
+        self.parse_ms = 0.0
     
     async def init_session(self):
         if not self.session:
-            self.session = aiohttp.ClientSession()
+            if self.client is None:
+                self.client = HttpClient()
+            self.session = await self.client.open()
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
     
     async def close_session(self):
+        """Release the session; a shared client is left open for its owner to close"""
         if self.session:
-            await self.session.close()
+            if self.owns_client:
+                await self.client.close()
+                self.client = None
             self.session = None
+            self.semaphore = None
+            self.limiters = {}
+    
+    def limiter(self, url):
+        """Token bucket shared by all requests to the URL's host"""
+        host = urlsplit(url).netloc
+        if host not in self.limiters:
+            rate = self.requests_per_second or 1 / self.rate_limit_delay
+            self.limiters[host] = TokenBucket(rate, self.burst)
+        return self.limiters[host]
+    
+    async def fetch(self, url, headers=None, conditional=True):
+        """GET a page within the per-host rate limit and concurrency cap
+
+        Returns the body text, None for an error response, or NOT_MODIFIED
+        when a fetch cache is set and the page is the same as last time.
+        Pass conditional=False for pages whose content is always needed.
+
+        Refusals (403/429/5xx), timeouts and connection errors are retried
+        with exponential backoff, honouring Retry-After, while the run's
+        retry budget lasts. Each host has a circuit breaker: while it is
+        open, requests to the host return None at once.
+        """
+        await self.init_session()
+        use_cache = conditional and self.fetch_cache is not None
+        if use_cache:
+            headers = dict(headers or {}, **self.fetch_cache.request_headers(url))
+        breaker = self.client.breaker(url)
+        for attempt in range(self.max_retries + 1):
+            if not breaker.allow():
+                self.client.rejected += 1
+                return None
+            retry_after = None
+            try:
+                await self.limiter(url).acquire()
+                async with self.semaphore:
+                    async with self.session.get(url, headers=headers) as response:
+                        if response.status in RETRY_STATUSES:
+                            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                            error = f"Status code: {response.status}"
+                        else:
+                            breaker.record_success()
+                            if use_cache and response.status in (200, 304):
+                                body = await response.read() if response.status == 200 else b''
+                                if self.fetch_cache.check(url, response.status, response.headers, body):
+                                    return NOT_MODIFIED
+                            if response.status != 200:
+                                print(f"Failed to fetch {url}. Status code: {response.status}")
+                                return None
+                            return await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+            except BaseException:
+                # Cancelled or failed outside the request: no verdict, so let the next request probe
+                breaker.release()
+                raise
+            
+            opened = breaker.record_failure(retry_after)
+            if opened:
+                self.client.circuits_opened += 1
+                print(f"Circuit open for {urlsplit(url).netloc} after {breaker.failures} failures")
+            delay = max(self.backoff * 2 ** attempt, retry_after or 0.0)
+            if (opened or attempt == self.max_retries or delay > self.max_backoff
+                    or not self.client.retry_budget.spend()):
+                print(f"Failed to fetch {url}. {error}")
+                return None
+            await asyncio.sleep(delay)
+    
+    def record_parse(self, url, parse_ms):
+        """Count one parse and record its duration in the fetch cache; call on the event loop"""
+        self.pages_parsed += 1
+        self.parse_ms += parse_ms
+        if self.fetch_cache is not None:
+            self.fetch_cache.record_parse(url, parse_ms)
+    
+    def make_soup(self, html, strainer=None):
+        """Parse a page; in targeted mode only the parts matched by `strainer` are built"""
+        return make_soup(html, self.parser, strainer if self.targeted else None)
+    
+    async def parse_off_loop(self, url, parse, *args):
+        """Run parse(*args) in the parse pool so the event loop keeps serving fetches
+
+        The worker thread only parses and times; the counters and the fetch
+        cache are updated back on the loop, so they are never shared with
+        the pool's threads.
+        """
+        loop = asyncio.get_running_loop()
+        result, parse_ms = await loop.run_in_executor(parse_pool(), _timed, parse, *args)
+        self.record_parse(url, parse_ms)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+    
+    async def fetch_many(self, urls, parse, headers=None):
+        """Fetch pages concurrently and parse each one as it arrives
+
+        Up to max_concurrency requests are in flight while earlier pages are
+        parsed, all within the per-host rate limit. Returns parse(url, html)
+        for each URL in input order, with None for failed pages and
+        NOT_MODIFIED for pages unchanged since the last run. Parsing runs
+        in the parse pool, so `parse` must not touch the event loop.
+        """
+        results = [None] * len(urls)
+        pending = iter(enumerate(urls))
+        
+        async def worker():
+            for i, url in pending:
+                try:
+                    html = await self.fetch(url, headers)
+                    if html is NOT_MODIFIED:
+                        results[i] = NOT_MODIFIED
+                    elif html is not None:
+                        results[i] = await self.parse_off_loop(url, parse, url, html)
+                except Exception as e:
+                    print(f"Error processing product URL {url}: {str(e)}")
+        
+        await asyncio.gather(*(worker() for _ in range(min(self.max_concurrency, len(urls)))))
+        return results
+    
+    async def category_pages(self, category_url):
+        """Yield (page_url, products) for each page of a category in order
+
+        products is NOT_MODIFIED for pages unchanged since the last run.
+        By default the whole category is one page read by
+        get_category_products(); scrapers that paginate override this.
+        """
+        yield category_url, await self.get_category_products(category_url)
+    
+    async def crawl_category(self, category_url, max_items=None, max_pages=None, known=None, stop_after=None):
+        """Yield a category's products as each page is parsed, following pagination
+
+        Stops after `max_items` products or `max_pages` pages, or once
+        `stop_after` products in a row are already in `known` (url -> price)
+        at the same price. A page unchanged since the last run counts as
+        items_per_page such products. Each product carries the `page_url`
+        it was read from, and the last product of each page `page_done`,
+        so callers confirm fetch cache entries only for pages yielded in
+        full; a page cut short by a budget is fetched again next run.
+        """
+        items = pages = run = 0
+        page_iter = self.category_pages(category_url)
+        try:
+            async for page_url, products in page_iter:
+                pages += 1
+                if products is NOT_MODIFIED:
+                    run += self.items_per_page
+                else:
+                    for index, product in enumerate(products, 1):
+                        if known is not None and known.get(product['url']) == product['price']:
+                            run += 1
+                        else:
+                            run = 0
+                        yield dict(product, page_url=page_url, page_done=index == len(products))
+                        items += 1
+                        if (max_items and items >= max_items) or (stop_after and run >= stop_after):
+                            return
+                if (stop_after and run >= stop_after) or (max_pages and pages >= max_pages):
+                    return
+        finally:
+            await page_iter.aclose()
     
     def clean_price(self, price_text):
         """Clean price text and convert to float"""
@@ -34,25 +349,29 @@ class BaseScraper(ABC):
             pass
         return None
     
+    def parse_product_details(self, url, html_content):
+        """Extract name and price from a product page"""
+        soup = self.make_soup(html_content, self.product_strainer)
+        
+        price = self.extract_price(soup) if hasattr(self, 'extract_price') else None
+        name = self.extract_product_name(soup) if hasattr(self, 'extract_product_name') else None
+        
+        return {
+            'name': name,
+            'price': price,
+            'url': url,
+            'timestamp': datetime.utcnow()
+        }
+    
     async def get_product_details(self, url):
-        """Get product details from URL"""
-        await self.init_session()
+        """Get product details from URL, or NOT_MODIFIED if the page is unchanged"""
         try:
-            async with self.session.get(url) as response:
-                if response.status == 200:
-                    html_content = await response.text()
-                    soup = BeautifulSoup(html_content, 'html.parser')
-                    
-                    price = await self.extract_price(soup) if hasattr(self, 'extract_price') else None
-                    name = await self.extract_product_name(soup) if hasattr(self, 'extract_product_name') else None
-                    
-                    return {
-                        'name': name,
-                        'price': price,
-                        'url': url,
-                        'timestamp': datetime.utcnow()
-                    }
-                return None
+            html_content = await self.fetch(url)
+            if html_content is NOT_MODIFIED:
+                return NOT_MODIFIED
+            if html_content is not None:
+                return await self.parse_off_loop(url, self.parse_product_details, url, html_content)
+            return None
         except Exception as e:
             print(f"Error scraping {url}: {str(e)}")
             return None
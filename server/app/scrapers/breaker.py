@@ -0,0 +1,95 @@
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# Responses that mean the host is refusing or failing, not that the page is missing
+RETRY_STATUSES = frozenset({403, 429, 500, 502, 503, 504})
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delay-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one host
+
+    After `threshold` consecutive failures the circuit opens and requests
+    are refused without touching the network. Once the open period ends a
+    single probe is let through (half-open): success closes the circuit,
+    failure reopens it for twice as long, up to `max_reset_timeout`. A
+    Retry-After from the host extends the open period. A probe that ends
+    without a verdict must be released, or the host stays refused.
+    """
+
+    def __init__(self, threshold=5, reset_timeout=30.0, max_reset_timeout=600.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.trips = 0
+        self.opened_until = 0.0
+        self.probing = False
+
+    def allow(self):
+        """True if a request may be sent now"""
+        if self.state == 'closed':
+            return True
+        if self.state == 'open':
+            if time.monotonic() < self.opened_until:
+                return False
+            self.state = 'half-open'
+        if self.probing:
+            return False
+        self.probing = True
+        return True
+
+    def release(self):
+        """End a request that reached no verdict (cancelled or crashed), so a probe is not held forever"""
+        self.probing = False
+
+    def record_success(self):
+        self.state = 'closed'
+        self.failures = 0
+        self.trips = 0
+        self.probing = False
+
+    def record_failure(self, retry_after=None):
+        """Count a failure; returns True if this opened the circuit"""
+        if self.state == 'open':
+            # A request already in flight when the circuit opened: no news about the host
+            return False
+        self.failures += 1
+        self.probing = False
+        if self.state != 'half-open' and self.failures < self.threshold:
+            return False
+        timeout = min(self.reset_timeout * 2 ** self.trips, self.max_reset_timeout)
+        self.opened_until = time.monotonic() + max(timeout, retry_after or 0.0)
+        self.trips += 1
+        self.state = 'open'
+        return True
+
+class RetryBudget:
+    """Retries allowed across every host and scraper in one run"""
+
+    def __init__(self, retries):
+        self.remaining = retries
+        self.spent = 0
+
+    def spend(self):
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        self.spent += 1
+        return True
@@ -0,0 +1,132 @@
+import aiohttp
+from urllib.parse import urlsplit
+from app.scrapers.breaker import CircuitBreaker, RetryBudget
+
+class HttpClient:
+    """Tuned aiohttp session shared by every scraper in a run
+
+    One connection pool serves all platforms, with a per-host connection
+    cap, keep-alive reuse, a DNS cache and connect/read timeouts. Use as an
+    async context manager so the pool is always closed. Connection reuse
+    is counted through aiohttp tracing, see stats().
+
+    The client also holds the run's per-host circuit breakers and its
+    retry budget, so every scraper sees the same view of a failing host.
+    """
+
+    def __init__(self, limit=100, limit_per_host=8, dns_cache_ttl=300,
+                 connect_timeout=10, read_timeout=30, total_timeout=60, keepalive_timeout=30,
+                 retry_budget=100, breaker_threshold=5, breaker_reset_timeout=30.0):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = aiohttp.ClientTimeout(
+            total=total_timeout, sock_connect=connect_timeout, sock_read=read_timeout
+        )
+        self.keepalive_timeout = keepalive_timeout
+        self.session = None
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+        self.retry_budget = RetryBudget(retry_budget)
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset_timeout = breaker_reset_timeout
+        self.breakers = {}
+        self.circuits_opened = 0
+        self.rejected = 0
+
+    def breaker(self, url):
+        """Circuit breaker for the URL's host"""
+        host = urlsplit(url).netloc
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_reset_timeout)
+        return self.breakers[host]
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            limit=config['HTTP_POOL_SIZE'],
+            limit_per_host=config['HTTP_POOL_PER_HOST'],
+            dns_cache_ttl=config['HTTP_DNS_CACHE_TTL'],
+            connect_timeout=config['HTTP_CONNECT_TIMEOUT'],
+            read_timeout=config['HTTP_READ_TIMEOUT'],
+            total_timeout=config['HTTP_TOTAL_TIMEOUT'],
+            retry_budget=config['HTTP_RETRY_BUDGET'],
+            breaker_threshold=config['HTTP_BREAKER_THRESHOLD'],
+            breaker_reset_timeout=config['HTTP_BREAKER_RESET_TIMEOUT']
+        )
+
+    def _trace_config(self):
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.requests += 1
+
+        async def on_connection_create_end(session, context, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.connections_reused += 1
+
+        async def on_dns_cache_hit(session, context, params):
+            self.dns_cache_hits += 1
+
+        async def on_dns_cache_miss(session, context, params):
+            self.dns_cache_misses += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace
+
+    async def open(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                trace_configs=[self._trace_config()]
+            )
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def stats(self):
+        connections = self.connections_created + self.connections_reused
+        return {
+            'requests': self.requests,
+            'connections_created': self.connections_created,
+            'connections_reused': self.connections_reused,
+            'reuse_ratio': self.connections_reused / connections if connections else 0.0,
+            'dns_cache_hits': self.dns_cache_hits,
+            'dns_cache_misses': self.dns_cache_misses,
+            'retries': self.retry_budget.spent,
+            'circuits_opened': self.circuits_opened,
+            'rejected': self.rejected
+        }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"HTTP pool: {stats['requests']} requests, {stats['connections_created']} connections opened, "
+                f"{stats['connections_reused']} reused ({stats['reuse_ratio']:.0%}), {stats['retries']} retries, "
+                f"{stats['circuits_opened']} circuits opened, {stats['rejected']} requests refused by open circuits")
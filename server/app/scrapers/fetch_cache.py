@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+
+# Returned by fetches whose page is known not to have changed since the last run
+NOT_MODIFIED = object()
+
+class FetchCache:
+    """Persistent per-URL validators and body hashes for conditional requests
+
+    Known pages are requested with If-None-Match / If-Modified-Since, and a
+    304 or a body identical to the last one is reported as NOT_MODIFIED so
+    callers can skip parsing and database writes. New validators are only
+    written to disk once the caller confirms the page was processed, so a
+    crash between fetch and commit never hides a change. Not thread-safe:
+    use it from the event loop only (parse_off_loop records parse times
+    there, not in the parse pool).
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.entries = {}
+        self.pending = {}
+        self.requests = 0
+        self.not_modified = 0
+        self.unchanged = 0
+        self.bytes_saved = 0
+        self.parse_ms_saved = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode()).hexdigest() + '.json')
+
+    def get(self, url):
+        if url not in self.entries:
+            try:
+                with open(self._path(url)) as f:
+                    self.entries[url] = json.load(f)
+            except (OSError, ValueError):
+                self.entries[url] = None
+        return self.entries[url]
+
+    def request_headers(self, url):
+        """Conditional request headers for a page fetched before"""
+        self.requests += 1
+        entry = self.get(url)
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def check(self, url, status, response_headers, body):
+        """Return True if the response repeats the cached page
+
+        Otherwise stage the response's validators until confirm(url).
+        """
+        entry = self.get(url)
+        if entry and status == 304:
+            self.not_modified += 1
+            self.bytes_saved += entry['size']
+            self.parse_ms_saved += entry['parse_ms']
+            return True
+        body_hash = hashlib.sha256(body).hexdigest()
+        if entry and entry['hash'] == body_hash:
+            self.unchanged += 1
+            self.parse_ms_saved += entry['parse_ms']
+            return True
+        self.pending[url] = {
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified'),
+            'hash': body_hash,
+            'size': len(body),
+            'parse_ms': 0.0
+        }
+        return False
+
+    def record_parse(self, url, parse_ms):
+        if url in self.pending:
+            self.pending[url]['parse_ms'] = parse_ms
+
+    def confirm(self, urls):
+        """Persist staged entries for pages whose results have been committed"""
+        for url in urls:
+            entry = self.pending.pop(url, None)
+            if entry is None:
+                continue
+            path = self._path(url)
+            with open(f'{path}.tmp', 'w') as f:
+                json.dump(entry, f)
+            os.replace(f'{path}.tmp', path)
+            self.entries[url] = entry
+
+    def summary(self):
+        return (f"Fetch cache: {self.not_modified} not modified, {self.unchanged} unchanged "
+                f"of {self.requests} requests; saved {self.bytes_saved / 1024:.1f} KB download "
+                f"and {self.parse_ms_saved / 1000:.1f} s parsing")
@@ -1,4 +1,5 @@
-from app.scrapers import BaseScraper
+from app.scrapers import BaseScraper, class_strainer
+from app.scrapers.fetch_cache import NOT_MODIFIED
 import re
 from bs4 import BeautifulSoup
 from datetime import datetime
@@ -6,11 +7,12 @@ import asyncio
 import json
 
 class JumiaScraper(BaseScraper):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
         self.min_price = 1.0
         self.max_price = 10000000.0
         self.rate_limit_delay = 1
+        self.base_url = 'https://www.jumia.co.ke'
         self.categories = { 
             'phones': 'phones-tablets', 
             'televisions': 'televisions' 
@@ -19,67 +21,103 @@ class JumiaScraper(BaseScraper):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
     
-    async def get_category_products(self, category_url):
-        """Get products from a category page"""
-        await self.init_session()
+    items_per_page = 40
+    # Product cards and the pager; the price and name on product pages
+    category_strainer = class_strainer('prd', 'pg')
+    product_strainer = class_strainer('-fs24', '-fs20', 'prc', 'name')
+    
+    def parse_category_page(self, html_content):
+        """Extract product listings from a category page"""
+        return self.parse_product_cards(self.make_soup(html_content, self.category_strainer))
+    
+    def parse_listing_page(self, html_content):
+        """Return (products, has_next_page) for one page of a category"""
+        soup = self.make_soup(html_content, self.category_strainer)
+        has_next = soup.select_one('a.pg[aria-label="Next Page"]') is not None
+        return self.parse_product_cards(soup), has_next
+    
+    def parse_product_cards(self, soup):
         products = []
         
+        # Find all product cards
+        product_cards = soup.select('article.prd._fb.col.c-prd')
+        
+        for card in product_cards:
+            try:
+                # Extract product link and name
+                link_elem = card.select_one('a.core')
+                if not link_elem:
+                    continue
+                
+                product_url = self.base_url + link_elem.get('href', '')
+                
+                # Extract product name
+                name_elem = card.select_one('.name')
+                if not name_elem:
+                    continue
+                product_name = name_elem.text.strip()
+                
+                # Extract price
+                price_elem = card.select_one('.prc')
+                if not price_elem:
+                    continue
+                price = self.clean_price(price_elem.text.strip())
+                if not price:
+                    continue
+                
+                # Extract image URL
+                img_elem = card.select_one('img.img')
+                image_url = img_elem.get('data-src') if img_elem else None
+                
+                products.append({
+                    'name': product_name,
+                    'url': product_url,
+                    'price': price,
+                    'image_url': image_url
+                })
+                
+            except Exception as e:
+                print(f"Error processing product card: {str(e)}")
+                continue
+        
+        return products
+    
+    async def get_category_products(self, category_url):
+        """Get products from a category page, or NOT_MODIFIED if it is unchanged"""
         try:
-            async with self.session.get(category_url, headers=self.headers) as response:
-                if response.status == 200:
-                    html_content = await response.text()
-                    soup = BeautifulSoup(html_content, 'html.parser')
-                    
-                    # Find all product cards
-                    product_cards = soup.select('article.prd._fb.col.c-prd')
-                    
-                    for card in product_cards:
-                        try:
-                            # Extract product link and name
-                            link_elem = card.select_one('a.core')
-                            if not link_elem:
-                                continue
-                            
-                            product_url = 'https://www.jumia.co.ke' + link_elem.get('href', '')
-                            
-                            # Extract product name
-                            name_elem = card.select_one('.name')
-                            if not name_elem:
-                                continue
-                            product_name = name_elem.text.strip()
-                            
-                            # Extract price
-                            price_elem = card.select_one('.prc')
-                            if not price_elem:
-                                continue
-                            price = self.clean_price(price_elem.text.strip())
-                            if not price:
-                                continue
-                            
-                            # Extract image URL
-                            img_elem = card.select_one('img.img')
-                            image_url = img_elem.get('data-src') if img_elem else None
-                            
-                            products.append({
-                                'name': product_name,
-                                'url': product_url,
-                                'price': price,
-                                'image_url': image_url
-                            })
-                            
-                        except Exception as e:
-                            print(f"Error processing product card: {str(e)}")
-                            continue
-                    
-                    return products
-                else:
-                    print(f"Failed to fetch category page: {response.status}")
-                    return None
+            html_content = await self.fetch(category_url, headers=self.headers)
+            if html_content is NOT_MODIFIED or html_content is None:
+                return html_content
+            return await self.parse_off_loop(category_url, self.parse_category_page, html_content)
                 
         except Exception as e:
             print(f"Error fetching category products: {str(e)}")
             return None
     
+    async def category_pages(self, category_url):
+        """Yield (page_url, products) for each page of a category until the last one"""
+        page = 1
+        while True:
+            page_url = category_url if page == 1 else f"{category_url}?page={page}"
+            try:
+                html_content = await self.fetch(page_url, headers=self.headers)
+            except Exception as e:
+                print(f"Error fetching category page {page_url}: {str(e)}")
+                return
+            if html_content is None:
+                return
+            if html_content is NOT_MODIFIED:
+                # Unchanged page: its pager is unknown, so try the next page number
+                yield page_url, NOT_MODIFIED
+            else:
+                products, has_next = await self.parse_off_loop(page_url, self.parse_listing_page, html_content)
+                if not products:
+                    return
+                yield page_url, products
+                if not has_next:
+                    return
+            page += 1
+    
     def clean_price(self, price_text):
         """Clean price text and convert to float"""
         try:
@@ -92,7 +130,7 @@ class JumiaScraper(BaseScraper):
             pass
         return None
     
-    async def extract_price(self, html_content):
+    def extract_price(self, html_content):
         try:
             # Main price element
             price_elem = html_content.select_one('span.-b.-ltr.-tal.-fs24')
@@ -108,7 +146,7 @@ class JumiaScraper(BaseScraper):
             print(f"Error extracting price: {str(e)}")
         return None
     
-    async def extract_product_name(self, html_content):
+    def extract_product_name(self, html_content):
         try:
             # Main name element
             name_elem = html_content.select_one('h1.-fs20.-pts.-pbxs')
@@ -1,14 +1,20 @@
-from app.scrapers import BaseScraper
+from app.scrapers import BaseScraper, class_strainer
+from app.scrapers.fetch_cache import NOT_MODIFIED
 import re
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from datetime import datetime
 import asyncio
 import json
 import logging
 
 class KilimallScraper(BaseScraper):
-    def __init__(self):
-        super().__init__()
+    # Listing links on category pages; title and price elements on product pages
+    listing_strainer = SoupStrainer('a', href=re.compile('/listing/'))
+    product_strainer = class_strainer('product-title', 'title', 'product-price', 'price',
+                                      'now-price', 'current-price')
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
         self.min_price = 1.0
         self.max_price = 10000000.0
         self.rate_limit_delay = 2  # Increased delay between requests
@@ -36,85 +42,119 @@ class KilimallScraper(BaseScraper):
         name = re.sub(r'\s+', ' ', name)
         return name.strip()
     
+    def parse_listing_urls(self, html):
+        """Product page URLs linked from a category page"""
+        soup = self.make_soup(html, self.listing_strainer)
+        
+        # Find all product cards and extract URLs
+        product_urls = []
+        for link in soup.find_all('a', href=True):
+            href = link.get('href', '')
+            if '/listing/' in href:
+                if not href.startswith('http'):
+                    href = f'https://www.kilimall.co.ke{href}'
+                product_urls.append(href)
+        return product_urls
+    
+    def parse_product_page(self, product_url, html, category_url):
+        """Extract a listing from a product page, or None if it doesn't qualify"""
+        product_soup = self.make_soup(html, self.product_strainer)
+        
+        # Extract product name
+        name_elem = product_soup.select_one('.product-title, .title, h1')
+        if not name_elem and self.targeted:
+            # Pages titled only by a bare <h1> fall outside the strainer
+            product_soup = self.make_soup(html)
+            name_elem = product_soup.select_one('.product-title, .title, h1')
+        if not name_elem:
+            return None
+            
+        product_name = self.clean_product_name(name_elem.text)
+        if not product_name:
+            return None
+        
+        # Extract price
+        price_elem = product_soup.select_one('.product-price, .price, .now-price, .current-price')
+        if not price_elem:
+            return None
+            
+        price_text = price_elem.text.strip()
+        price_match = re.search(r'[\d,]+', price_text)
+        if not price_match:
+            return None
+            
+        price = float(price_match.group().replace(',', ''))
+        if not (self.min_price <= price <= self.max_price):
+            return None
+        
+        # Filter products based on category
+        if 'television' in category_url.lower():
+            if not any(keyword in product_name.lower() for keyword in ['tv', 'television', 'smart tv', 'led tv', 'oled']):
+                return None
+        elif 'phones' in category_url.lower():
+            if not any(keyword in product_name.lower() for keyword in ['phone', 'smartphone', 'mobile', 'iphone', 'samsung', 'tecno', 'infinix']):
+                return None
+        
+        return {
+            'name': product_name,
+            'url': product_url,
+            'price': price,
+            'platform': 'kilimall'
+        }
+    
+    async def category_pages(self, category_url):
+        """Yield (product_url, [product]) for each product page listed in a category
+
+        Product pages are fetched a few concurrency windows at a time, so a
+        crawl that stops early leaves the rest of the listing unfetched.
+        """
+        full_url = f'https://www.kilimall.co.ke/category/{category_url}' if not category_url.startswith('http') else category_url
+        html_content = await self.fetch(full_url, headers=self.headers, conditional=False)
+        if html_content is None:
+            return
+        product_urls = await self.parse_off_loop(full_url, self.parse_listing_urls, html_content)
+        
+        window = self.max_concurrency * 2
+        for start in range(0, len(product_urls), window):
+            urls = product_urls[start:start + window]
+            pages = await self.fetch_many(
+                urls,
+                lambda url, html: self.parse_product_page(url, html, category_url),
+                headers=self.headers
+            )
+            for url, product in zip(urls, pages):
+                if product is NOT_MODIFIED:
+                    yield url, NOT_MODIFIED
+                elif product:
+                    yield url, [product]
+    
     async def get_category_products(self, category_url):
         """Get products from a category page"""
-        await self.init_session()
         products = []
         
         try:
             full_url = f'https://www.kilimall.co.ke/category/{category_url}' if not category_url.startswith('http') else category_url
             print(f"Fetching Kilimall category: {full_url}")
             
-            async with self.session.get(full_url, headers=self.headers) as response:
-                if response.status == 200:
-                    html_content = await response.text()
-                    soup = BeautifulSoup(html_content, 'html.parser')
-                    
-                    # Find all product cards and extract URLs
-                    product_urls = []
-                    for link in soup.find_all('a', href=True):
-                        href = link.get('href', '')
-                        if '/listing/' in href:
-                            if not href.startswith('http'):
-                                href = f'https://www.kilimall.co.ke{href}'
-                            product_urls.append(href)
-                    
-                    print(f"Found {len(product_urls)} product URLs")
-                    
-                    # Fetch details from each product URL
-                    for product_url in product_urls:
-                        try:
-                            await asyncio.sleep(self.rate_limit_delay)  # Rate limiting
-                            
-                            async with self.session.get(product_url, headers=self.headers) as product_response:
-                                if product_response.status == 200:
-                                    product_html = await product_response.text()
-                                    product_soup = BeautifulSoup(product_html, 'html.parser')
-                                    
-                                    # Extract product name
-                                    name_elem = product_soup.select_one('.product-title, .title, h1')
-                                    if not name_elem:
-                                        continue
-                                        
-                                    product_name = self.clean_product_name(name_elem.text)
-                                    if not product_name:
-                                        continue
-                                    
-                                    # Extract price
-                                    price_elem = product_soup.select_one('.product-price, .price, .now-price, .current-price')
-                                    if not price_elem:
-                                        continue
-                                        
-                                    price_text = price_elem.text.strip()
-                                    price_match = re.search(r'[\d,]+', price_text)
-                                    if not price_match:
-                                        continue
-                                        
-                                    price = float(price_match.group().replace(',', ''))
-                                    if not (self.min_price <= price <= self.max_price):
-                                        continue
-                                    
-                                    # Filter products based on category
-                                    if 'television' in category_url.lower():
-                                        if not any(keyword in product_name.lower() for keyword in ['tv', 'television', 'smart tv', 'led tv', 'oled']):
-                                            continue
-                                    elif 'phones' in category_url.lower():
-                                        if not any(keyword in product_name.lower() for keyword in ['phone', 'smartphone', 'mobile', 'iphone', 'samsung', 'tecno', 'infinix']):
-                                            continue
-                                    
-                                    products.append({
-                                        'name': product_name,
-                                        'url': product_url,
-                                        'price': price,
-                                        'platform': 'kilimall'
-                                    })
-                                    print(f"Added Kilimall product: {product_name}")
-                                    
-                        except Exception as e:
-                            print(f"Error processing product URL {product_url}: {str(e)}")
-                            continue
-                else:
-                    print(f"Failed to fetch category. Status code: {response.status}")
+            # The listing URLs are always needed, so the category page is fetched in full
+            html_content = await self.fetch(full_url, headers=self.headers, conditional=False)
+            if html_content is not None:
+                product_urls = await self.parse_off_loop(full_url, self.parse_listing_urls, html_content)
+                
+                print(f"Found {len(product_urls)} product URLs")
+                
+                # Fetch product pages concurrently within the rate limit
+                pages = await self.fetch_many(
+                    product_urls,
+                    lambda url, html: self.parse_product_page(url, html, category_url),
+                    headers=self.headers
+                )
+                products = [product for product in pages if product and product is not NOT_MODIFIED]
+                for product in products:
+                    print(f"Added Kilimall product: {product['name']}")
+                unchanged = sum(1 for product in pages if product is NOT_MODIFIED)
+                if unchanged:
+                    print(f"Skipped {unchanged} unchanged product pages")
                     
         except Exception as e:
             print(f"Error fetching category: {str(e)}")
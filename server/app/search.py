@@ -0,0 +1,178 @@
+import threading
+import time
+import weakref
+from array import array
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import and_, event, func, or_
+from app import db
+from app.models import Product
+from app.pagination import InvalidCursor
+
+# Indexes that should see ORM writes made in this process
+_live_indexes = weakref.WeakSet()
+
+def get_search_backend():
+    """Return the product search backend for the current app
+
+    PostgreSQL uses the pg_trgm GIN index on product.name. Other databases
+    (SQLite in development and tests) use an in-process n-gram index.
+    """
+    backend = current_app.extensions.get('product_search')
+    if backend is None:
+        if db.engine.dialect.name == 'postgresql':
+            backend = TrigramSearch()
+        else:
+            backend = NgramSearch(current_app.config['SEARCH_SYNC_INTERVAL'],
+                                  current_app.config['SEARCH_MAX_CANDIDATES'])
+        current_app.extensions['product_search'] = backend
+    return backend
+
+def _like_pattern(q):
+    escaped = q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+class TrigramSearch:
+    """Substring search backed by the pg_trgm GIN index, ranked by similarity"""
+
+    def filter(self, query, q):
+        return query.filter(Product.name.ilike(_like_pattern(q), escape='\\'))
+
+    def rank(self, query, q, limit=None, after=None):
+        """Matches by descending similarity, then id; see NgramSearch.rank()"""
+        score = func.similarity(Product.name, q)
+        query = query.add_columns(score)
+        if after:
+            if len(after) != 2:
+                raise InvalidCursor('Malformed cursor')
+            similarity, product_id = after
+            query = query.filter(or_(score < similarity, and_(score == similarity, Product.id > product_id)))
+        query = query.order_by(score.desc(), Product.id)
+        rows = query.limit(limit + 1).all() if limit else query.all()
+        if not limit or len(rows) <= limit:
+            return [product for product, _ in rows], None
+        product, similarity = rows[limit - 1]
+        return [product for product, _ in rows[:limit]], [similarity, product.id]
+
+class NgramIndex:
+    """In-memory trigram inverted index over lower-cased product names
+
+    Posting lists are compact arrays of product ids. A lookup scans only the
+    shortest posting list among the query's trigrams and verifies each
+    candidate with a substring check, so stale postings left by renames are
+    harmless.
+    """
+
+    def __init__(self, n=3):
+        self.n = n
+        self.names = {}
+        self.postings = {}
+        self.lock = threading.Lock()
+
+    def grams(self, text):
+        return {text[i:i + self.n] for i in range(len(text) - self.n + 1)}
+
+    def add(self, product_id, name):
+        name = (name or '').lower()
+        with self.lock:
+            old = self.names.get(product_id)
+            if old == name:
+                return
+            self.names[product_id] = name
+            new_grams = self.grams(name) - (self.grams(old) if old else set())
+            for gram in new_grams:
+                self.postings.setdefault(gram, array('I')).append(product_id)
+
+    def matches(self, q):
+        """Return ids of products whose name contains `q`, ascending"""
+        q = q.lower()
+        with self.lock:
+            if len(q) < self.n:
+                return sorted(i for i, name in self.names.items() if q in name)
+            postings = []
+            for gram in self.grams(q):
+                posting = self.postings.get(gram)
+                if posting is None:
+                    return []
+                postings.append(posting)
+            shortest = min(postings, key=len)
+            names = self.names
+            return sorted({i for i in shortest if q in names.get(i, '')})
+
+    def score(self, product_id, q):
+        """Rank key: earlier and tighter matches first"""
+        name = self.names.get(product_id, '')
+        return (name.find(q), len(name) - len(q), product_id)
+
+class NgramSearch:
+    """Substring search over an in-process n-gram index, for non-PostgreSQL databases
+
+    The index is loaded on first use. Rows written through the ORM in this
+    process are indexed immediately; rows written by other processes (the
+    scraper scripts) are picked up by a delta sync at most every
+    `sync_interval` seconds. Terms matching more than `max_candidates`
+    products are filtered with LIKE alone, so the statement never binds
+    one parameter per hit.
+    """
+
+    def __init__(self, sync_interval=30, max_candidates=500):
+        self.index = NgramIndex()
+        self.sync_interval = sync_interval
+        self.max_candidates = max_candidates
+        self.synced_at = None
+        self.synced_max_id = 0
+        self.checked_at = 0
+        _live_indexes.add(self.index)
+
+    def sync(self):
+        if time.monotonic() - self.checked_at < self.sync_interval and self.synced_at:
+            return
+        started = datetime.utcnow()
+        query = db.session.query(Product.id, Product.name)
+        if self.synced_at:
+            query = query.filter(or_(
+                Product.id > self.synced_max_id,
+                Product.last_updated >= self.synced_at
+            ))
+        for product_id, name in query.yield_per(5000):
+            self.index.add(product_id, name)
+            self.synced_max_id = max(self.synced_max_id, product_id)
+        self.synced_at = started
+        self.checked_at = time.monotonic()
+
+    def filter(self, query, q):
+        self.sync()
+        ids = self.index.matches(q)
+        like = Product.name.ilike(_like_pattern(q), escape='\\')
+        if len(ids) > self.max_candidates:
+            # A common term: the LIKE scan is cheaper than an id list this long
+            return query.filter(like)
+        # Re-check in SQL so rows renamed elsewhere never produce false hits
+        return query.filter(Product.id.in_(ids), like)
+
+    def rank(self, query, q, limit=None, after=None, chunk_size=200):
+        """Matches of `query` best first, up to `limit` (all without one), after rank key `after`
+
+        Returns (products, key of the last one if more remain, else None).
+        """
+        scored = sorted((list(self.index.score(i, q.lower())), i) for i in self.index.matches(q))
+        if after:
+            if len(after) != 3:
+                raise InvalidCursor('Malformed cursor')
+            scored = [(key, i) for key, i in scored if key > after]
+        results = []
+        for start in range(0, len(scored), chunk_size):
+            chunk = scored[start:start + chunk_size]
+            found = {p.id: p for p in query.filter(Product.id.in_([i for _, i in chunk])).all()}
+            results.extend((key, found[i]) for key, i in chunk if i in found)
+            if limit and len(results) > limit:
+                break
+        if not limit or len(results) <= limit:
+            return [product for _, product in results], None
+        return [product for _, product in results[:limit]], results[limit - 1][0]
+
+@event.listens_for(Product, 'after_insert')
+@event.listens_for(Product, 'after_update')
+def _index_product(mapper, connection, target):
+    for index in list(_live_indexes):
+        index.add(target.id, target.name)
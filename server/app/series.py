@@ -0,0 +1,38 @@
+import numpy as np
+
+def moving_average(prices, window=7):
+    """Trailing mean over up to `window` points, like rolling(window, min_periods=1).mean()
+
+    Uses a running-sum kernel: O(n) with no per-row Python work.
+    """
+    if len(prices) == 0:
+        return np.empty(0)
+    sums = np.cumsum(prices)
+    lagged = np.zeros_like(sums)
+    lagged[window:] = sums[:-window]
+    counts = np.minimum(np.arange(1, len(prices) + 1), window)
+    return (sums - lagged) / counts
+
+def summarize(prices):
+    """Current/min/max/avg and change statistics for a non-empty price array"""
+    first, last = prices[0], prices[-1]
+    return {
+        'current_price': float(last),
+        'min_price': float(prices.min()),
+        'max_price': float(prices.max()),
+        'avg_price': float(prices.mean()),
+        'price_change': float(last - first),
+        'price_change_pct': float((last / first - 1) * 100)
+    }
+
+def isoformat(timestamps):
+    """ISO-8601 strings for a datetime64 array, like datetime.isoformat()"""
+    whole_seconds = not (timestamps.astype('datetime64[us]').astype(np.int64) % 1000000).any()
+    return np.datetime_as_string(timestamps, unit='s' if whole_seconds else 'us').tolist()
+
+def to_records(timestamps, prices, ma7):
+    """Row-oriented [{'timestamp', 'price', 'ma7'}] built straight from the columns"""
+    return [
+        {'timestamp': t, 'price': p, 'ma7': m}
+        for t, p, m in zip(isoformat(timestamps), prices.tolist(), ma7.tolist())
+    ]
@@ -1,5 +1,6 @@
 // API endpoints
 const API_BASE = '/api/v1';
+const PAGE_LIMIT = 100;
 
 // DOM Elements
 const searchInput = document.getElementById('searchInput');
@@ -30,11 +31,25 @@ async function searchProducts() {
     }
 }
 
+// Fetch every page of the product listing, following next_cursor
+async function fetchAllProducts() {
+    const products = [];
+    let after = null;
+    do {
+        const params = new URLSearchParams({limit: PAGE_LIMIT});
+        if (after) params.set('after', after);
+        const response = await fetch(`${API_BASE}/products?${params}`);
+        const data = await response.json();
+        products.push(...data.products);
+        after = data.next_cursor;
+    } while (after);
+    return products;
+}
+
 // Load all products
 async function loadProducts() {
     try {
-        const response = await fetch(`${API_BASE}/products`);
-        const products = await response.json();
+        const products = await fetchAllProducts();
         displayProducts(products);
     } catch (error) {
         showError('Error loading products');
@@ -65,16 +80,11 @@ function displayProducts(products) {
 // Show product details and price history
 async function showProductDetails(productId) {
     try {
-        const [productResponse, visualizationResponse] = await Promise.all([
-            fetch(`${API_BASE}/products/${productId}`),
-            fetch(`${API_BASE}/products/${productId}/visualization/data`)
-        ]);
-        
-        const product = await productResponse.json();
-        const visualizationData = await visualizationResponse.json();
+        const response = await fetch(`${API_BASE}/products/${productId}/detail`);
+        const detail = await response.json();
         
-        displayProductDetails(product);
-        displayPriceChart(visualizationData);
+        displayProductDetails(detail.product);
+        displayPriceChart(detail.price_history);
         productModal.show();
     } catch (error) {
         showError('Error loading product details');
@@ -100,10 +110,10 @@ function displayProductDetails(product) {
 }
 
 // Display price history chart
-function displayPriceChart(data) {
+function displayPriceChart(priceHistory) {
     const trace = {
-        x: data.dates,
-        y: data.prices,
+        x: priceHistory.map(point => point.timestamp),
+        y: priceHistory.map(point => point.price),
         type: 'scatter',
         mode: 'lines+markers',
         name: 'Price History'
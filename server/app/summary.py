@@ -0,0 +1,154 @@
+from sqlalchemy import func
+from app import db
+from app.models import Product, ProductStat
+
+DIMENSIONS = {
+    'platform': Product.platform,
+    'category': Product.category,
+}
+
+def _upsert(deltas):
+    """Add (dimension, name, count, price_count, price_sum) deltas with INSERT ... ON CONFLICT DO UPDATE
+
+    The increments are applied by the database to the stored row, so
+    concurrent ingest and refresh processes never lose each other's
+    updates. Returns False for dialects without ON CONFLICT.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return False
+
+    table = ProductStat.__table__
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['dimension', 'name'],
+        set_={
+            'count': table.c.count + stmt.excluded.count,
+            'price_count': table.c.price_count + stmt.excluded.price_count,
+            'price_sum': table.c.price_sum + stmt.excluded.price_sum
+        }
+    )
+    db.session.execute(stmt, [
+        {'dimension': dimension, 'name': name, 'count': count, 'price_count': price_count, 'price_sum': price_sum}
+        for dimension, name, count, price_count, price_sum in deltas
+    ])
+    return True
+
+def _increment(deltas):
+    # Portable fallback: an atomic UPDATE ... SET count = count + :d, or an insert for a new group
+    table = ProductStat.__table__
+    for dimension, name, count, price_count, price_sum in deltas:
+        updated = db.session.execute(table.update().where(
+            table.c.dimension == dimension, table.c.name == name
+        ).values(
+            count=table.c.count + count,
+            price_count=table.c.price_count + price_count,
+            price_sum=table.c.price_sum + price_sum
+        )).rowcount
+        if not updated:
+            db.session.execute(table.insert().values(
+                dimension=dimension, name=name, count=count, price_count=price_count, price_sum=price_sum
+            ))
+
+class StatsDelta:
+    """Accumulates summary-table changes so each group row is written once
+
+    Use for bulk ingest; product_added() and price_changed() apply a
+    single-product delta immediately.
+    """
+
+    def __init__(self):
+        self.groups = {}
+
+    def _add(self, platform, category, count=0, old_price=None, new_price=None):
+        for key in (('platform', platform or ''), ('category', category or '')):
+            delta = self.groups.setdefault(key, [0, 0, 0.0])
+            delta[0] += count
+            if old_price is not None:
+                delta[1] -= 1
+                delta[2] -= old_price
+            if new_price is not None:
+                delta[1] += 1
+                delta[2] += new_price
+
+    def added(self, platform, category, price=None):
+        self._add(platform, category, count=1, new_price=price)
+
+    def changed(self, platform, category, old_price, new_price):
+        if old_price != new_price:
+            self._add(platform, category, old_price=old_price, new_price=new_price)
+
+    def apply(self):
+        """Write the accumulated deltas as in-database increments"""
+        deltas = [(dimension, name, count, price_count, price_sum)
+                  for (dimension, name), (count, price_count, price_sum) in self.groups.items()
+                  if count or price_count or price_sum]
+        if deltas and not _upsert(deltas):
+            _increment(deltas)
+        self.groups = {}
+
+def product_added(platform, category, price=None):
+    """Count a newly inserted product; call in the same transaction as the insert"""
+    delta = StatsDelta()
+    delta.added(platform, category, price)
+    delta.apply()
+
+def price_changed(platform, category, old_price, new_price):
+    """Move a product's contribution from its old to its new current price"""
+    delta = StatsDelta()
+    delta.changed(platform, category, old_price, new_price)
+    delta.apply()
+
+def read_stats():
+    """Return {'platforms': [...], 'categories': [...]} from the summary table"""
+    stats = {'platforms': [], 'categories': []}
+    rows = ProductStat.query.filter(ProductStat.count > 0).order_by(
+        ProductStat.dimension, ProductStat.name
+    ).all()
+    for row in rows:
+        key = 'platforms' if row.dimension == 'platform' else 'categories'
+        stats[key].append(row.to_dict())
+    return stats
+
+def compute_stats():
+    """Aggregate the product table directly, in read_stats() format"""
+    stats = {}
+    for dimension, column in DIMENSIONS.items():
+        rows = db.session.query(
+            column,
+            func.count(Product.id),
+            func.count(Product.current_price),
+            func.coalesce(func.sum(Product.current_price), 0.0)
+        ).group_by(column).all()
+        stats[dimension] = {(name or ''): (count, price_count, price_sum)
+                            for name, count, price_count, price_sum in rows}
+    return stats
+
+def rebuild():
+    """Recompute the summary table from the product table
+
+    Returns a list of (dimension, name, stored, actual) tuples for every
+    group that had drifted before the rebuild.
+    """
+    actual = compute_stats()
+    drift = []
+    stored = {(row.dimension, row.name): (row.count, row.price_count, row.price_sum)
+              for row in ProductStat.query.all()}
+    for dimension, groups in actual.items():
+        for name, values in groups.items():
+            before = stored.pop((dimension, name), (0, 0, 0.0))
+            if before[:2] != values[:2] or abs(before[2] - values[2]) > 0.01:
+                drift.append((dimension, name, before, values))
+    drift.extend((dimension, name, values, (0, 0, 0.0))
+                 for (dimension, name), values in stored.items() if values[0])
+
+    ProductStat.query.delete()
+    for dimension, groups in actual.items():
+        for name, (count, price_count, price_sum) in groups.items():
+            db.session.add(ProductStat(dimension=dimension, name=name, count=count,
+                                       price_count=price_count, price_sum=price_sum))
+    return drift
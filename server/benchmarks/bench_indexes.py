@@ -0,0 +1,160 @@
+"""Compare query plans and timings with and without the query indexes
+
+Seeds a synthetic catalog, runs the query shapes used by the API and
+scripts with the indexes dropped, then again with them created, and
+prints the plans and median timings side by side.
+
+Usage:
+    python bench_indexes.py [--products N] [--points N] [--database-url URL]
+
+Without --database-url a temporary SQLite file is used. Pass a
+PostgreSQL URL to get EXPLAIN ANALYZE plans from a real server; all
+tables in that database are dropped and recreated, so point it at a
+scratch database.
+"""
+import sys
+import os
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add the server directory and project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from sqlalchemy import text
+from config import Config
+from app import create_app, db
+from app.models import Product, PriceHistory
+
+QUERIES = {
+    'history_by_product_time': (
+        "SELECT price, timestamp FROM price_history "
+        "WHERE product_id = :product_id AND timestamp >= :since ORDER BY timestamp"
+    ),
+    'product_by_url': "SELECT id FROM product WHERE url = :url",
+    'platform_price_sort': (
+        "SELECT id FROM product WHERE platform = :platform "
+        "ORDER BY current_price, id LIMIT 50"
+    ),
+    'category_latest_sort': (
+        "SELECT id FROM product WHERE category = :category "
+        "ORDER BY last_updated DESC, id DESC LIMIT 50"
+    ),
+}
+
+def seed(products, points):
+    """Insert a synthetic catalog with Core bulk inserts"""
+    now = datetime.utcnow()
+    platforms = ['jumia', 'kilimall', 'jiji']
+    categories = ['phones', 'televisions']
+    rows = [{
+        'id': i,
+        'name': f'Product {i}',
+        'url': f'https://example.com/product/{i}',
+        'platform': platforms[i % len(platforms)],
+        'category': categories[i % len(categories)],
+        'current_price': round(random.uniform(500, 200000), 2),
+        'last_updated': now - timedelta(minutes=random.randint(0, 60 * 24 * 30)),
+        'created_at': now
+    } for i in range(1, products + 1)]
+    db.session.execute(Product.__table__.insert(), rows)
+
+    batch = []
+    for product_id in range(1, products + 1):
+        for j in range(points):
+            batch.append({
+                'product_id': product_id,
+                'price': round(random.uniform(500, 200000), 2),
+                'timestamp': now - timedelta(hours=6 * j)
+            })
+        if len(batch) >= 50000:
+            db.session.execute(PriceHistory.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(PriceHistory.__table__.insert(), batch)
+    db.session.commit()
+
+def declared_indexes():
+    return list(Product.__table__.indexes) + list(PriceHistory.__table__.indexes)
+
+def explain(sql, params):
+    if db.engine.dialect.name == 'postgresql':
+        rows = db.session.execute(text('EXPLAIN (ANALYZE, BUFFERS) ' + sql), params)
+        return '\n'.join(row[0] for row in rows)
+    rows = db.session.execute(text('EXPLAIN QUERY PLAN ' + sql), params)
+    return '\n'.join(row[-1] for row in rows)
+
+def measure(sql, param_sets, repeat):
+    timings = []
+    for _ in range(repeat):
+        for params in param_sets:
+            start = time.perf_counter()
+            db.session.execute(text(sql), params).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def run_phase(label, products, repeat):
+    db.session.execute(text('ANALYZE'))
+    since = datetime.utcnow() - timedelta(days=30)
+    sample = random.sample(range(1, products + 1), min(20, products))
+    params = {
+        'history_by_product_time': [{'product_id': i, 'since': since} for i in sample],
+        'product_by_url': [{'url': f'https://example.com/product/{i}'} for i in sample],
+        'platform_price_sort': [{'platform': p} for p in ('jumia', 'kilimall', 'jiji')],
+        'category_latest_sort': [{'category': c} for c in ('phones', 'televisions')],
+    }
+
+    results = {}
+    print(f"\n=== {label} ===")
+    for name, sql in QUERIES.items():
+        plan = explain(sql, params[name][0])
+        median = measure(sql, params[name], repeat)
+        results[name] = median
+        print(f"\n-- {name}: {median:.3f} ms (median)")
+        print(plan)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--points', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database-url')
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_indexes.db')
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for index in declared_indexes():
+            index.drop(db.engine)
+
+        print(f"Seeding {args.products} products x {args.points} price points on {db.engine.dialect.name}...")
+        seed(args.products, args.points)
+
+        before = run_phase('Before (primary keys only)', args.products, args.repeat)
+        for index in declared_indexes():
+            index.create(db.engine)
+        after = run_phase('After (query indexes)', args.products, args.repeat)
+
+        print("\n=== Summary ===")
+        for name in QUERIES:
+            speedup = before[name] / after[name] if after[name] else float('inf')
+            print(f"{name:28s} {before[name]:10.3f} ms -> {after[name]:8.3f} ms  ({speedup:.1f}x)")
+
+        if not args.database_url:
+            db.drop_all()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Compare per-row ORM ingest with the bulk upsert ingest
+
+Ingests N scraped records (half new products, half price changes to
+existing ones) the way collect_products used to: a lookup per URL, ORM
+objects added one by one and a commit every 10 new products. Then
+ingests the same workload with app.ingest.ingest_records.
+
+Usage:
+    python bench_ingest.py [--records N] [--database-url URL]
+
+Without --database-url a temporary SQLite file is used. All tables in
+the target database are dropped and recreated.
+"""
+import sys
+import os
+import argparse
+import tempfile
+import time
+from datetime import datetime
+
+# Add the server directory and project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from config import Config
+from app import create_app, db
+from app.models import Product, PriceHistory
+from app.cache import bump_generation
+from app.ingest import ingest_records
+from app.rollup import record_price
+from app.summary import product_added, price_changed
+
+def workload(records, offset, price):
+    """Half the URLs exist already (ids below records/2), half are new"""
+    return [{
+        'name': f'Product {i}',
+        'url': f'https://example.com/{offset}/{i}',
+        'platform': 'jumia',
+        'category': 'phones',
+        'price': price + i % 100
+    } for i in range(records)]
+
+def legacy_ingest(records):
+    added = 0
+    for data in records:
+        now = datetime.utcnow()
+        existing = Product.query.filter_by(url=data['url']).first()
+        if existing:
+            if existing.current_price != data['price']:
+                db.session.add(PriceHistory(product=existing, price=data['price'], timestamp=now))
+                price_changed(existing.platform, existing.category, existing.current_price, data['price'])
+                existing.current_price = data['price']
+                existing.last_updated = now
+                record_price(existing.id, data['price'], now)
+            continue
+        product = Product(name=data['name'], url=data['url'], platform=data['platform'],
+                          category=data['category'], current_price=data['price'], last_updated=now)
+        db.session.add(product)
+        db.session.flush()
+        product_added(data['platform'], data['category'], data['price'])
+        db.session.add(PriceHistory(product=product, price=data['price'], timestamp=now))
+        record_price(product.id, data['price'], now)
+        added += 1
+        if added % 10 == 0:
+            bump_generation()
+            db.session.commit()
+    bump_generation()
+    db.session.commit()
+
+def bulk_ingest(records):
+    ingest_records(records)
+    bump_generation()
+    db.session.commit()
+
+def run(label, ingest, records, offset):
+    # Seed the "existing" half through the same path, then time the mixed workload
+    ingest(workload(records // 2, offset, 100.0))
+    db.session.expunge_all()
+    mixed = workload(records, offset, 200.0)
+    start = time.perf_counter()
+    ingest(mixed)
+    elapsed = time.perf_counter() - start
+    db.session.expunge_all()
+    print(f"{label:10s} {records} records in {elapsed:8.3f} s ({records / elapsed:10.0f} records/sec)")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=10000)
+    parser.add_argument('--database-url')
+    args = parser.parse_args()
+
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_ingest.db')
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        print(f"Ingesting on {db.engine.dialect.name}...")
+        legacy = run('per-row', legacy_ingest, args.records, 'legacy')
+        bulk = run('bulk', bulk_ingest, args.records, 'bulk')
+        print(f"\nSpeedup: {legacy / bulk:.1f}x")
+        if not args.database_url:
+            db.drop_all()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Compare HTML parser backends on Jumia and Kilimall pages
+
+Times each installed backend (html.parser, lxml, selectolax) on the
+scrapers' real parse functions: Jumia category and product pages and
+Kilimall category and product pages. Compares full-tree parsing with
+targeted parsing (only the elements each parse reads are built) on time
+and peak memory per page for the BeautifulSoup backends. Also measures
+how long the event loop is blocked while pages are parsed in the parse
+pool versus inline.
+
+Usage:
+    python bench_parsers.py [--repeat N] [--pages-dir DIR]
+
+With --pages-dir, saved pages named jumia_category*.html,
+jumia_product*.html, kilimall_category*.html and kilimall_product*.html
+are used instead of the generated fixtures.
+"""
+import sys
+import os
+import argparse
+import asyncio
+import glob
+import statistics
+import time
+import tracemalloc
+
+# Add the server directory and project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.scrapers import available_parsers
+from app.scrapers.jumia import JumiaScraper
+from app.scrapers.kilimall import KilimallScraper
+from benchmarks.fixtures import (jumia_category_page, jumia_product_page,
+                                 kilimall_category_page, kilimall_product_page)
+
+PAGE_KINDS = ('jumia_category', 'jumia_product', 'kilimall_category', 'kilimall_product')
+
+def load_pages(pages_dir):
+    if not pages_dir:
+        return {
+            'jumia_category': [jumia_category_page(40)],
+            'jumia_product': [jumia_product_page(i) for i in range(1, 4)],
+            'kilimall_category': [kilimall_category_page(60)],
+            'kilimall_product': [kilimall_product_page(i) for i in range(1, 4)],
+        }
+    pages = {}
+    for kind in PAGE_KINDS:
+        pages[kind] = []
+        for path in sorted(glob.glob(os.path.join(pages_dir, f'{kind}*.html'))):
+            with open(path, encoding='utf-8', errors='replace') as f:
+                pages[kind].append(f.read())
+    return pages
+
+def parse_functions(parser, targeted=True):
+    jumia = JumiaScraper(parser=parser, targeted=targeted)
+    kilimall = KilimallScraper(parser=parser, targeted=targeted)
+    return {
+        'jumia_category': jumia.parse_category_page,
+        'jumia_product': lambda html: jumia.parse_product_details('https://www.jumia.co.ke/p', html),
+        'kilimall_category': kilimall.parse_listing_urls,
+        'kilimall_product': lambda html: kilimall.parse_product_page('https://www.kilimall.co.ke/listing/1', html, 'phones'),
+    }
+
+def time_parse(parse, pages, repeat):
+    timings = []
+    for _ in range(repeat):
+        for html in pages:
+            start = time.perf_counter()
+            parse(html)
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def peak_memory(parse, pages):
+    """Largest peak of Python allocations while parsing one page, in KB"""
+    peaks = []
+    for html in pages:
+        tracemalloc.start()
+        try:
+            parse(html)
+            peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        finally:
+            tracemalloc.stop()
+    return max(peaks)
+
+async def loop_stall(scraper, pages, off_loop):
+    """Longest gap between 1 ms ticks of a heartbeat task while pages are parsed"""
+    gaps = []
+    done = False
+
+    async def heartbeat():
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            gaps.append((now - last) * 1000)
+            last = now
+
+    beat = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0.01)
+    for html in pages:
+        if off_loop:
+            await scraper.parse_off_loop('https://www.jumia.co.ke/c', scraper.parse_category_page, html)
+        else:
+            scraper.parse_category_page(html)
+            await asyncio.sleep(0)
+    done = True
+    await beat
+    return max(gaps)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--pages-dir')
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages_dir)
+    backends = available_parsers()
+    print(f"Backends: {', '.join(backends)}")
+    print(f"\n{'page':20s}" + ''.join(f"{name:>14s}" for name in backends) + "   (median ms/page)")
+    for kind in PAGE_KINDS:
+        if not pages[kind]:
+            continue
+        row = [time_parse(parse_functions(name)[kind], pages[kind], args.repeat) for name in backends]
+        print(f"{kind:20s}" + ''.join(f"{ms:14.2f}" for ms in row))
+
+    soup_backends = [name for name in backends if name != 'selectolax']
+    print("\nFull tree vs targeted parsing (median ms/page, peak KB/page):")
+    for name in soup_backends:
+        for kind in PAGE_KINDS:
+            if not pages[kind]:
+                continue
+            full = parse_functions(name, targeted=False)[kind]
+            targeted = parse_functions(name, targeted=True)[kind]
+            full_ms, targeted_ms = (time_parse(parse, pages[kind], args.repeat) for parse in (full, targeted))
+            full_kb, targeted_kb = (peak_memory(parse, pages[kind]) for parse in (full, targeted))
+            print(f"{name:12s} {kind:18s} {full_ms:8.2f} -> {targeted_ms:7.2f} ms  "
+                  f"{full_kb:9.0f} -> {targeted_kb:7.0f} KB")
+
+    if pages['jumia_category']:
+        print("\nLongest event-loop stall while parsing Jumia category pages:")
+        for name in dict.fromkeys(['html.parser', backends[0]]):
+            scraper = JumiaScraper(parser=name)
+            category_pages = pages['jumia_category'] * 5
+            inline = asyncio.run(loop_stall(scraper, category_pages, off_loop=False))
+            pooled = asyncio.run(loop_stall(scraper, category_pages, off_loop=True))
+            print(f"{name:20s} inline {inline:7.1f} ms   parse pool {pooled:7.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Measure Kilimall category scraping throughput against a local fixture server
+
+Runs KilimallScraper.get_category_products over a fixture category with
+the sequential configuration (one request in flight) and the concurrent
+one, at the same requests-per-second budget, and reports pages/sec.
+
+Usage:
+    python bench_scraper.py [--listings N] [--latency S] [--rps R] [--burst B] [--concurrency C]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import time
+
+# Add the server directory and project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.scrapers.kilimall import KilimallScraper
+from fixture_server import start_fixture_server
+
+async def run(base_url, listings, **limits):
+    scraper = KilimallScraper(**limits)
+    start = time.perf_counter()
+    try:
+        products = await scraper.get_category_products(f'{base_url}/category/mobile-phones')
+    finally:
+        await scraper.close_session()
+    elapsed = time.perf_counter() - start
+    return len(products), elapsed, (listings + 1) / elapsed
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--listings', type=int, default=60)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--rps', type=float, default=20.0)
+    parser.add_argument('--burst', type=int, default=1)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    runner, base_url = await start_fixture_server(args.listings, args.latency)
+    try:
+        results = {}
+        for label, concurrency in (('sequential', 1), ('concurrent', args.concurrency)):
+            results[label] = await run(base_url, args.listings, requests_per_second=args.rps,
+                                       burst=args.burst, max_concurrency=concurrency)
+    finally:
+        await runner.cleanup()
+
+    print(f"\n{args.listings} listings, {args.latency * 1000:.0f} ms latency, "
+          f"{args.rps} req/s, burst {args.burst}")
+    for label, (found, elapsed, rate) in results.items():
+        print(f"{label:12s} {found:4d} products  {elapsed:7.2f} s  {rate:7.1f} pages/sec")
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+"""Measure in-process n-gram search latency on a synthetic catalog
+
+Builds the NgramIndex used by the non-PostgreSQL search backend over N
+generated product names and reports build time, memory and lookup
+latency percentiles for a mix of query lengths. Then loads the first
+--sql-products names into a temporary SQLite database and times the
+listing query the API runs (search filter + one keyset page) through
+SQL, which is where long candidate lists cost the most.
+
+Usage:
+    python bench_search.py [--products N] [--queries N] [--sql-products N]
+"""
+import sys
+import os
+import argparse
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+# Add the server directory and project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from config import Config
+from app import create_app, db
+from app.models import Product
+from app.pagination import paginate
+from app.search import NgramIndex, get_search_backend
+
+BRANDS = ['Samsung', 'Tecno', 'Infinix', 'Itel', 'Oppo', 'Xiaomi', 'Nokia', 'Apple iPhone',
+          'Vitron', 'Hisense', 'TCL', 'Skyworth', 'LG', 'Sony', 'Realme', 'Vivo']
+MODELS = ['Galaxy', 'Spark', 'Hot', 'Note', 'Camon', 'Pop', 'Redmi', 'Smart TV', 'Android TV',
+          'Frameless', 'A', 'S', 'Pro', 'Max', 'Lite', 'Ultra']
+SPECS = ['4GB RAM', '8GB RAM', '64GB', '128GB', '256GB', '32"', '43"', '55"', '65"',
+         'Dual SIM', '5000mAh', 'Black', 'Blue', 'Green', '4K UHD', 'Full HD']
+
+def product_name(rng):
+    return ' '.join([
+        rng.choice(BRANDS), rng.choice(MODELS), str(rng.randint(1, 99)),
+        rng.choice(SPECS), rng.choice(SPECS), f'SKU{rng.randint(0, 10 ** 7)}'
+    ])
+
+def percentile(timings, fraction):
+    return timings[min(int(len(timings) * fraction), len(timings) - 1)]
+
+def bench_sql(names, queries):
+    """Time search filter + first page through SQL; returns sorted timings in ms"""
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_search.db')
+        RESPONSE_CACHE_SIZE = 0
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(Product.__table__.insert(), [{
+            'id': i, 'name': name, 'url': f'https://example.com/{i}', 'platform': 'jumia'
+        } for i, name in enumerate(names, 1)])
+        db.session.commit()
+        backend = get_search_backend()
+        backend.sync()
+
+        timings = []
+        for q in queries:
+            start = time.perf_counter()
+            paginate(backend.filter(Product.query, q), None, 50)
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--sql-products', type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    names = [product_name(rng) for _ in range(args.products)]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = NgramIndex()
+    for product_id, name in enumerate(names, 1):
+        index.add(product_id, name)
+    build_seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    queries = []
+    for _ in range(args.queries):
+        words = rng.choice(names).split()
+        queries.append(rng.choice([
+            words[0],                       # brand
+            ' '.join(words[:2]),            # brand + model
+            words[-1][:8],                  # partial SKU
+            rng.choice(SPECS).lower(),
+        ]))
+
+    timings = []
+    hits = []
+    for q in queries:
+        start = time.perf_counter()
+        hits.append(len(index.matches(q)))
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+
+    print(f"Products:          {args.products}")
+    print(f"Build time:        {build_seconds:.1f} s")
+    print(f"Index peak memory: {peak / 1024 / 1024:.0f} MB")
+    print(f"Queries:           {len(queries)} (median hits {statistics.median(hits):.0f})")
+    print(f"Latency p50:       {timings[len(timings) // 2]:.2f} ms")
+    print(f"Latency p95:       {timings[int(len(timings) * 0.95)]:.2f} ms")
+
+    if args.sql_products:
+        sql_timings = bench_sql(names[:args.sql_products], queries)
+        print(f"SQL page products: {min(args.sql_products, len(names))}")
+        print(f"SQL page p50:      {percentile(sql_timings, 0.5):.2f} ms")
+        print(f"SQL page p95:      {percentile(sql_timings, 0.95):.2f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Compare the pandas/iterrows visualization path with the columnar one
+
+Seeds a temporary SQLite database with one product's history and times,
+for several history lengths:
+  - legacy:   ORM query -> DataFrame from dicts -> rolling mean -> iterrows
+  - columnar: Core query -> NumPy arrays -> running-sum MA7 -> zip columns
+
+Usage:
+    python bench_series.py [--sizes 1000,10000,100000] [--repeat N]
+"""
+import sys
+import os
+import argparse
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add the server directory and project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import pandas as pd
+from config import Config
+from app import create_app, db
+from app.models import Product, PriceHistory
+from app.history import price_series
+from app.series import moving_average, summarize, to_records
+
+def legacy(product_id, days):
+    since = datetime.utcnow() - timedelta(days=days)
+    price_history = PriceHistory.query.filter(
+        PriceHistory.product_id == product_id,
+        PriceHistory.timestamp >= since
+    ).order_by(PriceHistory.timestamp).all()
+    df = pd.DataFrame([{'timestamp': ph.timestamp, 'price': ph.price} for ph in price_history])
+    stats = {
+        'current_price': float(df['price'].iloc[-1]),
+        'min_price': float(df['price'].min()),
+        'max_price': float(df['price'].max()),
+        'avg_price': float(df['price'].mean()),
+        'price_change': float(df['price'].iloc[-1] - df['price'].iloc[0]),
+        'price_change_pct': float((df['price'].iloc[-1] / df['price'].iloc[0] - 1) * 100)
+    }
+    df['MA7'] = df['price'].rolling(window=7, min_periods=1).mean()
+    records = [{
+        'timestamp': row['timestamp'].isoformat(),
+        'price': float(row['price']),
+        'ma7': float(row['MA7'])
+    } for _, row in df.iterrows()]
+    return stats, records
+
+def columnar(product_id, days):
+    timestamps, prices = price_series(product_id, days)
+    return summarize(prices), to_records(timestamps, prices, moving_average(prices, 7))
+
+def timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_series.db')
+        ROLLUP_THRESHOLD_DAYS = 10 ** 6
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        print(f"{'points':>8} {'legacy ms':>10} {'columnar ms':>12} {'speedup':>8}")
+        for size in (int(s) for s in args.sizes.split(',')):
+            product = Product(name=f'Bench {size}', url=f'https://example.com/bench/{size}', platform='jumia')
+            db.session.add(product)
+            db.session.commit()
+            now = datetime.utcnow()
+            db.session.execute(PriceHistory.__table__.insert(), [{
+                'product_id': product.id,
+                'price': 1000.0 + (i * 37) % 500,
+                'timestamp': now - timedelta(minutes=i)
+            } for i in range(size)])
+            db.session.commit()
+
+            days = size // (60 * 24) + 2
+            assert legacy(product.id, days)[0] == columnar(product.id, days)[0]
+            old = timed(lambda: legacy(product.id, days), args.repeat)
+            new = timed(lambda: columnar(product.id, days), args.repeat)
+            print(f"{size:>8} {old:>10.1f} {new:>12.1f} {old / new:>7.1f}x")
+        db.drop_all()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""End-to-end scraper benchmarks against the local fixture server, saved as JSON
+
+Runs each scraper the way a collection run does, entirely offline:
+Jumia crawls a paginated category and then fetches every product page,
+Kilimall scrapes a category with its product pages. The fixture server
+adds latency and, optionally, injected errors, so retries and circuit
+breaking are exercised too.
+
+For each scraper it reports pages/sec, parse ms/page, products/sec and
+peak Python memory (measured in a second, traced run so tracing does
+not skew the timings), and writes them with the run parameters and git
+commit to a JSON file. Pass --compare with an earlier results file to
+print the change per metric.
+
+Usage:
+    python bench_suite.py [--output FILE] [--compare FILE] [--latency S] [--rps R]
+                          [--concurrency C] [--error-rate P] [--retry-after S] [--no-memory]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+# Add the server directory and project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.scrapers.client import HttpClient
+from app.scrapers.jumia import JumiaScraper
+from app.scrapers.kilimall import KilimallScraper
+from benchmarks.fixture_server import start_fixture_server
+
+# Lower is better for these; higher for the rest
+LOWER_IS_BETTER = {'elapsed_s', 'parse_ms_per_page', 'peak_memory_mb', 'requests', 'retries', 'rejected'}
+
+async def scrape_jumia(scraper, base_url):
+    scraper.base_url = base_url
+    listings = [product async for product in scraper.crawl_category(f'{base_url}/jumia/phones/')]
+    details = await asyncio.gather(*(scraper.get_product_details(product['url']) for product in listings))
+    return [product for product in details if product and product['price']]
+
+async def scrape_kilimall(scraper, base_url):
+    return await scraper.get_category_products(f'{base_url}/category/mobile-phones')
+
+SCRAPERS = {
+    'jumia': (JumiaScraper, scrape_jumia),
+    'kilimall': (KilimallScraper, scrape_kilimall),
+}
+
+async def run_scraper(name, base_url, args):
+    scraper_class, scrape = SCRAPERS[name]
+    async with HttpClient(retry_budget=args.retry_budget) as client:
+        scraper = scraper_class(requests_per_second=args.rps, burst=args.concurrency,
+                                max_concurrency=args.concurrency, client=client, backoff=0.05)
+        start = time.perf_counter()
+        try:
+            products = await scrape(scraper, base_url)
+        finally:
+            await scraper.close_session()
+        elapsed = time.perf_counter() - start
+        stats = client.stats()
+    return {
+        'elapsed_s': elapsed,
+        'pages': scraper.pages_parsed,
+        'pages_per_sec': scraper.pages_parsed / elapsed,
+        'parse_ms_per_page': scraper.parse_ms / scraper.pages_parsed if scraper.pages_parsed else 0.0,
+        'products': len(products),
+        'products_per_sec': len(products) / elapsed,
+        'requests': stats['requests'],
+        'retries': stats['retries'],
+        'rejected': stats['rejected'],
+    }
+
+async def traced_peak(name, base_url, args):
+    tracemalloc.start()
+    try:
+        await run_scraper(name, base_url, args)
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nChange since {previous.get('commit') or previous_path}:")
+    for name, metrics in results.items():
+        before = previous['results'].get(name, {})
+        for metric, value in metrics.items():
+            old = before.get(metric)
+            if not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / old
+            better = change < 0 if metric in LOWER_IS_BETTER else change > 0
+            marker = '' if abs(change) < 0.05 else (' better' if better else ' WORSE')
+            print(f"{name:10s} {metric:20s} {old:10.2f} -> {value:10.2f} {change:+7.1%}{marker}")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare')
+    parser.add_argument('--listings', type=int, default=60)
+    parser.add_argument('--jumia-pages', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--rps', type=float, default=100.0)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--retry-after', type=float)
+    parser.add_argument('--retry-budget', type=int, default=100)
+    parser.add_argument('--no-memory', action='store_true')
+    args = parser.parse_args()
+
+    runner, base_url = await start_fixture_server(
+        args.listings, args.latency, jumia_pages=args.jumia_pages, error_rate=args.error_rate,
+        error_status=args.error_status, retry_after=args.retry_after
+    )
+    try:
+        results = {}
+        for name in SCRAPERS:
+            results[name] = await run_scraper(name, base_url, args)
+            if not args.no_memory:
+                results[name]['peak_memory_mb'] = await traced_peak(name, base_url, args)
+    finally:
+        await runner.cleanup()
+
+    print(f"\n{args.latency * 1000:.0f} ms latency, {args.rps} req/s, concurrency {args.concurrency}, "
+          f"{args.error_rate:.0%} errors")
+    for name, metrics in results.items():
+        memory = f"{metrics['peak_memory_mb']:7.1f} MB" if 'peak_memory_mb' in metrics else ''
+        print(f"{name:10s} {metrics['pages_per_sec']:7.1f} pages/sec  {metrics['parse_ms_per_page']:6.2f} ms parse/page  "
+              f"{metrics['products_per_sec']:7.1f} products/sec  {metrics['retries']:3d} retries  {memory}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'commit': git_commit(),
+            'timestamp': datetime.utcnow().isoformat(),
+            'params': vars(args),
+            'results': results
+        }, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+if __name__ == '__main__':
+    asyncio.run(main())
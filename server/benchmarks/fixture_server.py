@@ -0,0 +1,77 @@
+"""Local aiohttp server that imitates Kilimall and Jumia category and product pages
+
+Used by the scraper benchmarks so throughput can be measured without
+touching the real sites. Every response is delayed by `latency` seconds
+to stand in for network round trips. With `etags`, product pages carry
+an ETag and answer matching If-None-Match requests with 304. Jumia
+categories are paginated with ?page=N over `jumia_pages` pages.
+
+With `error_rate`, that fraction of requests (chosen by a seeded random
+generator, so runs are repeatable) is answered with `error_status`,
+carrying a Retry-After of `retry_after` seconds when one is given.
+"""
+import asyncio
+import hashlib
+import random
+from aiohttp import web
+from benchmarks.fixtures import (jumia_category_page, jumia_product_page,
+                                 kilimall_category_page, kilimall_product_page)
+
+def create_fixture_app(listings=60, latency=0.05, etags=False, jumia_pages=3,
+                       error_rate=0.0, error_status=503, retry_after=None, seed=0):
+    rng = random.Random(seed)
+
+    @web.middleware
+    async def inject_errors(request, handler):
+        if error_rate and rng.random() < error_rate:
+            await asyncio.sleep(latency)
+            headers = {'Retry-After': str(retry_after)} if retry_after is not None else None
+            return web.Response(status=error_status, headers=headers)
+        return await handler(request)
+
+    async def category(request):
+        await asyncio.sleep(latency)
+        html = kilimall_category_page(listings, base_url=f'{request.scheme}://{request.host}')
+        return web.Response(text=html, content_type='text/html')
+
+    async def product(request):
+        await asyncio.sleep(latency)
+        html = kilimall_product_page(int(request.match_info['id']))
+        if not etags:
+            return web.Response(text=html, content_type='text/html')
+        etag = '"' + hashlib.md5(html.encode()).hexdigest() + '"'
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.Response(text=html, content_type='text/html', headers={'ETag': etag})
+
+    async def jumia_category(request):
+        await asyncio.sleep(latency)
+        page = int(request.query.get('page', 1))
+        if page > jumia_pages:
+            return web.Response(status=404)
+        return web.Response(text=jumia_category_page(40, page, pages=jumia_pages), content_type='text/html')
+
+    async def jumia_product(request):
+        await asyncio.sleep(latency)
+        html = jumia_product_page(int(request.match_info['sku'][3:]))
+        return web.Response(text=html, content_type='text/html')
+
+    app = web.Application(middlewares=[inject_errors])
+    app.router.add_get('/category/mobile-phones', category)
+    app.router.add_get('/listing/{id}', product)
+    app.router.add_get('/jumia/{category}/', jumia_category)
+    app.router.add_get(r'/{slug:[a-z0-9-]+}-{sku:mpg\d+}.html', jumia_product)
+    return app
+
+async def start_fixture_server(listings=60, latency=0.05, etags=False, jumia_pages=3, **errors):
+    """Start the fixture server on a free port; returns (runner, base_url)
+
+    Extra keyword arguments (error_rate, error_status, retry_after, seed)
+    configure error injection.
+    """
+    runner = web.AppRunner(create_fixture_app(listings, latency, etags, jumia_pages, **errors))
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f'http://127.0.0.1:{port}'
@@ -0,0 +1,66 @@
+"""Synthetic Jumia and Kilimall pages shaped like the real ones
+
+The markup mirrors what the scrapers select on (product cards, title and
+price elements), padded with the navigation, inline scripts and footer
+links that make up most of a real storefront page, so parser timings and
+memory are representative. Saved copies of real pages can be used
+instead wherever a benchmark takes --pages-dir.
+"""
+
+def _chrome(body, links=300, script_kb=80):
+    nav = ''.join(
+        f'<li class="menu-item"><a href="/section-{i}/" class="itm">Section {i}</a></li>' for i in range(links)
+    )
+    script = 'window.__STORE__ = {' + ','.join(f'"k{i}":"{"x" * 40}"' for i in range(script_kb * 20)) + '};'
+    footer = ''.join(f'<a href="/help/{i}" rel="nofollow">Help topic {i}</a>' for i in range(links // 2))
+    return (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>Store</title>'
+        f'<script>{script}</script><style>.prd{{display:block}}</style></head><body>'
+        f'<header><nav><ul class="menu">{nav}</ul></nav></header>'
+        f'<main class="-pvs">{body}</main>'
+        f'<footer><div class="links">{footer}</div></footer></body></html>'
+    )
+
+def jumia_category_page(products=40, page=1, base_url='https://www.jumia.co.ke', pages=None):
+    cards = ''.join(
+        '<article class="prd _fb col c-prd">'
+        f'<a class="core" href="/phone-model-{page}-{i}-mpg{page * 1000 + i}.html" data-gtm-id="{i}">'
+        f'<div class="img-c"><img class="img" data-src="https://ke.jumia.is/p/{i}.jpg" alt=""></div>'
+        f'<div class="info"><h3 class="name">Samsung Galaxy A{i % 60} 6.6" 4GB RAM 128GB</h3>'
+        f'<div class="prc">KSh {12000 + page * 100 + i * 7:,}</div>'
+        f'<div class="old">KSh {15000 + i * 9:,}</div><div class="bdg _dsct">-{i % 40}%</div>'
+        '<div class="rev"><div class="stars _s">4.2 out of 5</div>(31)</div></div></a>'
+        '<footer class="ft"><button class="add btn _md">Add To Cart</button></footer>'
+        '</article>'
+        for i in range(1, products + 1)
+    )
+    pager = ''
+    if pages and page < pages:
+        pager = f'<div class="pg-w"><a class="pg" href="?page={page + 1}#catalog-listing" aria-label="Next Page">&gt;</a></div>'
+    return _chrome(f'<section class="card -fh"><div class="-paxs row _no-g _4cl-3cm-shs">{cards}</div>{pager}</section>')
+
+def jumia_product_page(i=1):
+    specs = ''.join(f'<li>Specification line {n} for product {i}</li>' for n in range(60))
+    return _chrome(
+        f'<section class="col12"><h1 class="-fs20 -pts -pbxs">Samsung Galaxy A{i % 60} 6.6" 4GB RAM 128GB</h1>'
+        f'<div class="df -i-ctr -fw-w"><span class="-b -ltr -tal -fs24">KSh {12000 + i * 7:,}</span>'
+        f'<span class="-tal -gy5 -lthr -fs16">KSh {15000 + i * 9:,}</span></div>'
+        f'<div class="markup -mhm -pvl -oxa">{specs}</div></section>'
+    )
+
+def kilimall_category_page(listings=60, base_url=''):
+    cards = ''.join(
+        f'<div class="product-item"><a href="{base_url}/listing/{i}" class="product-link">'
+        f'<img src="https://image.kilimall.com/{i}.jpg"><p class="product-title">Samsung Galaxy phone {i}</p>'
+        f'<div class="product-price">KSh {10000 + i * 10:,}</div></a></div>'
+        for i in range(1, listings + 1)
+    )
+    return _chrome(f'<div class="category-products">{cards}</div>')
+
+def kilimall_product_page(i=1):
+    description = 'Lorem ipsum dolor sit amet. ' * 200
+    return _chrome(
+        f'<div class="product-detail"><h1 class="product-title">Samsung Galaxy phone {i}</h1>'
+        f'<div class="product-price">KSh {10000 + i * 10:,}</div>'
+        f'<div class="description">{description}</div></div>'
+    )
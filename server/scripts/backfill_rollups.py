@@ -0,0 +1,48 @@
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.cache import bump_generation
+from app.rollup import backfill
+
+def backfill_rollups(days=None, product_id=None, all_months=False):
+    """Rebuild the price_daily rollup from raw price history
+
+    Months already downsampled by retention keep their rollups unless
+    all_months is set.
+    """
+    app = create_app()
+    with app.app_context():
+        since = datetime.utcnow() - timedelta(days=days) if days else None
+        product_ids = [product_id] if product_id else None
+        
+        scope = f"last {days} days" if days else ("all history" if all_months else "months not yet downsampled")
+        print(f"Rebuilding daily rollups ({scope}{f', product {product_id}' if product_id else ''})...")
+        try:
+            written = backfill(product_ids=product_ids, since=since, all_months=all_months)
+            bump_generation()
+            db.session.commit()
+            print(f"Done: wrote {written} daily rows")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error rebuilding rollups: {str(e)}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg != '--all-months']
+    all_months = '--all-months' in sys.argv[1:]
+    if args and args[0] in ('-h', '--help'):
+        print("Usage:")
+        print("Rebuild everything: python backfill_rollups.py")
+        print("Rebuild recent days: python backfill_rollups.py <days>")
+        print("Rebuild one product: python backfill_rollups.py <days> <product_id>")
+        print("Add --all-months to also rebuild months retention has downsampled (complete history only)")
+        sys.exit(0)
+    
+    days = int(args[0]) if len(args) > 0 and int(args[0]) > 0 else None
+    product_id = int(args[1]) if len(args) > 1 else None
+    backfill_rollups(days, product_id, all_months)
@@ -0,0 +1,85 @@
+"""Bulk export and import of products and price history
+
+Exports write one file per table into a directory; imports read them back
+in dependency order (product before price_history). On PostgreSQL the
+data is streamed through COPY, never held in memory. Formats:
+
+    csv      plain CSV with a header row
+    csv.gz   gzip-compressed CSV
+    binary   PostgreSQL binary COPY format (fastest; PostgreSQL only)
+    parquet  compressed columnar archive (needs pyarrow)
+
+After an import the platform/category statistics and the daily rollups
+are rebuilt from the loaded rows unless --skip-derived is given. Rollups
+of months older than HISTORY_DOWNSAMPLE_AFTER_MONTHS are kept as they are;
+pass --all-months to rebuild them too when the archive predates retention.
+
+Usage:
+    python bulk_history.py export DIR [--format FORMAT] [--tables product price_history]
+    python bulk_history.py import DIR [--format FORMAT] [--tables ...] [--skip-derived] [--all-months]
+"""
+import sys
+import os
+import argparse
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.bulk import FORMATS, TABLES, export_table, import_table, table_path
+from app.cache import bump_generation
+from app.rollup import backfill
+from app.summary import rebuild
+
+def export_tables(directory, file_format, tables):
+    os.makedirs(directory, exist_ok=True)
+    for name in tables:
+        path = table_path(directory, name, file_format)
+        start = time.perf_counter()
+        rows = export_table(name, path, file_format)
+        elapsed = time.perf_counter() - start
+        print(f"Exported {rows} {name} rows to {path} in {elapsed:.1f} s "
+              f"({os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+
+def import_tables(directory, file_format, tables, skip_derived=False, all_months=False):
+    for name in tables:
+        path = table_path(directory, name, file_format)
+        start = time.perf_counter()
+        rows = import_table(name, path, file_format)
+        print(f"Imported {rows} {name} rows from {path} in {time.perf_counter() - start:.1f} s")
+    if not skip_derived:
+        print("Rebuilding statistics and daily rollups...")
+        rebuild()
+        backfill(all_months=all_months)
+    bump_generation()
+    db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('action', choices=['export', 'import'])
+    parser.add_argument('directory')
+    parser.add_argument('--format', choices=list(FORMATS), default='csv.gz')
+    parser.add_argument('--tables', nargs='+', choices=list(TABLES), default=list(TABLES))
+    parser.add_argument('--skip-derived', action='store_true',
+                        help='do not rebuild statistics and rollups after an import')
+    parser.add_argument('--all-months', action='store_true',
+                        help='also rebuild rollups of months retention may have downsampled')
+    args = parser.parse_args()
+    # Always in dependency order, whatever order they were given in
+    tables = [name for name in TABLES if name in args.tables]
+
+    app = create_app()
+    with app.app_context():
+        try:
+            if args.action == 'export':
+                export_tables(args.directory, args.format, tables)
+            else:
+                import_tables(args.directory, args.format, tables, args.skip_derived, args.all_months)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error during {args.action}: {str(e)}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
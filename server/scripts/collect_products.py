@@ -1,15 +1,20 @@
 import sys
 import os
 import asyncio
-from datetime import datetime, timezone
-import random
 import logging
+from datetime import datetime
 
 # Add the project root directory to Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app import create_app, db
-from app.models import Product, PriceHistory
+from app.cache import bump_generation
+from app.models import Product
+from app.ingest import ingest_records
+from app.journal import Journal
+from app.figures import prewarm
+from app.scrapers.client import HttpClient
+from app.scrapers.fetch_cache import FetchCache
 from app.scrapers.jumia import JumiaScraper
 from app.scrapers.kilimall import KilimallScraper
 from app.scrapers.jiji import JijiScraper
@@ -42,112 +47,162 @@ PLATFORM_URLS = {
     }
 }
 
+# Listings are handed to the ingest stage in chunks of about this many products
+INGEST_CHUNK = 100
+
+def ingest_products(platform, category, products, stats):
+    """Upsert a chunk of one category's listings and record price changes in a single batch"""
+    records = [dict(product_data, platform=platform, category=category) for product_data in products]
+    try:
+        counts = ingest_records(records)
+        bump_generation()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        stats[platform]['failed'] += len(records)
+        logger.error(f"Error ingesting {platform} - {category}: {str(e)}")
+        return False
+    
+    stats[platform]['success'] += counts['added']
+    stats[platform]['updated'] += counts['updated']
+    logger.info(f"{platform} - {category}: added {counts['added']}, updated {counts['updated']}, "
+                f"unchanged {counts['unchanged']}")
+    return True
+
+async def collect_platform(platform, scraper, categories, queue, budget):
+    """Crawl one platform's categories and stream the listings to the ingest stage
+    
+    Runs concurrently with the other platforms; pacing comes from the
+    scraper's own per-host rate limiter. Listings are queued in chunks as
+    pages are parsed, never splitting a page, and each crawl stops at the
+    page/item budget or after a run of known products at unchanged prices.
+    """
+    logger.info(f"\nCollecting products from {platform.upper()}...")
+    known = dict(db.session.query(Product.url, Product.current_price).filter(Product.platform == platform))
+    try:
+        for category, url in categories.items():
+            logger.info(f"\nProcessing {platform} - {category}")
+            found = 0
+            chunk = []
+            try:
+                async for product_data in scraper.crawl_category(url, known=known, **budget):
+                    if len(chunk) >= INGEST_CHUNK and product_data['page_url'] != chunk[-1]['page_url']:
+                        await queue.put((platform, category, chunk))
+                        chunk = []
+                    chunk.append(product_data)
+                    found += 1
+            except Exception as e:
+                logger.error(f"Error processing category {category} from {platform}: {str(e)}")
+            
+            if chunk:
+                await queue.put((platform, category, chunk))
+            
+            if not found:
+                logger.warning(f"No new or changed products found for {platform} - {category}")
+                continue
+            
+            logger.info(f"Found {found} products in {platform} - {category}")
+    finally:
+        await scraper.close_session()
+
+def finished_pages(products):
+    """Pages whose every product is in `products`; a page the crawl stopped partway through is left out"""
+    return {product_data['page_url'] for product_data in products if product_data['page_done']}
+
+async def ingest(queue, stats, fetch_cache=None):
+    """Single writer for all platforms, so database work never interleaves"""
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        platform, category, products = item
+        if ingest_products(platform, category, products, stats) and fetch_cache:
+            # Remember these pages only once their data is committed
+            fetch_cache.confirm(finished_pages(products))
+
+async def journal_listings(queue, stats, journal, fetch_cache=None):
+    """Append listings to the scrape journal for the ingest worker, instead of writing the database"""
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        platform, category, products = item
+        observed_at = datetime.utcnow().isoformat()
+        for product_data in products:
+            journal.append(dict(product_data, type='listing', platform=platform, category=category, at=observed_at))
+        journal.sync()
+        stats[platform]['journaled'] += len(products)
+        if fetch_cache:
+            # Durable in the journal, so the pages need not be fetched again
+            fetch_cache.confirm(finished_pages(products))
+
 async def collect_products():
     """Collect products from all platforms and categories"""
     app = create_app()
     
     with app.app_context():
-        # Initialize scrapers
-        scrapers = {
-            'jumia': JumiaScraper(),
-            'kilimall': KilimallScraper(),
-            'jiji': JijiScraper()
-        }
-        
-        total_added = 0
-        total_failed = 0
-        platform_stats = {}
+        # Skip pages that haven't changed since the last run when a cache directory is set
+        cache_dir = app.config['FETCH_CACHE_DIR']
+        fetch_cache = FetchCache(cache_dir) if cache_dir else None
         
-        # Collect products from each platform and category
-        for platform, categories in PLATFORM_URLS.items():
-            scraper = scrapers[platform]
-            logger.info(f"\nCollecting products from {platform.upper()}...")
-            platform_stats[platform] = {'success': 0, 'failed': 0}
+        # One connection pool for the whole run, closed even if a platform fails
+        async with HttpClient.from_config(app.config) as client:
+            # Initialize scrapers
+            scrapers = {
+                'jumia': JumiaScraper(fetch_cache=fetch_cache, client=client),
+                'kilimall': KilimallScraper(fetch_cache=fetch_cache, client=client),
+                'jiji': JijiScraper(fetch_cache=fetch_cache, client=client)
+            }
             
-            for category, url in categories.items():
-                logger.info(f"\nProcessing {platform} - {category}")
-                try:
-                    # Get product listings
-                    products = await scraper.get_category_products(url)
-                    
-                    if not products:
-                        logger.warning(f"No products found for {platform} - {category}")
-                        continue
-                    
-                    logger.info(f"Found {len(products)} products in {platform} - {category}")
-                    
-                    # Process each product
-                    for product_data in products[:50]:  
-                        try:
-                            # Check if product already exists
-                            existing = Product.query.filter_by(
-                                url=product_data['url']
-                            ).first()
-                            
-                            if existing:
-                                # Update price if changed
-                                if existing.current_price != product_data['price']:
-                                    price_history = PriceHistory(
-                                        product=existing,
-                                        price=product_data['price'],
-                                        timestamp=datetime.now(timezone.utc)
-                                    )
-                                    existing.current_price = product_data['price']
-                                    existing.last_updated = datetime.now(timezone.utc)
-                                    db.session.add(price_history)
-                                    logger.info(f"Updated price for: {product_data['name']}")
-                                continue
-                            
-                            # Create new product
-                            product = Product(
-                                name=product_data['name'],
-                                url=product_data['url'],
-                                platform=platform,
-                                category=category,
-                                current_price=product_data['price'],
-                                last_updated=datetime.now(timezone.utc)
-                            )
-                            db.session.add(product)
-                            
-                            # Add initial price history
-                            price_history = PriceHistory(
-                                product=product,
-                                price=product_data['price'],
-                                timestamp=datetime.now(timezone.utc)
-                            )
-                            db.session.add(price_history)
-                            
-                            total_added += 1
-                            platform_stats[platform]['success'] += 1
-                            logger.info(f"Added new product: {product_data['name']}")
-                            
-                            # Commit every few products to avoid large transactions
-                            if total_added % 10 == 0:
-                                db.session.commit()
-                            
-                        except Exception as e:
-                            total_failed += 1
-                            platform_stats[platform]['failed'] += 1
-                            logger.error(f"Error processing product {product_data.get('name', 'Unknown')}: {str(e)}")
-                            continue
-                    
-                    # Commit remaining products
-                    db.session.commit()
-                    
-                except Exception as e:
-                    logger.error(f"Error processing category {category} from {platform}: {str(e)}")
-                    continue
-                
-                # Add delay between categories to avoid rate limiting
-                await asyncio.sleep(random.uniform(1, 3))
+            platform_stats = {platform: {'success': 0, 'updated': 0, 'failed': 0, 'journaled': 0}
+                              for platform in PLATFORM_URLS}
+            # With a journal directory, listings are journaled and applied by ingest_worker.py
+            journal_dir = app.config['JOURNAL_DIR']
+            journal = Journal(journal_dir, 'collect', app.config['JOURNAL_SEGMENT_BYTES'],
+                              app.config['JOURNAL_FSYNC_EVERY']) if journal_dir else None
+            queue = asyncio.Queue()
+            budget = {
+                'max_pages': app.config['CRAWL_MAX_PAGES'],
+                'max_items': app.config['CRAWL_MAX_ITEMS'],
+                'stop_after': app.config['CRAWL_STOP_AFTER']
+            }
+            
+            async def scrape_all():
+                # Platforms are separate hosts, so they are scraped side by side
+                await asyncio.gather(*(
+                    collect_platform(platform, scrapers[platform], categories, queue, budget)
+                    for platform, categories in PLATFORM_URLS.items()
+                ))
+                await queue.put(None)
+            
+            if journal:
+                await asyncio.gather(scrape_all(), journal_listings(queue, platform_stats, journal, fetch_cache))
+                journal.close()
+            else:
+                await asyncio.gather(scrape_all(), ingest(queue, platform_stats, fetch_cache))
+        
+        total_added = sum(stats['success'] for stats in platform_stats.values())
+        total_failed = sum(stats['failed'] for stats in platform_stats.values())
         
         # Log final statistics
         logger.info("\n=== Collection Statistics ===")
         logger.info(f"Total products added: {total_added}")
         logger.info(f"Total failures: {total_failed}")
         for platform, stats in platform_stats.items():
-            logger.info(f"{platform.upper()}: Added {stats['success']}, Failed {stats['failed']}")
+            logger.info(f"{platform.upper()}: Added {stats['success']}, Updated {stats['updated']}, Failed {stats['failed']}"
+                        + (f", Journaled {stats['journaled']}" if stats['journaled'] else ""))
+        if fetch_cache:
+            logger.info(fetch_cache.summary())
+        logger.info(client.summary())
         logger.info("===========================")
+        
+        # Render charts for the most viewed products while the data is fresh
+        try:
+            rendered = prewarm()
+            if rendered:
+                logger.info(f"Pre-warmed {rendered} price charts")
+        except Exception as e:
+            logger.error(f"Error pre-warming price charts: {str(e)}")
 
 if __name__ == '__main__':
     asyncio.run(collect_products())
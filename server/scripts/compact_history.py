@@ -0,0 +1,36 @@
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.cache import bump_generation
+from app.compaction import compact_history
+
+def compact(product_id=None):
+    """Merge repeated unchanged prices in price_history into interval rows"""
+    app = create_app()
+    with app.app_context():
+        product_ids = [product_id] if product_id else None
+        print(f"Compacting price history{f' for product {product_id}' if product_id else ''}...")
+        try:
+            before, after = compact_history(product_ids=product_ids)
+            bump_generation()
+            db.session.commit()
+            ratio = before / after if after else 1.0
+            print(f"Done: {before} rows -> {after} rows ({ratio:.1f}x smaller)")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error compacting history: {str(e)}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if args and args[0] in ('-h', '--help'):
+        print("Usage:")
+        print("Compact every product: python compact_history.py")
+        print("Compact one product: python compact_history.py <product_id>")
+        sys.exit(0)
+
+    compact(int(args[0]) if args else None)
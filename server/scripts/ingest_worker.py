@@ -0,0 +1,58 @@
+"""Apply the scrape journal to the database
+
+Reads every journal stream in JOURNAL_DIR from its last committed offset
+and applies the records in batches of JOURNAL_BATCH_SIZE, then deletes
+fully applied segments. With --follow it keeps tailing the journal.
+
+Usage:
+    python ingest_worker.py [--follow] [--interval SECONDS]
+"""
+import sys
+import os
+import argparse
+import time
+
+# Add the project root directory to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.figures import prewarm
+from app.journal import ingest_journal, prune
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--follow', action='store_true', help='keep tailing the journal')
+    parser.add_argument('--interval', type=float, default=5.0, help='seconds between polls when idle')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        journal_dir = app.config['JOURNAL_DIR']
+        if not journal_dir:
+            print("JOURNAL_DIR is not set")
+            return
+
+        while True:
+            start = time.perf_counter()
+            applied = ingest_journal(journal_dir, app.config['JOURNAL_BATCH_SIZE'])
+            total = sum(applied.values())
+            if total:
+                elapsed = time.perf_counter() - start
+                print(f"Applied {total} records ({', '.join(f'{s}: {n}' for s, n in applied.items())}) "
+                      f"in {elapsed:.1f} s, {total / elapsed:.0f} records/sec")
+                removed = prune(journal_dir)
+                if removed:
+                    print(f"Removed {removed} applied journal segments")
+                try:
+                    rendered = prewarm()
+                    if rendered:
+                        print(f"Pre-warmed {rendered} price charts")
+                except Exception as e:
+                    print(f"Error pre-warming price charts: {str(e)}")
+            if not args.follow:
+                break
+            if not total:
+                time.sleep(args.interval)
+
+if __name__ == '__main__':
+    main()
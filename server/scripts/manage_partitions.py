@@ -0,0 +1,57 @@
+"""Price history partition upkeep and retention
+
+Creates the monthly price_history partitions for the coming
+HISTORY_PARTITION_MONTHS_AHEAD months (PostgreSQL only), then applies the
+retention policy: months older than HISTORY_DOWNSAMPLE_AFTER_MONTHS keep
+one row per product and day (the daily close), and months older than
+HISTORY_DROP_AFTER_MONTHS are dropped. The daily OHLC in price_daily is
+kept, so long history windows are unaffected.
+
+Usage:
+    python manage_partitions.py [--skip-retention] [--downsample-after N] [--drop-after N]
+"""
+import sys
+import os
+import argparse
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.cache import bump_generation
+from app.partitions import apply_retention, ensure_partitions
+
+def maintain(retention=True, downsample_after=None, drop_after=None):
+    app = create_app()
+    with app.app_context():
+        try:
+            created = ensure_partitions()
+            db.session.commit()
+            print(f"Created partitions: {', '.join(created) if created else 'none needed'}")
+            if not retention:
+                return
+            result = apply_retention(downsample_after=downsample_after, drop_after=drop_after)
+            bump_generation()
+            db.session.commit()
+            for month, deleted in result['downsampled'].items():
+                print(f"Downsampled {month:%Y-%m} to daily closes: removed {deleted} rows")
+            for month in result['dropped']:
+                print(f"Dropped raw history for {month:%Y-%m}")
+        except Exception:
+            db.session.rollback()
+            raise
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--skip-retention', action='store_true', help='only create upcoming partitions')
+    parser.add_argument('--downsample-after', type=int, help='override HISTORY_DOWNSAMPLE_AFTER_MONTHS')
+    parser.add_argument('--drop-after', type=int, help='override HISTORY_DROP_AFTER_MONTHS (0 keeps everything)')
+    args = parser.parse_args()
+    try:
+        maintain(not args.skip_retention, args.downsample_after, args.drop_after)
+    except Exception as e:
+        print(f"Error during partition maintenance: {str(e)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
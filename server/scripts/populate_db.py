@@ -1,13 +1,13 @@
 import sys
 import os
 import asyncio
-from datetime import datetime
 
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import create_app, db
-from app.models import Product, PriceHistory
+from app.cache import bump_generation
+from app.ingest import ingest_records
 from app.scrapers.jumia import JumiaScraper
 
 # Current Jumia product URLs
@@ -39,51 +39,26 @@ SAMPLE_PRODUCTS = [
     }
 ]
 
-async def scrape_and_save_product(scraper, product_url, platform, retries=3):
-    """Scrape product details and save to database"""
-    for attempt in range(retries):
-        try:
-            details = await scraper.get_product_details(product_url)
-            if details and details['price'] and details['name']:
-                # Check if product already exists
-                existing_product = Product.query.filter_by(url=product_url).first()
-                
-                if existing_product:
-                    # Update existing product name if it has changed
-                    if existing_product.name != details['name']:
-                        existing_product.name = details['name']
-                    product = existing_product
-                else:
-                    product = Product(
-                        name=details['name'],
-                        url=product_url,
-                        platform=platform
-                    )
-                    db.session.add(product)
-                    db.session.commit()
-                
-                # Add price history
-                price_history = PriceHistory(
-                    product_id=product.id,
-                    price=details['price'],
-                    timestamp=datetime.utcnow()
-                )
-                db.session.add(price_history)
-                db.session.commit()
-                
-                print(f"Successfully saved product: {details['name']} (Price: KES {details['price']})")
-                return True
-            
-            if attempt < retries - 1:
-                print(f"Retrying {product_url} (attempt {attempt + 2}/{retries})")
-                await asyncio.sleep(2 ** attempt)  # Exponential backoff
-            
-        except Exception as e:
-            print(f"Error processing {product_url} (attempt {attempt + 1}/{retries}): {str(e)}")
-            if attempt < retries - 1:
-                await asyncio.sleep(2 ** attempt)
+async def scrape_product(scraper, product_url, platform):
+    """Scrape product details, returning an ingest record or None
     
-    return False
+    Retries, backoff and skipping a failing host are handled by the scraper.
+    """
+    try:
+        details = await scraper.get_product_details(product_url)
+    except Exception as e:
+        print(f"Error processing {product_url}: {str(e)}")
+        return None
+    
+    if details and details['price'] and details['name']:
+        print(f"Scraped product: {details['name']} (Price: KES {details['price']})")
+        return {
+            'name': details['name'],
+            'url': product_url,
+            'platform': platform,
+            'price': details['price']
+        }
+    return None
 
 async def populate_database():
     """Populate database with sample products"""
@@ -93,24 +68,33 @@ async def populate_database():
         scraper = JumiaScraper()
         
         try:
-            success_count = 0
+            records = []
             total_products = len(SAMPLE_PRODUCTS)
             
             print(f"Starting database population with {total_products} products...")
             
             for i, product in enumerate(SAMPLE_PRODUCTS, 1):
                 print(f"\nProcessing product {i}/{total_products}...")
-                if await scrape_and_save_product(scraper, product['url'], product['platform']):
-                    success_count += 1
-                # Add delay between products to avoid rate limiting
-                if i < total_products:
-                    await asyncio.sleep(2)
+                record = await scrape_product(scraper, product['url'], product['platform'])
+                if record:
+                    records.append(record)
+            
+            # Save everything in one batch
+            try:
+                counts = ingest_records(records)
+                bump_generation()
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error saving products: {str(e)}")
+                return
             
             print(f"\nPopulation complete!")
-            print(f"Successfully added/updated: {success_count}/{total_products} products")
+            print(f"Successfully added/updated: {len(records)}/{total_products} products "
+                  f"({counts['added']} new, {counts['updated']} updated, {counts['unchanged']} unchanged)")
             
-            if success_count < total_products:
-                print(f"Failed to process: {total_products - success_count} products")
+            if len(records) < total_products:
+                print(f"Failed to process: {total_products - len(records)} products")
         
         finally:
             await scraper.close_session()
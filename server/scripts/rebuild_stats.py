@@ -0,0 +1,32 @@
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.cache import bump_generation
+from app.summary import rebuild
+
+def rebuild_stats():
+    """Recompute the platform/category statistics from the product table"""
+    app = create_app()
+    with app.app_context():
+        print("Rebuilding platform and category statistics...")
+        try:
+            drift = rebuild()
+            bump_generation()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error rebuilding statistics: {str(e)}")
+            sys.exit(1)
+        
+        for dimension, name, stored, actual in drift:
+            print(f"Corrected {dimension} '{name or '(none)'}': "
+                  f"count {stored[0]} -> {actual[0]}, priced {stored[1]} -> {actual[1]}, "
+                  f"sum {stored[2]:.2f} -> {actual[2]:.2f}")
+        print(f"Done: {len(drift)} groups corrected")
+
+if __name__ == '__main__':
+    rebuild_stats()
@@ -4,6 +4,7 @@ import asyncio
 import sys
 import os
 import logging
+import argparse
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -35,8 +36,51 @@ def run_data_collection():
     except Exception as e:
         logger.error(f"Error during data collection: {str(e)}")
 
+def run_due_refresh():
+    """Refresh the prices most likely to have changed since their last check"""
+    try:
+        from update_prices import update_due_prices
+        metrics = asyncio.run(update_due_prices())
+        if metrics['journaled']:
+            logger.info(f"Journaled {metrics['requests']} due product checks for the ingest worker")
+            return
+        logger.info(
+            f"Refreshed {metrics['requests']} due products: {metrics['changes']} changed "
+            f"({metrics['changes_per_request']:.2f} per request), freshness "
+            f"{metrics['freshness_before']:.3f} -> {metrics['freshness_after']:.3f} "
+            f"({metrics['freshness_per_request'] * 1000:+.3f} per 1000 requests)"
+        )
+    except Exception as e:
+        logger.error(f"Error during price refresh: {str(e)}")
+
+def rebuild_schedule():
+    """Re-estimate every product's change rate from its price history"""
+    from app import create_app, db
+    from app.freshness import rebuild_schedule as rebuild
+    app = create_app()
+    with app.app_context():
+        scheduled = rebuild()
+        db.session.commit()
+    logger.info(f"Rebuilt refresh schedule for {scheduled} products")
+
+def run_partition_maintenance():
+    """Create upcoming price_history partitions and apply the retention policy"""
+    try:
+        from manage_partitions import maintain
+        maintain()
+    except Exception as e:
+        logger.error(f"Error during partition maintenance: {str(e)}")
+
 def main():
     """Main function to schedule and run data collection"""
+    parser = argparse.ArgumentParser(description="Collect products and refresh prices on a schedule")
+    parser.add_argument('--rebuild', action='store_true',
+                        help='rebuild the refresh schedule from price history and exit')
+    args = parser.parse_args()
+    if args.rebuild:
+        rebuild_schedule()
+        return
+    
     logger.info("Starting scheduler...")
     
     # Run immediately on startup
@@ -45,6 +89,15 @@ def main():
     # Schedule to run every 6 hours
     schedule.every(6).hours.do(run_data_collection)
     
+    # Spend a fixed request budget on the most volatile prices every tick
+    from app import create_app
+    tick_minutes = create_app().config['SCHEDULE_TICK_MINUTES']
+    schedule.every(tick_minutes).minutes.do(run_due_refresh)
+    
+    # Keep future history partitions in place and old history within its retention
+    run_partition_maintenance()
+    schedule.every().day.at("03:00").do(run_partition_maintenance)
+    
     # Keep the script running
     while True:
         try:
@@ -1,13 +1,17 @@
 import sys
 import os
 import asyncio
-from datetime import datetime, timezone
 
 # Add the project root directory to Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app import create_app, db
-from app.models import Product, PriceHistory
+from app.figures import prewarm
+from app.freshness import refresh_due
+from app.journal import Journal
+from app.refresh import refresh_prices
+from app.scrapers.client import HttpClient
+from app.scrapers.fetch_cache import FetchCache
 from app.scrapers.jumia import JumiaScraper
 from app.scrapers.kilimall import KilimallScraper
 from app.scrapers.jiji import JijiScraper
@@ -17,70 +21,85 @@ async def update_product_prices():
     app = create_app()
     
     with app.app_context():
-        # Get all products from database
-        products = Product.query.all()
-        print(f"Found {len(products)} products to update")
+        # Skip pages that haven't changed since the last run when a cache directory is set
+        cache_dir = app.config['FETCH_CACHE_DIR']
+        fetch_cache = FetchCache(cache_dir) if cache_dir else None
         
-        # Initialize scrapers
-        scrapers = {
-            'jumia': JumiaScraper(),
-            'kilimall': KilimallScraper(),
-            'jiji': JijiScraper()
-        }
-        
-        # Update prices
-        updated = 0
-        failed = 0
-        
-        for product in products:
-            scraper = scrapers.get(product.platform.lower())
-            if not scraper:
-                print(f"No scraper found for platform: {product.platform}")
-                continue
+        # One connection pool for the whole run, closed even if the refresh fails
+        async with HttpClient.from_config(app.config) as client:
+            # Initialize scrapers; each platform is refreshed in parallel within its own rate limit
+            scrapers = {
+                'jumia': JumiaScraper(fetch_cache=fetch_cache, client=client),
+                'kilimall': KilimallScraper(fetch_cache=fetch_cache, client=client),
+                'jiji': JijiScraper(fetch_cache=fetch_cache, client=client)
+            }
             
-            try:
-                print(f"Updating price for {product.name} from {product.platform}...")
-                details = await scraper.get_product_details(product.url)
-                
-                if details and details['price']:
-                    # Add new price history entry
-                    price_history = PriceHistory(
-                        product_id=product.id,
-                        price=details['price'],
-                        timestamp=datetime.now(timezone.utc)
-                    )
-                    db.session.add(price_history)
-                    
-                    # Update product's current price
-                    product.current_price = details['price']
-                    product.last_updated = datetime.now(timezone.utc)
-                    
-                    updated += 1
-                    print(f"[OK] Updated price: {details['price']}")
-                else:
-                    failed += 1
-                    print(f"[FAIL] Failed to get price")
+            # With a journal directory, prices are journaled and applied by ingest_worker.py
+            journal_dir = app.config['JOURNAL_DIR']
+            journal = Journal(journal_dir, 'refresh', app.config['JOURNAL_SEGMENT_BYTES'],
+                              app.config['JOURNAL_FSYNC_EVERY']) if journal_dir else None
             
+            try:
+                progress = await refresh_prices(scrapers, fetch_cache=fetch_cache, journal=journal)
+                print(f"\nUpdate complete!")
+                print(f"Successfully updated: {progress.updated}")
+                print(f"Unchanged pages: {progress.unchanged}")
+                print(f"Failed updates: {progress.failed}")
+                if fetch_cache:
+                    print(fetch_cache.summary())
+                print(client.summary())
             except Exception as e:
-                failed += 1
-                print(f"[ERROR] Error updating {product.name}: {str(e)}")
-                
-            # Add a small delay between requests to avoid rate limiting
-            await asyncio.sleep(1)
+                print(f"Error updating prices: {str(e)}")
+                print("Run again to resume; products already refreshed will be skipped")
+                db.session.rollback()
+            finally:
+                if journal:
+                    journal.close()
         
-        # Commit all changes
+        # Render charts for the most viewed products while the data is fresh
         try:
-            db.session.commit()
-            print(f"\nUpdate complete!")
-            print(f"Successfully updated: {updated}")
-            print(f"Failed updates: {failed}")
+            rendered = prewarm()
+            if rendered:
+                print(f"Pre-warmed {rendered} price charts")
         except Exception as e:
-            print(f"Error committing changes: {str(e)}")
-            db.session.rollback()
+            print(f"Error pre-warming price charts: {str(e)}")
+
+async def update_due_prices(budget=None):
+    """Refresh only the products most likely to have changed, within the request budget
+
+    With JOURNAL_DIR set, prices and check outcomes go to the 'due' journal
+    stream and ingest_worker.py applies them and updates the schedule.
+    Returns the run metrics from refresh_due().
+    """
+    app = create_app()
+    
+    with app.app_context():
+        cache_dir = app.config['FETCH_CACHE_DIR']
+        fetch_cache = FetchCache(cache_dir) if cache_dir else None
         
-        # Close scraper sessions
-        for scraper in scrapers.values():
-            await scraper.close_session()
+        async with HttpClient.from_config(app.config) as client:
+            scrapers = {
+                'jumia': JumiaScraper(fetch_cache=fetch_cache, client=client),
+                'kilimall': KilimallScraper(fetch_cache=fetch_cache, client=client),
+                'jiji': JijiScraper(fetch_cache=fetch_cache, client=client)
+            }
+            
+            # Its own stream, so a tick never shares a journal writer with a full refresh
+            journal_dir = app.config['JOURNAL_DIR']
+            journal = Journal(journal_dir, 'due', app.config['JOURNAL_SEGMENT_BYTES'],
+                              app.config['JOURNAL_FSYNC_EVERY']) if journal_dir else None
+            
+            try:
+                # A separate state file so a tick never resumes a full refresh, or vice versa
+                state_file = app.config['REFRESH_STATE_FILE'] + '.due'
+                return await refresh_due(scrapers, budget=budget, fetch_cache=fetch_cache, state_file=state_file,
+                                         journal=journal)
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                if journal:
+                    journal.close()
 
 if __name__ == '__main__':
     asyncio.run(update_product_prices())
@@ -0,0 +1,33 @@
+import sys
+import os
+import pytest
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'server')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    TESTING = True
+    RESPONSE_CACHE_SIZE = 0
+
+@pytest.fixture
+def config_class():
+    return TestConfig
+
+@pytest.fixture
+def app(config_class):
+    from app import create_app, db
+    from app import models
+    app = create_app(config_class)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,48 @@
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app import bulk
+from app.bulk import export_table, import_table, table_path
+from app.models import Product, PriceHistory
+
+def snapshot():
+    return (
+        [(p.id, p.name, p.url, p.platform, p.category, p.current_price, p.last_updated, p.created_at)
+         for p in Product.query.order_by(Product.id)],
+        [(h.id, h.product_id, h.price, h.timestamp) for h in PriceHistory.query.order_by(PriceHistory.id)],
+    )
+
+@pytest.mark.parametrize('file_format', ['csv', 'csv.gz', 'parquet'])
+def test_export_import_round_trip(app, tmp_path, monkeypatch, file_format):
+    if file_format == 'parquet' and bulk.parquet is None:
+        pytest.skip('pyarrow not installed')
+    # Small chunks so the streaming paths cross chunk boundaries
+    monkeypatch.setattr(bulk, 'CHUNK_ROWS', 7)
+    start = datetime(2024, 1, 1, 8, 30, 15, 250000)
+    for i in range(1, 6):
+        product = Product(name=f'Phone "{i}", 128GB', url=f'https://jumia/{i}', platform='jumia',
+                          category=None if i == 3 else 'phones', current_price=100.0 + i,
+                          last_updated=start, created_at=start)
+        db.session.add(product)
+        db.session.flush()
+        for day in range(4):
+            db.session.add(PriceHistory(product_id=product.id, price=100.0 + i + day / 4,
+                                        timestamp=start + timedelta(days=day)))
+    db.session.commit()
+    expected = snapshot()
+
+    counts = [export_table(name, table_path(str(tmp_path), name, file_format), file_format)
+              for name in ('product', 'price_history')]
+    assert counts == [5, 20]
+
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    for name in ('product', 'price_history'):
+        import_table(name, table_path(str(tmp_path), name, file_format), file_format)
+    db.session.commit()
+    assert snapshot() == expected
+
+def test_binary_format_needs_postgres(app, tmp_path):
+    with pytest.raises(RuntimeError):
+        export_table('product', str(tmp_path / 'product.bin'), 'binary')
@@ -0,0 +1,62 @@
+import pytest
+from datetime import datetime
+from conftest import TestConfig
+from app import db
+from app.models import Product
+from app.cache import bump_generation
+from app.summary import product_added
+
+class CachedConfig(TestConfig):
+    RESPONSE_CACHE_SIZE = 2
+    CACHE_GENERATION_POLL = 0
+
+@pytest.fixture
+def config_class():
+    return CachedConfig
+
+def add_product(name):
+    db.session.add(Product(
+        name=name,
+        url=f'https://example.com/{name}',
+        platform='jumia',
+        category='phones',
+        current_price=100.0,
+        last_updated=datetime.utcnow()
+    ))
+    product_added('jumia', 'phones', 100.0)
+    db.session.commit()
+
+def test_cached_until_generation_bump(app, client):
+    add_product('A')
+    first = client.get('/api/v1/stats')
+    assert first.headers['X-Cache'] == 'MISS'
+
+    add_product('B')
+    second = client.get('/api/v1/stats')
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.get_json() == first.get_json()
+
+    bump_generation()
+    db.session.commit()
+    third = client.get('/api/v1/stats')
+    assert third.headers['X-Cache'] == 'MISS'
+    assert third.get_json()['stats']['platforms'][0]['count'] == 2
+
+def test_etag_revalidation_and_normalized_args(app, client):
+    add_product('A')
+    first = client.get('/api/v1/products?platform=jumia&sort=latest')
+    etag = first.headers['ETag']
+
+    reordered = client.get('/api/v1/products?sort=latest&platform=jumia', headers={'If-None-Match': etag})
+    assert reordered.status_code == 304
+    assert reordered.headers['X-Cache'] == 'HIT'
+
+def test_lru_eviction_and_errors_not_cached(app, client):
+    add_product('A')
+    for path in ('/api/v1/stats', '/api/v1/products', '/api/v1/products/1'):
+        client.get(path)
+    assert client.get('/api/v1/stats').headers['X-Cache'] == 'MISS'
+    assert client.get('/api/v1/products/1').headers['X-Cache'] == 'HIT'
+
+    assert client.get('/api/v1/products/99').status_code == 404
+    assert 'X-Cache' not in client.get('/api/v1/products/99').headers
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models import Product, PriceHistory, PriceDaily
+from app.compaction import compact_history
+from app.history import price_series
+from app.refresh import write_batch
+from app.rollup import backfill
+
+# Mid-month, so the two seeded days never cross into a new month
+START = datetime(2026, 3, 10, 8)
+
+def seed():
+    """Hourly history over two days: products 1 and 2 never change, product 3 steps every 12 hours"""
+    for i in (1, 2, 3):
+        product = Product(name=f'P{i}', url=f'https://jumia/{i}', platform='jumia', current_price=100.0)
+        db.session.add(product)
+        db.session.flush()
+        for hour in range(48):
+            price = 100.0 + (hour // 12 if i == 3 else 0)
+            db.session.add(PriceHistory(product_id=product.id, price=price, timestamp=START + timedelta(hours=hour)))
+    db.session.commit()
+
+def responses(client, days):
+    """Every read path; `days` reaches back past the whole seed, `days - 2` into its second day"""
+    def points(history):
+        return [(point['price'], point['timestamp']) for point in history]
+
+    listing = client.get('/api/v1/products?per_page=10').get_json()
+    return {
+        'listing': [points(p['price_history']) for p in sorted(listing['products'], key=lambda p: p['id'])],
+        'prices': [points(client.get(f'/api/v1/products/{i}/prices?days={days}').get_json()) for i in (1, 2, 3)],
+        'product': [points(client.get(f'/api/v1/products/{i}?days={days - 2}').get_json()['price_history'])
+                    for i in (1, 2, 3)],
+        'detail': [points(client.get(f'/api/v1/products/{i}/detail?days={days - 2}').get_json()['price_history'])
+                   for i in (1, 2, 3)],
+        'rollup': [(d.product_id, d.day, d.open, d.close, d.count, d.first_at, d.last_at)
+                   for d in PriceDaily.query.order_by(PriceDaily.product_id, PriceDaily.day)],
+    }
+
+def run_ends(points):
+    """First and last point of each run of one price: what an interval row keeps"""
+    return [point for k, point in enumerate(points)
+            if k in (0, len(points) - 1) or points[k - 1][0] != point[0] or points[k + 1][0] != point[0]]
+
+def test_compaction_keeps_every_price_change(app, client):
+    # The windows are counted back from now, so they grow with the fixed seed's age; keep them raw
+    days = (datetime.utcnow() - START).days + 2
+    app.config['ROLLUP_THRESHOLD_DAYS'] = days
+    seed()
+    backfill(all_months=True)
+    db.session.commit()
+    before = responses(client, days)
+    assert len(before['prices'][0]) == 48 and 24 <= len(before['product'][0]) < 48
+
+    before_rows, after_rows = compact_history(chunk=2)
+    # One row per price run
+    assert (before_rows, after_rows) == (144, 6)
+    assert PriceHistory.query.filter_by(product_id=1).count() == 1
+    after = responses(client, days)
+    # Unchanged stretches keep their exact first and last observation, nothing in between
+    assert after['prices'] == [run_ends(points) for points in before['prices']]
+    for key in ('listing', 'product', 'detail'):
+        for old, new in zip(before[key], after[key]):
+            assert new[-1 if key != 'listing' else 0] == old[-1 if key != 'listing' else 0]
+            assert set(new) <= set(after['prices'][0] + after['prices'][1] + after['prices'][2])
+    # Compaction leaves the daily rollups alone
+    assert after['rollup'] == before['rollup']
+
+    # Compacting again changes nothing
+    assert compact_history() == (after_rows, after_rows)
+
+def test_intervals_keep_exact_endpoints(app, client):
+    product = Product(name='P1', url='https://jumia/1', platform='jumia', current_price=100.0)
+    db.session.add(product)
+    db.session.commit()
+    # Early yesterday, so every refresh falls on one day
+    start = datetime.utcnow().replace(hour=2, minute=0, second=0, microsecond=0) - timedelta(days=1)
+    # Refreshes at irregular times: 100 four times, then 90 twice
+    offsets = [(0, 100.0), (1, 100.0), (5.5, 100.0), (6, 100.0), (13.25, 90.0), (19, 90.0)]
+    times = [start + timedelta(hours=hours) for hours, _ in offsets]
+    for timestamp, (_, price) in zip(times, offsets):
+        write_batch([(product.id, price, timestamp, product.url)])
+    assert PriceHistory.query.count() == 2
+
+    expected = [(100.0, times[0].isoformat()), (100.0, times[3].isoformat()),
+                (90.0, times[4].isoformat()), (90.0, times[5].isoformat())]
+    history = client.get(f'/api/v1/products/{product.id}/prices?days=7').get_json()
+    assert [(point['price'], point['timestamp']) for point in history] == expected
+    assert all('id' not in point for point in history)
+    timestamps, prices = price_series(product.id, 7)
+    assert list(zip(prices.tolist(), [t.isoformat() for t in timestamps.astype(datetime).tolist()])) == expected
+
+    # Rebuilt rollups still count every observation of a day
+    backfill()
+    assert [(d.count, d.first_at, d.last_at) for d in PriceDaily.query] == [(6, times[0], times[5])]
+
+def test_unchanged_refresh_extends_interval(app):
+    product = Product(name='P1', url='https://jumia/1', platform='jumia', current_price=100.0)
+    db.session.add(product)
+    db.session.commit()
+    start = datetime(2026, 3, 10, 8)
+    for hour, price in enumerate((100.0, 100.0, 100.0, 90.0, 90.0)):
+        write_batch([(product.id, price, start + timedelta(hours=hour), product.url)])
+
+    rows = PriceHistory.query.order_by(PriceHistory.timestamp).all()
+    assert [(row.price, row.observed_count) for row in rows] == [(100.0, 3), (90.0, 2)]
+    assert rows[0].valid_to == start + timedelta(hours=2)
+    assert rows[1].valid_from == start + timedelta(hours=3)
+
+    app.config['PRICE_HISTORY_COMPACT'] = False
+    write_batch([(product.id, 90.0, start + timedelta(hours=5), product.url)])
+    assert PriceHistory.query.count() == 3
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models import Product, PriceHistory
+
+def seed():
+    now = datetime.utcnow()
+    products = []
+    for i, points in enumerate((5, 0, 9)):
+        product = Product(name=f'Phone {i}', url=f'https://example.com/{i}', platform='jumia', current_price=100.0)
+        db.session.add(product)
+        db.session.flush()
+        for j in range(points):
+            db.session.add(PriceHistory(product_id=product.id, price=100.0 + j, timestamp=now - timedelta(hours=points - j)))
+        products.append(product.id)
+    db.session.commit()
+    return products
+
+def test_detail_matches_visualization_data(app, client):
+    first, empty, _ = seed()
+
+    detail = client.get(f'/api/v1/products/{first}/detail?days=7').get_json()
+    legacy = client.get(f'/api/v1/products/{first}/visualization/data?days=7').get_json()
+    assert detail['product']['id'] == first
+    assert detail['statistics'] == legacy['statistics']
+    assert detail['price_history'] == legacy['price_history']
+
+    assert client.get(f'/api/v1/products/{empty}/detail').get_json()['price_history'] == []
+    assert client.get('/api/v1/products/999/detail').status_code == 404
+
+def test_batch_preserves_order_and_reports_missing(app, client):
+    first, empty, last = seed()
+
+    body = client.get(f'/api/v1/products/batch?ids={last},{first},999&ids={empty}').get_json()
+    assert [p['product']['id'] for p in body['products']] == [last, first, empty]
+    assert [len(p['price_history']) for p in body['products']] == [9, 5, 0]
+    assert body['products'][0]['statistics']['max_price'] == 108.0
+    assert body['missing'] == [999]
+
+    assert client.get('/api/v1/products/batch?ids=1,x').status_code == 400
+    assert client.get('/api/v1/products/batch').status_code == 400
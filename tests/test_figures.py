@@ -0,0 +1,65 @@
+import pytest
+from datetime import datetime, timedelta
+from conftest import TestConfig
+from app import db
+from app.models import Product, PriceHistory
+from app import figures
+from app.figures import FigureCache, cached_figure, get_figure_cache, prewarm
+
+@pytest.fixture
+def config_class(tmp_path):
+    class FigureConfig(TestConfig):
+        FIGURE_CACHE_DIR = str(tmp_path / 'figures')
+        FIGURE_PREWARM_COUNT = 1
+    return FigureConfig
+
+@pytest.fixture
+def renders(monkeypatch):
+    calls = []
+    render = figures.render_figure
+    def counting(product, days):
+        calls.append(product.id)
+        return render(product, days)
+    monkeypatch.setattr(figures, 'render_figure', counting)
+    return calls
+
+def add_product(name):
+    now = datetime.utcnow()
+    product = Product(name=name, url=f'https://example.com/{name}', platform='jumia',
+                      current_price=100.0, last_updated=now)
+    db.session.add(product)
+    db.session.flush()
+    for i in range(10):
+        db.session.add(PriceHistory(product_id=product.id, price=100.0 + i, timestamp=now - timedelta(hours=i)))
+    db.session.commit()
+    return product
+
+def test_figure_reused_until_price_changes(app, client, renders):
+    product = add_product('tv')
+
+    first = client.get(f'/api/v1/products/{product.id}/visualization')
+    second = client.get(f'/api/v1/products/{product.id}/visualization')
+    assert first.status_code == 200 and first.data == second.data
+    assert renders == [product.id]
+
+    product.last_updated = datetime.utcnow() + timedelta(seconds=1)
+    db.session.commit()
+    client.get(f'/api/v1/products/{product.id}/visualization')
+    assert renders == [product.id, product.id]
+
+def test_disk_cache_survives_restart(app, renders):
+    product = add_product('tv')
+    figure = cached_figure(product, 30)
+
+    restarted = FigureCache(directory=get_figure_cache().directory)
+    assert restarted.get(FigureCache.key(product, 30)) == figure
+
+def test_prewarm_renders_most_viewed(app, renders):
+    popular = add_product('popular')
+    quiet = add_product('quiet')
+    cache = get_figure_cache()
+    cache.views.update({popular.id: 5, quiet.id: 1})
+
+    assert prewarm() == 1
+    assert renders == [popular.id]
+    assert prewarm() == 0
@@ -0,0 +1,115 @@
+import asyncio
+from datetime import datetime, timedelta
+from app import db
+from app.models import Product, PriceHistory, ProductSchedule
+from app.journal import Journal, ingest_journal
+from app.freshness import DECAY, _rank_in_python, due_products, freshness, rebuild_schedule, refresh_due
+
+class FakeScraper:
+    max_concurrency = 2
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.fetched = []
+
+    async def get_product_details(self, url):
+        self.fetched.append(url)
+        await asyncio.sleep(0)
+        return {'name': url, 'price': self.prices[url], 'url': url}
+
+def seed(app):
+    """Product 1 changes price every observation, product 2 never does"""
+    start = datetime.utcnow() - timedelta(hours=96)
+    for i in (1, 2):
+        product = Product(name=f'P{i}', url=f'https://jumia/{i}', platform='jumia',
+                          current_price=100.0, last_updated=start + timedelta(hours=90))
+        db.session.add(product)
+        db.session.flush()
+        for hour in range(0, 96, 6):
+            price = 100.0 + (hour % 12 if i == 1 else 0)
+            db.session.add(PriceHistory(product_id=product.id, price=price,
+                                        timestamp=start + timedelta(hours=hour)))
+    db.session.commit()
+
+def test_volatile_products_are_checked_sooner(app):
+    seed(app)
+    assert rebuild_schedule() == 2
+    db.session.commit()
+
+    volatile = db.session.get(ProductSchedule, 1)
+    static = db.session.get(ProductSchedule, 2)
+    assert volatile.changes == 15 and static.changes == 0
+    assert volatile.next_due - volatile.last_checked < timedelta(hours=4)
+    assert static.next_due - static.last_checked == timedelta(hours=app.config['SCHEDULE_MAX_INTERVAL'])
+
+    # Both overdue: the budget goes to the volatile product first
+    later = datetime.utcnow() + timedelta(days=3)
+    assert due_products(later, budget=1) == [1]
+    assert due_products(later, budget=5) == [1, 2]
+    # Only the volatile product is due within the day
+    assert due_products(datetime.utcnow(), budget=5) == [1]
+
+def test_refresh_due_reports_freshness_per_request(app, tmp_path):
+    seed(app)
+    rebuild_schedule()
+    # A product never checked is always due, ahead of scheduled ones
+    db.session.add(Product(name='P3', url='https://jumia/3', platform='jumia', current_price=50.0))
+    db.session.commit()
+
+    scraper = FakeScraper({'https://jumia/1': 120.0, 'https://jumia/2': 100.0, 'https://jumia/3': 50.0})
+    metrics = asyncio.run(refresh_due({'jumia': scraper}, budget=2,
+                                      state_file=str(tmp_path / 'state.json')))
+
+    assert scraper.fetched == ['https://jumia/1', 'https://jumia/3']
+    assert metrics['requests'] == 2 and metrics['changes'] == 1
+    assert metrics['changes_per_request'] == 0.5
+    assert metrics['freshness_after'] > metrics['freshness_before']
+    assert metrics['freshness_per_request'] > 0
+    # Newly checked product joins the schedule
+    assert db.session.get(ProductSchedule, 3).last_checked is not None
+    assert db.session.get(Product, 1).current_price == 120.0
+
+def test_journaled_checks_update_the_schedule_on_ingest(app, tmp_path):
+    seed(app)
+    rebuild_schedule()
+    db.session.commit()
+    checked_before = db.session.get(ProductSchedule, 1).last_checked
+
+    scraper = FakeScraper({'https://jumia/1': 120.0, 'https://jumia/2': 100.0})
+    with Journal(str(tmp_path / 'journal'), 'due') as journal:
+        metrics = asyncio.run(refresh_due({'jumia': scraper}, budget=1, journal=journal,
+                                          state_file=str(tmp_path / 'state.json')))
+    assert metrics['journaled'] and metrics['requests'] == 1
+    # Nothing reaches the database until the ingest worker runs
+    assert db.session.get(ProductSchedule, 1).last_checked == checked_before
+    assert db.session.get(Product, 1).current_price == 100.0
+
+    assert ingest_journal(str(tmp_path / 'journal')) == {'due': 2}
+    db.session.expire_all()
+    schedule = db.session.get(ProductSchedule, 1)
+    assert schedule.last_checked > checked_before and schedule.changes > 15 * DECAY
+    assert db.session.get(Product, 1).current_price == 120.0
+
+def test_due_ranking_in_sql_matches_python(app):
+    now = datetime(2026, 10, 17, 12)
+    rows = []
+    for i in range(1, 41):
+        db.session.add(Product(name=f'P{i}', url=f'https://jumia/{i}', platform='jumia', current_price=100.0,
+                               last_updated=now - timedelta(hours=i)))
+        checked = None if i == 7 else now - timedelta(hours=(i * 7) % 30 + 1)
+        changes, hours = float(i % 5), float(i * 3 % 50)
+        due = now - timedelta(hours=1) if i % 4 else now + timedelta(hours=1)
+        db.session.add(ProductSchedule(product_id=i, changes=changes, hours=hours, last_checked=checked, next_due=due))
+        if i % 4:
+            rows.append((i, checked or now - timedelta(hours=i), changes, hours))
+    db.session.add(Product(name='New', url='https://jumia/new', platform='jumia', current_price=1.0))
+    db.session.commit()
+
+    assert due_products(now, budget=1) == [41]
+    assert due_products(now, budget=12) == [41] + _rank_in_python(rows, now, 11)
+    assert len(due_products(now, budget=100)) == 31
+
+    # A sample of the whole catalog is the exact mean
+    exact = freshness(now)
+    assert freshness(now, sample=41) == exact
+    assert abs(freshness(now, sample=20) - exact) < 0.5
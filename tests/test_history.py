@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import db
+from app.models import Product, PriceHistory
+from app.history import recent_history
+
+def seed(count, points, start=0):
+    now = datetime.utcnow()
+    for i in range(start, start + count):
+        product = Product(
+            name=f'Phone {i}',
+            url=f'https://example.com/p/{i}',
+            platform='jumia',
+            category='phones',
+            current_price=1000.0 + i,
+            last_updated=now
+        )
+        db.session.add(product)
+        for j in range(points):
+            db.session.add(PriceHistory(
+                product=product,
+                price=1000.0 + i + j,
+                timestamp=now - timedelta(hours=j)
+            ))
+    db.session.commit()
+
+def count_queries(func):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        result = func()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return result, len(statements)
+
+def test_recent_history_limits_and_orders(app):
+    seed(count=3, points=40)
+    ids = [p.id for p in Product.query.all()]
+
+    history = recent_history(ids + [999], limit=30)
+
+    assert history[999] == []
+    for product_id in ids:
+        assert len(history[product_id]) == 30
+        timestamps = [point['timestamp'] for point in history[product_id]]
+        assert timestamps == sorted(timestamps, reverse=True)
+
+def test_products_listing_query_count_is_constant(app, client):
+    seed(count=2, points=3)
+    small, small_queries = count_queries(lambda: client.get('/api/v1/products'))
+
+    seed(count=20, points=3, start=2)
+    large, large_queries = count_queries(lambda: client.get('/api/v1/products'))
+
+    assert small.get_json()['total'] == 2
+    assert large.get_json()['total'] == 22
+    assert len(large.get_json()['products'][0]['price_history']) == 3
+    assert small_queries == large_queries
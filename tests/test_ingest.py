@@ -0,0 +1,40 @@
+from datetime import datetime
+from app import db
+from app.models import Product, PriceHistory, PriceDaily
+from app.ingest import ingest_records
+from app.summary import read_stats, rebuild
+
+def records(prices, category='phones'):
+    return [{'name': f'Phone {i}', 'url': f'https://example.com/{i}', 'platform': 'jumia',
+             'category': category, 'price': price} for i, price in prices.items()]
+
+def test_ingest_upserts_and_appends_history(app):
+    assert ingest_records(records({1: 100.0, 2: 200.0, 3: 300.0}), batch_size=2) == {
+        'added': 3, 'updated': 0, 'unchanged': 0
+    }
+    db.session.commit()
+
+    batch = records({1: 100.0, 2: 250.0, 4: 400.0})
+    batch.append({'name': 'Renamed', 'url': 'https://example.com/3', 'platform': 'jumia', 'price': 300.0})
+    batch.append({'name': 'No price', 'url': 'https://example.com/5', 'platform': 'jumia', 'price': None})
+    assert ingest_records(batch) == {'added': 1, 'updated': 2, 'unchanged': 1}
+    db.session.commit()
+
+    products = {p.url.rsplit('/', 1)[1]: p for p in Product.query.all()}
+    assert len(products) == 4
+    assert products['2'].current_price == 250.0
+    assert products['3'].name == 'Renamed' and products['3'].category == 'phones'
+    # Initial prices plus the one change; the rename and the unchanged price add nothing
+    assert PriceHistory.query.count() == 5
+    assert PriceDaily.query.filter_by(product_id=products['2'].id).one().count == 2
+
+    # Incremental stats agree with a full recount
+    stats = read_stats()
+    assert rebuild() == []
+    assert stats['platforms'] == [{'name': 'jumia', 'count': 4, 'avg_price': 262.5}]
+
+def test_ingest_resolves_duplicate_urls_in_batch(app):
+    batch = records({1: 100.0}) + records({1: 90.0})
+    assert ingest_records(batch) == {'added': 1, 'updated': 0, 'unchanged': 0}
+    db.session.commit()
+    assert Product.query.one().current_price == 90.0
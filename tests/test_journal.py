@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from datetime import datetime
+from app import db
+from app.models import Product, PriceHistory, JournalOffset
+from app import journal as journal_module
+from app.journal import Journal, ingest_journal, list_segments, prune
+from app.refresh import refresh_prices
+
+def listing(i, price):
+    return {'type': 'listing', 'name': f'Phone {i}', 'url': f'https://jumia/{i}', 'platform': 'jumia',
+            'category': 'phones', 'price': price, 'at': datetime.utcnow().isoformat()}
+
+def test_journal_applies_each_record_once(app, tmp_path):
+    directory = str(tmp_path)
+    with Journal(directory, 'collect', segment_bytes=600, fsync_every=3) as journal:
+        for i in range(10):
+            journal.append(listing(i, 100.0))
+    assert len(list_segments(directory)['collect']) > 1
+
+    assert ingest_journal(directory, batch_size=4) == {'collect': 10}
+    assert Product.query.count() == 10
+    # Replaying finds nothing new
+    assert ingest_journal(directory, batch_size=4) == {'collect': 0}
+
+    # A record torn by a crash is dropped when the writer reopens
+    with open(tmp_path / 'collect-00000009.ndjson', 'ab') as f:
+        f.write(b'{"type": "listing", "na')
+    with Journal(directory, 'collect', segment_bytes=600) as journal:
+        journal.append(listing(3, 80.0))
+        journal.append(listing(11, 50.0))
+    product_ids = [p.id for p in Product.query.filter(Product.url == 'https://jumia/3')]
+    with Journal(directory, 'refresh') as journal:
+        journal.append({'type': 'price', 'product_id': product_ids[0], 'price': 75.0,
+                        'at': datetime.utcnow().isoformat(), 'url': 'https://jumia/3'})
+
+    assert ingest_journal(directory) == {'collect': 2, 'refresh': 1}
+    assert Product.query.count() == 11
+    assert Product.query.filter_by(url='https://jumia/3').one().current_price == 75.0
+    assert PriceHistory.query.count() == 13
+    assert prune(directory) > 0
+    assert ingest_journal(directory) == {'collect': 0, 'refresh': 0}
+
+def test_failed_batch_is_replayed_without_duplicates(app, tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    with Journal(directory, 'collect') as journal:
+        for i in range(6):
+            journal.append(listing(i, 100.0))
+
+    apply = journal_module._apply
+    calls = []
+
+    def crash_on_second_batch(records):
+        calls.append(len(records))
+        if len(calls) == 2:
+            raise RuntimeError('database went away')
+        apply(records)
+
+    monkeypatch.setattr(journal_module, '_apply', crash_on_second_batch)
+    with pytest.raises(RuntimeError):
+        ingest_journal(directory, batch_size=4)
+    assert Product.query.count() == 4
+    assert db.session.get(JournalOffset, 'collect').position > 0
+
+    monkeypatch.setattr(journal_module, '_apply', apply)
+    assert ingest_journal(directory, batch_size=4) == {'collect': 2}
+    assert Product.query.count() == 6 and PriceHistory.query.count() == 6
+
+def test_listings_keep_their_own_observation_times(app, tmp_path):
+    directory = str(tmp_path)
+    times = [datetime(2026, 3, 10, 8), datetime(2026, 3, 10, 14), datetime(2026, 3, 11, 9)]
+    with Journal(directory, 'collect') as journal:
+        for at, price in zip(times, (100.0, 90.0, 80.0)):
+            journal.append(dict(listing(1, price), at=at.isoformat()))
+            journal.append(dict(listing(2, price), at=at.isoformat()))
+
+    app.config['PRICE_HISTORY_COMPACT'] = False
+    assert ingest_journal(directory) == {'collect': 6}
+    history = PriceHistory.query.filter_by(product_id=1).order_by(PriceHistory.timestamp)
+    assert [(row.timestamp, row.price) for row in history] == list(zip(times, (100.0, 90.0, 80.0)))
+    assert Product.query.filter_by(url='https://jumia/2').one().last_updated == times[-1]
+
+def test_refresh_journals_instead_of_writing(app, tmp_path):
+    class FakeScraper:
+        max_concurrency = 2
+
+        async def get_product_details(self, url):
+            return {'name': url, 'price': 42.0, 'url': url}
+
+    db.session.add(Product(name='P1', url='https://jumia/1', platform='jumia', current_price=100.0))
+    db.session.commit()
+    directory = str(tmp_path / 'journal')
+    with Journal(directory, 'refresh') as journal:
+        progress = asyncio.run(refresh_prices({'jumia': FakeScraper()}, state_file=str(tmp_path / 'state.json'),
+                                              journal=journal))
+    assert progress.updated == 1
+    assert PriceHistory.query.count() == 0
+
+    assert ingest_journal(directory) == {'refresh': 1}
+    assert db.session.get(Product, 1).current_price == 42.0
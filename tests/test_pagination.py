@@ -0,0 +1,80 @@
+import json
+from datetime import datetime, timedelta
+from app import db
+from app.models import Product
+
+def seed():
+    now = datetime.utcnow()
+    for i in range(23):
+        db.session.add(Product(
+            name=f'Phone {i}',
+            url=f'https://example.com/p/{i}',
+            platform='jumia' if i % 2 else 'kilimall',
+            category='phones',
+            # Repeated prices and NULLs exercise the tie-breaker
+            current_price=None if i % 7 == 0 else float(1000 + (i % 4) * 100),
+            last_updated=None if i % 5 == 0 else now - timedelta(hours=i % 3)
+        ))
+    db.session.commit()
+
+def walk(client, path, sort, key):
+    ids = []
+    after = None
+    while True:
+        url = f'{path}?limit=4&sort={sort}' + (f'&after={after}' if after else '')
+        response = client.get(url)
+        assert response.status_code == 200
+        page, after = key(response)
+        assert len(page) <= 4
+        ids.extend(product['id'] for product in page)
+        if not after:
+            return ids
+
+def test_keyset_pages_cover_every_product_once(app, client):
+    seed()
+    listing = lambda r: (r.get_json()['products'], r.get_json()['next_cursor'])
+    search = lambda r: (r.get_json(), r.headers.get('X-Next-Cursor'))
+
+    for sort in ('price_low', 'price_high', 'latest', ''):
+        for path, key in (('/api/v1/products', listing), ('/api/v1/products/search', search)):
+            ids = walk(client, path, sort, key)
+            assert sorted(ids) == sorted(p.id for p in Product.query.all())
+
+    prices = [db.session.get(Product, i).current_price for i in walk(client, '/api/v1/products', 'price_high', listing)]
+    known = [p for p in prices if p is not None]
+    assert prices[:len(known)] == sorted(known, reverse=True)
+    assert set(prices[len(known):]) == {None}
+
+def test_cursor_rejected_for_other_sort(app, client):
+    seed()
+    cursor = client.get('/api/v1/products?limit=2&sort=latest').get_json()['next_cursor']
+
+    response = client.get(f'/api/v1/products?limit=2&sort=price_low&after={cursor}')
+    assert response.status_code == 400
+    assert client.get('/api/v1/products/search?after=garbage').status_code == 400
+
+def test_streaming_modes(app, client):
+    seed()
+    response = client.get('/api/v1/products?stream=ndjson&platform=jumia')
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert response.mimetype == 'application/x-ndjson'
+    assert len(lines) == 11
+
+    body = client.get('/api/v1/products?stream=json&sort=price_low').get_json()
+    assert body['success'] and body['total'] == 23 == len(body['products'])
+    assert len(client.get('/api/v1/products/search?stream=json&q=Phone 1').get_json()) == 11
+
+def test_listing_without_limit_returns_everything(app, client):
+    seed()
+    app.config['PAGE_SIZE'] = 5
+    body = client.get('/api/v1/products?sort=price_low').get_json()
+    assert body['total'] == 23 == len(body['products'])
+    assert body['next_cursor'] is None
+    assert len(client.get('/api/v1/products?limit=5').get_json()['products']) == 5
+
+def test_search_without_limit_returns_every_match(app, client):
+    seed()
+    app.config['PAGE_SIZE'] = 5
+    response = client.get('/api/v1/products/search?platform=jumia')
+    assert len(response.get_json()) == 11 and 'X-Next-Cursor' not in response.headers
+    assert len(client.get('/api/v1/products/search?platform=jumia&limit=5').get_json()) == 5
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models import Product, PriceHistory, PriceDaily
+from app.compaction import compact_history
+from app.history import history_since
+from app.partitions import add_months, apply_retention, ensure_partitions, partition_ddl
+from app.refresh import write_batch
+from app.rollup import backfill, record_prices
+
+NOW = datetime(2026, 10, 17, 12)
+
+def add_product(i=1):
+    product = Product(name=f'P{i}', url=f'https://jumia/{i}', platform='jumia', current_price=100.0)
+    db.session.add(product)
+    db.session.flush()
+    return product
+
+def test_partition_bounds():
+    assert add_months(datetime(2026, 11, 1), 2) == datetime(2027, 1, 1)
+    assert add_months(datetime(2026, 1, 1), -1) == datetime(2025, 12, 1)
+    assert partition_ddl(datetime(2026, 12, 1)) == (
+        "CREATE TABLE IF NOT EXISTS price_history_p202612 PARTITION OF price_history "
+        "FOR VALUES FROM ('2026-12-01 00:00:00') TO ('2027-01-01 00:00:00')"
+    )
+
+def test_retention_downsamples_then_drops(app):
+    product = add_product()
+    for day in (datetime(2025, 12, 5), datetime(2026, 4, 5), datetime(2026, 4, 6), datetime(2026, 10, 5)):
+        for hour, price in ((8, 100.0), (12, 90.0), (20, 95.0)):
+            db.session.add(PriceHistory(product_id=product.id, price=price, timestamp=day + timedelta(hours=hour)))
+    db.session.commit()
+    # Nothing to partition outside PostgreSQL
+    assert ensure_partitions(now=NOW) == []
+
+    result = apply_retention(now=NOW, downsample_after=4, drop_after=8)
+    db.session.commit()
+    assert result == {'dropped': [datetime(2025, 12, 1).date()], 'downsampled': {datetime(2026, 4, 1).date(): 4}}
+    rows = [(row.timestamp, row.price) for row in PriceHistory.query.order_by(PriceHistory.timestamp)]
+    assert rows[:2] == [(datetime(2026, 4, 5, 20), 95.0), (datetime(2026, 4, 6, 20), 95.0)]
+    assert len(rows) == 5
+
+    assert apply_retention(now=NOW, downsample_after=4, drop_after=8) == {'dropped': [], 'downsampled': {}}
+
+def test_backfill_keeps_rollups_of_downsampled_months(app):
+    product = add_product()
+    day = datetime(2026, 4, 5)
+    observations = [(product.id, price, day + timedelta(hours=hour)) for hour, price in ((8, 100.0), (12, 90.0), (20, 95.0))]
+    for product_id, price, timestamp in observations:
+        db.session.add(PriceHistory(product_id=product_id, price=price, timestamp=timestamp))
+    record_prices(observations)
+    db.session.commit()
+
+    apply_retention(now=NOW, downsample_after=4, drop_after=0)
+    assert backfill() == 0
+    db.session.commit()
+    daily = PriceDaily.query.one()
+    assert (daily.open, daily.low, daily.close, daily.count) == (100.0, 90.0, 95.0, 3)
+    # Nothing to keep when downsampling is off
+    app.config['HISTORY_DOWNSAMPLE_AFTER_MONTHS'] = 0
+    assert backfill() == 1 and db.session.query(PriceDaily.count).scalar() == 1
+
+def test_intervals_stay_within_a_month(app):
+    product = add_product()
+    db.session.commit()
+    times = [datetime(2026, 1, 31, 20), datetime(2026, 1, 31, 23), datetime(2026, 2, 1, 2), datetime(2026, 2, 1, 5)]
+    for timestamp in times:
+        write_batch([(product.id, 100.0, timestamp, product.url)])
+    assert [(row.timestamp, row.observed_count) for row in PriceHistory.query.order_by(PriceHistory.timestamp)] == [
+        (times[0], 2), (times[2], 2)
+    ]
+
+    # Compaction respects the same boundary
+    app.config['PRICE_HISTORY_COMPACT'] = False
+    other = add_product(2)
+    db.session.commit()
+    for timestamp in times:
+        write_batch([(other.id, 50.0, timestamp, other.url)])
+    assert compact_history(product_ids=[other.id]) == (4, 2)
+
+    since = datetime(2026, 1, 31, 22)
+    history = history_since([product.id, other.id], since)
+    assert [len(points) for points in history.values()] == [3, 3]
@@ -0,0 +1,65 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from app import db
+from app.models import Product, PriceHistory, ProductStat
+from app.refresh import refresh_prices
+
+class FakeScraper:
+    max_concurrency = 3
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.fetched = []
+
+    async def get_product_details(self, url):
+        self.fetched.append(url)
+        await asyncio.sleep(0)
+        price = self.prices.get(url)
+        return {'name': url, 'price': price, 'url': url} if price else None
+
+def seed(app):
+    old = datetime.utcnow() - timedelta(days=1)
+    for i in range(1, 11):
+        platform = 'jumia' if i % 2 else 'kilimall'
+        db.session.add(Product(name=f'P{i}', url=f'https://{platform}/{i}', platform=platform,
+                               category='phones', current_price=100.0, last_updated=old))
+    db.session.commit()
+
+def test_refresh_batches_all_platforms(app, tmp_path):
+    seed(app)
+    jumia = FakeScraper({f'https://jumia/{i}': 90.0 + i for i in range(1, 11, 2)})
+    # Product 10 fails and keeps its old price
+    kilimall = FakeScraper({f'https://kilimall/{i}': 200.0 for i in range(2, 10, 2)})
+
+    progress = asyncio.run(refresh_prices({'jumia': jumia, 'kilimall': kilimall},
+                                          batch_size=3, state_file=str(tmp_path / 'state.json')))
+
+    assert (progress.updated, progress.failed) == (9, 1)
+    assert len(jumia.fetched) == 5 and len(kilimall.fetched) == 5
+    assert PriceHistory.query.count() == 9
+    assert db.session.get(Product, 1).current_price == 91.0
+    assert db.session.get(Product, 10).current_price == 100.0
+    assert not (tmp_path / 'state.json').exists()
+    # Summary deltas: four kilimall prices moved from 100 to 200
+    assert db.session.get(ProductStat, ('platform', 'kilimall')).price_sum == 400.0
+
+def test_refresh_resumes_interrupted_run(app, tmp_path):
+    seed(app)
+    state_file = tmp_path / 'state.json'
+    started_at = datetime.utcnow() - timedelta(minutes=5)
+    state_file.write_text(json.dumps({'started_at': started_at.isoformat()}))
+    # Products 1-4 were committed before the crash
+    for i in range(1, 5):
+        db.session.get(Product, i).last_updated = started_at + timedelta(minutes=1)
+    db.session.commit()
+
+    jumia = FakeScraper({f'https://jumia/{i}': 50.0 for i in range(1, 11, 2)})
+    kilimall = FakeScraper({f'https://kilimall/{i}': 50.0 for i in range(2, 11, 2)})
+    progress = asyncio.run(refresh_prices({'jumia': jumia, 'kilimall': kilimall},
+                                          batch_size=4, state_file=str(state_file)))
+
+    assert progress.updated == 6
+    assert sorted(jumia.fetched + kilimall.fetched) == sorted(
+        f'https://{"jumia" if i % 2 else "kilimall"}/{i}' for i in range(5, 11))
+    assert not state_file.exists()
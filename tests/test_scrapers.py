@@ -0,0 +1,271 @@
+import asyncio
+import time
+import pytest
+from app.scrapers import BaseScraper, TokenBucket, available_parsers
+from app.scrapers.breaker import CircuitBreaker, parse_retry_after
+from app.scrapers.client import HttpClient
+from app.scrapers.fetch_cache import FetchCache
+from app.scrapers.jumia import JumiaScraper
+from app.scrapers.kilimall import KilimallScraper
+from benchmarks.fixtures import (jumia_category_page, jumia_product_page,
+                                 kilimall_category_page, kilimall_product_page)
+from benchmarks.fixture_server import start_fixture_server
+
+def test_token_bucket_allows_burst_then_rate():
+    async def acquire_all(bucket, n):
+        start = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(acquire_all(TokenBucket(rate=50, burst=5), 15))
+    # 5 immediate tokens, then 10 more at 50/s
+    assert 0.18 <= elapsed < 0.5
+
+def test_kilimall_fetches_listings_concurrently():
+    async def scrape(max_concurrency):
+        runner, base_url = await start_fixture_server(listings=12, latency=0.1)
+        scraper = KilimallScraper(requests_per_second=1000, burst=20, max_concurrency=max_concurrency)
+        try:
+            start = time.monotonic()
+            products = await scraper.get_category_products(f'{base_url}/category/mobile-phones')
+            return products, time.monotonic() - start
+        finally:
+            await scraper.close_session()
+            await runner.cleanup()
+
+    sequential, sequential_time = asyncio.run(scrape(1))
+    concurrent, concurrent_time = asyncio.run(scrape(6))
+    assert [(p['name'], p['price']) for p in concurrent] == [(p['name'], p['price']) for p in sequential]
+    assert [p['url'].rsplit('/', 1)[1] for p in concurrent] == [str(i) for i in range(1, 13)]
+    assert concurrent[0]['price'] == 10010.0
+    assert concurrent_time < sequential_time / 2
+
+@pytest.mark.parametrize('etags', [True, False])
+def test_fetch_cache_skips_unchanged_pages(tmp_path, etags):
+    async def scrape(runner_url):
+        fetch_cache = FetchCache(str(tmp_path))
+        scraper = KilimallScraper(requests_per_second=1000, burst=20, fetch_cache=fetch_cache)
+        try:
+            products = await scraper.get_category_products(f'{runner_url}/category/mobile-phones')
+        finally:
+            await scraper.close_session()
+        fetch_cache.confirm(p['url'] for p in products)
+        return products, fetch_cache
+
+    async def run():
+        runner, base_url = await start_fixture_server(listings=5, latency=0, etags=etags)
+        try:
+            first = await scrape(base_url)
+            second = await scrape(base_url)
+        finally:
+            await runner.cleanup()
+        return first, second
+
+    (first, _), (second, fetch_cache) = asyncio.run(run())
+    assert len(first) == 5
+    assert second == []
+    if etags:
+        assert fetch_cache.not_modified == 5 and fetch_cache.bytes_saved > 5 * 5000
+    else:
+        assert fetch_cache.unchanged == 5 and fetch_cache.bytes_saved == 0
+    assert fetch_cache.parse_ms_saved > 0
+
+def test_parse_times_are_recorded_on_the_loop(tmp_path):
+    def parse(page):
+        if page == 'bad':
+            raise ValueError(page)
+        return page.upper()
+
+    async def run():
+        scraper = KilimallScraper(fetch_cache=FetchCache(str(tmp_path)))
+        scraper.fetch_cache.pending['u'] = {'parse_ms': 0.0}
+        assert await scraper.parse_off_loop('u', parse, 'ok') == 'OK'
+        with pytest.raises(ValueError):
+            await scraper.parse_off_loop('u', parse, 'bad')
+        return scraper
+
+    scraper = asyncio.run(run())
+    # Failed parses are counted too
+    assert scraper.pages_parsed == 2 and scraper.parse_ms > 0
+    assert scraper.fetch_cache.pending['u']['parse_ms'] > 0
+
+def test_parser_backends_agree():
+    results = {}
+    for parser, targeted in [(parser, targeted) for parser in available_parsers() for targeted in (True, False)]:
+        jumia = JumiaScraper(parser=parser, targeted=targeted)
+        kilimall = KilimallScraper(parser=parser, targeted=targeted)
+        product = jumia.parse_product_details('https://www.jumia.co.ke/p', jumia_product_page(3))
+        results[parser, targeted] = (
+            jumia.parse_category_page(jumia_category_page(5)),
+            jumia.parse_listing_page(jumia_category_page(5, 1, pages=2))[1],
+            (product['name'], product['price']),
+            kilimall.parse_listing_urls(kilimall_category_page(4)),
+            kilimall.parse_product_page('https://www.kilimall.co.ke/listing/2', kilimall_product_page(2), 'phones'),
+        )
+    expected = results.pop(('html.parser', False))
+    assert len(expected[0]) == 5 and expected[1] is True
+    assert expected[2] == ('Samsung Galaxy A3 6.6" 4GB RAM 128GB', 12021.0)
+    for backend, result in results.items():
+        assert result == expected, backend
+
+    # A page titled by a bare <h1> is still read when targeted parsing misses it
+    page = '<html><body><h1>Tecno Spark phone</h1><div class="price">KSh 9,999</div></body></html>'
+    product = KilimallScraper(parser='html.parser').parse_product_page('https://www.kilimall.co.ke/listing/9', page, 'phones')
+    assert (product['name'], product['price']) == ('Tecno Spark phone', 9999.0)
+
+def test_shared_client_reuses_connections():
+    async def run():
+        runner, base_url = await start_fixture_server(listings=8, latency=0)
+        try:
+            async with HttpClient(limit_per_host=2) as client:
+                scrapers = [KilimallScraper(requests_per_second=1000, burst=20, max_concurrency=2, client=client)
+                            for _ in range(2)]
+                for scraper in scrapers:
+                    await scraper.get_category_products(f'{base_url}/category/mobile-phones')
+                    await scraper.close_session()
+                # Closing a scraper leaves the shared pool open
+                assert not client.session.closed
+                return client.stats()
+        finally:
+            await runner.cleanup()
+
+    stats = asyncio.run(run())
+    assert stats['requests'] == 18
+    assert stats['connections_created'] <= 2
+    assert stats['connections_reused'] == 18 - stats['connections_created']
+
+def test_jumia_crawl_follows_pages_within_budget():
+    async def crawl(**kwargs):
+        runner, base_url = await start_fixture_server(latency=0, jumia_pages=3)
+        try:
+            async with HttpClient() as client:
+                scraper = JumiaScraper(requests_per_second=1000, burst=20, client=client)
+                products = [p async for p in scraper.crawl_category(f'{base_url}/jumia/phones/', **kwargs)]
+                return products, client.stats()['requests']
+        finally:
+            await runner.cleanup()
+
+    products, requests = asyncio.run(crawl())
+    assert (len(products), requests) == (120, 3)
+    assert products[40]['page_url'].endswith('/jumia/phones/?page=2')
+    assert len(asyncio.run(crawl(max_pages=2))[0]) == 80
+    products, requests = asyncio.run(crawl(max_items=50))
+    assert requests == 2
+    # Page 2 was cut short, so only page 1 is finished
+    assert [p['page_url'][-1] for p in products if p['page_done']] == ['/']
+
+    # Page 1 is already known at the same prices, except one product whose price moved
+    first_page = JumiaScraper().parse_category_page(jumia_category_page(40, 1, pages=3))
+    known = {p['url']: p['price'] for p in first_page}
+    known[first_page[9]['url']] = 1.0
+    products, requests = asyncio.run(crawl(known=known, stop_after=30))
+    # The run of unchanged products restarts after product 10 and reaches 30 at product 40
+    assert (len(products), requests) == (40, 1)
+
+def test_crawl_reads_single_page_categories():
+    class ListingScraper(BaseScraper):
+        async def get_category_products(self, category_url):
+            return [{'url': f'{category_url}/{i}', 'price': 10.0 * i} for i in range(1, 4)]
+
+    async def crawl(**kwargs):
+        scraper = ListingScraper()
+        return [p async for p in scraper.crawl_category('https://jiji.co.ke/phones', **kwargs)]
+
+    products = asyncio.run(crawl())
+    assert [p['price'] for p in products] == [10.0, 20.0, 30.0]
+    assert {p['page_url'] for p in products} == {'https://jiji.co.ke/phones'}
+    assert len(asyncio.run(crawl(max_items=2))) == 2
+
+def test_circuit_breaker_states():
+    breaker = CircuitBreaker(threshold=2, reset_timeout=0.05)
+    assert breaker.allow() and not breaker.record_failure()
+    assert breaker.record_failure() and breaker.state == 'open'
+    assert not breaker.allow()
+    time.sleep(0.06)
+    # Half-open: one probe at a time; a failed probe reopens for twice as long
+    assert breaker.allow() and not breaker.allow()
+    assert breaker.record_failure() and breaker.state == 'open'
+    time.sleep(0.06)
+    assert not breaker.allow()
+    time.sleep(0.05)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+    # Retry-After lengthens the open period
+    breaker.record_failure(retry_after=5)
+    breaker.record_failure(retry_after=5)
+    assert breaker.opened_until - time.monotonic() > 4
+    assert parse_retry_after('120') == 120 and parse_retry_after('soon') is None
+
+def test_cancelled_probe_releases_the_host():
+    async def run():
+        runner, base_url = await start_fixture_server(latency=0.2)
+        try:
+            async with HttpClient(breaker_threshold=1) as client:
+                scraper = KilimallScraper(requests_per_second=1000, burst=20, client=client)
+                breaker = client.breaker(base_url)
+                breaker.record_failure()
+                breaker.opened_until = 0.0
+                probe = asyncio.ensure_future(scraper.fetch(f'{base_url}/listing/1'))
+                await asyncio.sleep(0.05)
+                probe.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await probe
+                return await scraper.fetch(f'{base_url}/listing/2'), breaker.state
+        finally:
+            await runner.cleanup()
+
+    page, state = asyncio.run(run())
+    assert page is not None and state == 'closed'
+
+def test_in_flight_failures_open_the_circuit_once():
+    async def run():
+        runner, base_url = await start_fixture_server(latency=0.05, error_rate=1.0)
+        try:
+            async with HttpClient(breaker_threshold=2, retry_budget=0) as client:
+                scraper = KilimallScraper(requests_per_second=1000, burst=20, max_concurrency=4, client=client)
+                await asyncio.gather(*(scraper.fetch(f'{base_url}/listing/{i}') for i in range(4)))
+                return client.breaker(base_url), client.stats()
+        finally:
+            await runner.cleanup()
+
+    breaker, stats = asyncio.run(run())
+    assert stats['requests'] == 4
+    assert stats['circuits_opened'] == 1 and breaker.trips == 1
+    assert breaker.opened_until - time.monotonic() <= breaker.reset_timeout
+
+def test_failing_host_costs_near_zero_time():
+    async def run():
+        runner, base_url = await start_fixture_server(latency=0.05, error_rate=1.0)
+        try:
+            async with HttpClient(breaker_threshold=3, retry_budget=100) as client:
+                scraper = KilimallScraper(requests_per_second=1000, burst=20, max_concurrency=1,
+                                          client=client, backoff=0.01)
+                start = time.monotonic()
+                pages = [await scraper.fetch(f'{base_url}/listing/{i}') for i in range(20)]
+                return pages, time.monotonic() - start, client.stats()
+        finally:
+            await runner.cleanup()
+
+    pages, elapsed, stats = asyncio.run(run())
+    assert pages == [None] * 20
+    # Three failed attempts open the circuit; everything after is refused without a request
+    assert (stats['requests'], stats['circuits_opened'], stats['rejected']) == (3, 1, 19)
+    assert elapsed < 0.5
+
+def test_retries_recover_within_budget():
+    async def run(retry_budget):
+        runner, base_url = await start_fixture_server(latency=0, error_rate=0.3, seed=1)
+        try:
+            async with HttpClient(retry_budget=retry_budget, breaker_threshold=50) as client:
+                scraper = KilimallScraper(requests_per_second=1000, burst=20, client=client, backoff=0.001)
+                pages = await asyncio.gather(*(scraper.fetch(f'{base_url}/listing/{i}') for i in range(30)))
+                return sum(page is not None for page in pages), client.stats()['retries']
+        finally:
+            await runner.cleanup()
+
+    fetched, retries = asyncio.run(run(100))
+    assert fetched == 30 and retries > 0
+    fetched, retries = asyncio.run(run(2))
+    assert retries == 2 and fetched < 30
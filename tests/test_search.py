@@ -0,0 +1,79 @@
+from datetime import datetime
+from app import db
+from app.models import Product
+from app.search import NgramIndex, get_search_backend
+
+def add(name, platform='jumia'):
+    product = Product(
+        name=name,
+        url=f'https://example.com/{name}',
+        platform=platform,
+        current_price=100.0,
+        last_updated=datetime.utcnow()
+    )
+    db.session.add(product)
+    db.session.commit()
+    return product
+
+def test_ngram_index_substring_and_rename():
+    index = NgramIndex()
+    index.add(1, 'Samsung Galaxy A14')
+    index.add(2, 'Tecno Spark 10C')
+    index.add(3, 'Galaxy Buds')
+
+    assert index.matches('galaxy') == [1, 3]
+    assert index.matches('a1') == [1]
+    assert index.matches('iphone') == []
+
+    index.add(3, 'Infinix Hot 30')
+    assert index.matches('galaxy') == [1]
+    assert index.matches('hot 3') == [3]
+
+def test_search_endpoint_ranks_and_sees_new_products(app, client):
+    add('Phone case for Samsung')
+    add('Samsung Galaxy A14')
+    add('Tecno Spark', platform='kilimall')
+
+    names = [p['name'] for p in client.get('/api/v1/products/search?q=samsung').get_json()]
+    assert names == ['Samsung Galaxy A14', 'Phone case for Samsung']
+
+    # Inserts and renames are indexed without a rebuild
+    get_search_backend()
+    renamed = add('Oraimo Earbuds')
+    renamed.name = 'Samsung Earbuds'
+    db.session.commit()
+    body = client.get('/api/v1/products/search?q=samsung&sort=price_low').get_json()
+    assert {p['name'] for p in body} == {'Samsung Galaxy A14', 'Phone case for Samsung', 'Samsung Earbuds'}
+
+    listing = client.get('/api/v1/products?search=spark&platform=kilimall').get_json()
+    assert [p['name'] for p in listing['products']] == ['Tecno Spark']
+    assert client.get('/api/v1/products/search?q=100%').get_json() == []
+
+def test_common_terms_skip_the_id_list(app):
+    for i in range(5):
+        add(f'Samsung Galaxy {i}')
+    add('Tecno Spark')
+    backend = get_search_backend()
+    backend.max_candidates = 3
+
+    common = backend.filter(Product.query, 'galaxy')
+    assert ' IN ' not in str(common.statement)
+    assert common.count() == 5
+    assert [p.name for p in backend.filter(Product.query, 'spark')] == ['Tecno Spark']
+
+def test_ranked_search_pages_follow_the_ranking(app, client):
+    for i in range(7):
+        add(f'Samsung Galaxy A{i}' if i % 2 else f'Case for Samsung {i}')
+    everything = [p['name'] for p in client.get('/api/v1/products/search?q=samsung').get_json()]
+    assert len(everything) == 7 and everything[0].startswith('Samsung')
+
+    names, after = [], None
+    while True:
+        response = client.get('/api/v1/products/search?q=samsung&limit=3' + (f'&after={after}' if after else ''))
+        assert len(response.get_json()) <= 3
+        names.extend(p['name'] for p in response.get_json())
+        after = response.headers.get('X-Next-Cursor')
+        if not after:
+            break
+    assert names == everything
+    assert client.get('/api/v1/products/search?q=galaxy&limit=3&after=garbage').status_code == 400
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from app import db
+from app.models import Product, PriceHistory
+from app.history import price_series
+from app.series import moving_average, summarize, isoformat, to_records
+
+def test_moving_average_matches_pandas_rolling():
+    prices = np.random.default_rng(1).uniform(100, 200000, size=1000)
+    expected = pd.Series(prices).rolling(window=7, min_periods=1).mean().to_numpy()
+    np.testing.assert_allclose(moving_average(prices, 7), expected, rtol=1e-9)
+    np.testing.assert_allclose(moving_average(prices[:3], 7), [prices[0], prices[:2].mean(), prices[:3].mean()])
+    assert len(moving_average(np.empty(0))) == 0
+
+def test_summary_and_serialization():
+    start = datetime(2026, 1, 1, 8)
+    stamps = [start + timedelta(hours=i) for i in range(3)]
+    timestamps = np.array(stamps, dtype='datetime64[us]')
+    prices = np.array([200.0, 150.0, 250.0])
+
+    stats = summarize(prices)
+    assert stats['min_price'] == 150.0 and stats['current_price'] == 250.0
+    assert stats['price_change'] == 50.0 and stats['price_change_pct'] == 25.0
+
+    assert isoformat(timestamps) == [t.isoformat() for t in stamps]
+    records = to_records(timestamps, prices, moving_average(prices))
+    assert records[1] == {'timestamp': stamps[1].isoformat(), 'price': 150.0, 'ma7': 175.0}
+
+def test_price_series_reads_exact_timestamps(app):
+    product = Product(name='TV', url='https://example.com/tv', platform='jumia')
+    db.session.add(product)
+    db.session.flush()
+    now = datetime.utcnow().replace(microsecond=0)
+    stamps = [now - timedelta(hours=2), now - timedelta(hours=1, microseconds=-123456)]
+    for price, stamp in zip((10.0, 12.5), stamps):
+        db.session.add(PriceHistory(product_id=product.id, price=price, timestamp=stamp))
+    db.session.commit()
+
+    timestamps, prices = price_series(product.id, 1)
+    assert timestamps.astype(datetime).tolist() == stamps
+    assert prices.tolist() == [10.0, 12.5]
@@ -0,0 +1,63 @@
+from app import db
+from app.models import Product
+from app.summary import product_added, price_changed, read_stats, rebuild
+
+def add_product(i, platform, category, price):
+    product = Product(name=f'Product {i}', url=f'https://example.com/{i}',
+                      platform=platform, category=category, current_price=price)
+    db.session.add(product)
+    product_added(platform, category, price)
+    return product
+
+def test_deltas_match_rebuild(app, client):
+    add_product(1, 'jumia', 'phones', 100.0)
+    add_product(2, 'jumia', 'televisions', 300.0)
+    tv = add_product(3, 'kilimall', 'televisions', 500.0)
+    add_product(4, 'kilimall', None, None)
+    db.session.commit()
+
+    price_changed(tv.platform, tv.category, tv.current_price, 700.0)
+    tv.current_price = 700.0
+    db.session.commit()
+
+    incremental = read_stats()
+    assert {s['name']: (s['count'], s['avg_price']) for s in incremental['platforms']} == {
+        'jumia': (2, 200.0),
+        'kilimall': (2, 700.0),
+    }
+    assert {s['name']: s['count'] for s in incremental['categories']} == {
+        None: 1, 'phones': 1, 'televisions': 2
+    }
+
+    assert rebuild() == []
+    db.session.commit()
+    assert read_stats() == incremental
+    assert client.get('/api/v1/stats').get_json()['stats'] == incremental
+
+def test_rebuild_corrects_drift(app):
+    db.session.add(Product(name='Untracked', url='https://example.com/x',
+                           platform='jiji', category='phones', current_price=50.0))
+    db.session.commit()
+
+    drift = rebuild()
+    db.session.commit()
+    assert {(dimension, name) for dimension, name, _, _ in drift} == {
+        ('platform', 'jiji'), ('category', 'phones')
+    }
+    assert read_stats()['platforms'] == [{'name': 'jiji', 'count': 1, 'avg_price': 50.0}]
+
+def test_fallback_increments_match_upsert(app, monkeypatch):
+    from app import summary
+    add_product(1, 'jumia', 'phones', 100.0)
+    db.session.commit()
+    upserted = read_stats()
+
+    rebuild()
+    monkeypatch.setattr(summary, '_upsert', lambda deltas: False)
+    product_added('jumia', 'phones', 300.0)
+    price_changed('jumia', 'phones', 300.0, 100.0)
+    product_added('jumia', 'phones', -100.0)
+    db.session.commit()
+    stats = read_stats()
+    assert stats['platforms'] == [{'name': 'jumia', 'count': 3, 'avg_price': 100.0 / 3}]
+    assert upserted['platforms'][0]['count'] == 1